@@ -22,7 +22,9 @@ from pytype import abstract_utils
 from pytype import compat
 from pytype import datatypes
 from pytype import function
+from pytype import metrics
 from pytype import mixin
+from pytype import summary_cache
 from pytype import utils
 from pytype.pyc import opcodes
 from pytype.pytd import escape
@@ -1705,6 +1707,8 @@ class PyTDFunction(Function):
   This represents (potentially overloaded) functions.
   """
 
+  _signature_cache_metric = metrics.MapCounter("pytd_signature_cache")
+
   @classmethod
   def make(cls, name, vm, module, pyval=None, pyval_name=None):
     """Create a PyTDFunction.
@@ -1998,8 +2002,80 @@ class PyTDFunction(Function):
     ret_type = optimize.Optimize(pytd_utils.JoinTypes(options))
     return ret_type.Visit(visitors.ReplaceUnionsWithAny())
 
+  def _is_fixed_type(self, data):
+    """Whether data always matches a signature in the same way.
+
+    This is the case for pytd classes, and for instances of non-generic pytd
+    classes that have neither attributes nor contents that could be changed by
+    a mutation. For anything else, including containers, the result of matching
+    depends on the bindings that are visible at the current node.
+
+    Args:
+      data: An abstract value.
+
+    Returns:
+      True if the data can be part of a key of the signature cache.
+    """
+    if isinstance(data, PyTDClass):
+      return True
+    return (isinstance(data, Instance) and isinstance(data.cls, PyTDClass) and
+            not data.cls.template and not data.members and
+            all(len(param.bindings) == 1
+                for param in data.instance_type_parameters.values()))
+
+  def _get_signature_cache_key(self, args, view, alias_map):
+    """Get the key under which the failed signatures of a call are cached.
+
+    Args:
+      args: The passed arguments.
+      view: A variable->binding dictionary.
+      alias_map: Optionally, a datatypes.UnionFind, which stores all the type
+        renaming information, mapping of type parameter name to its
+        representative.
+
+    Returns:
+      A hashable key, or None if the call can't be cached.
+    """
+    if alias_map or args.starargs or args.starstarargs:
+      return None
+    posargs = tuple(view[arg].data for arg in args.posargs)
+    namedargs = tuple((name, view[arg].data)
+                      for name, arg in sorted(args.namedargs.items()))
+    if not all(self._is_fixed_type(data) for data in itertools.chain(
+        posargs, (data for _, data in namedargs))):
+      return None
+    return posargs, namedargs
+
   def _yield_matching_signatures(self, node, args, view, alias_map):
-    """Try, in order, all pytd signatures, yielding matches."""
+    """Try, in order, all pytd signatures, yielding matches.
+
+    Signatures that failed to match the same argument types before are skipped,
+    using self._signature_cache, which maps the key of a view to the signatures
+    that failed before the first match.
+
+    Args:
+      node: The current CFG node.
+      args: The passed arguments.
+      view: A variable->binding dictionary.
+      alias_map: Optionally, a datatypes.UnionFind.
+
+    Yields:
+      Tuples of the matching signature, a name->binding dictionary of the
+      arguments and the type parameter substitution.
+
+    Raises:
+      FailedFunctionCall: If no signature matched.
+    """
+    key = self._get_signature_cache_key(args, view, alias_map)
+    if key is None:
+      known_failures = frozenset()
+    elif key in self._signature_cache:
+      known_failures = self._signature_cache[key]
+      self._signature_cache_metric.inc("hit")
+    else:
+      known_failures = None
+      self._signature_cache_metric.inc("miss")
+    failures = []
     error = None
     matched = False
     # Once a constant has matched a literal type, it should no longer be able to
@@ -2011,6 +2087,8 @@ class PyTDFunction(Function):
     # f('r') should match only the first signature.
     literal_matches = set()
     for sig in self.signatures:
+      if known_failures and sig in known_failures:
+        continue
       if any(not abstract_utils.is_literal(sig.signature.annotations.get(name))
              for name in literal_matches):
         continue
@@ -2018,9 +2096,12 @@ class PyTDFunction(Function):
         arg_dict, subst = sig.substitute_formal_args(
             node, args, view, alias_map)
       except function.FailedFunctionCall as e:
+        failures.append(sig)
         if e > error:
           error = e
       else:
+        if not matched and known_failures is None:
+          self._signature_cache[key] = frozenset(failures)
         matched = True
         for name, binding in arg_dict.items():
           if (isinstance(binding.data, mixin.PythonConstant) and
@@ -2058,6 +2139,7 @@ class PyTDFunction(Function):
           d = d[1:]
         new_sigs.append(sig.set_defaults(d))
     self.signatures = new_sigs
+    self._signature_cache.clear()
     # Update our parent's AST too, if we have a parent.
     # 'parent' is set by PyTDClass._convert_member
     if hasattr(self, "parent"):
@@ -3296,6 +3378,7 @@ class InterpreterFunction(SignedFunction):
     # type-checking down the road.
     annotations = self.vm.annotations_util.sub_annotations(
         node, sig.annotations, substs, instantiate_unbound=False)
+    annotated_names = set()
     if sig.has_param_annotations:
       for name in callargs:
         if (name in annotations and (not self.is_attribute_of_class or
@@ -3304,6 +3387,27 @@ class InterpreterFunction(SignedFunction):
           extra_key = (self.get_first_opcode(), name)
           node, callargs[name] = self.vm.annotations_util.init_annotation(
               node, name, annotations[name], extra_key=extra_key)
+          annotated_names.add(name)
+    if (self.vm.summary_cache and self.vm.options.skip_repeat_calls and
+        not self.is_attribute_of_class):
+      summary_key = self.vm.summary_cache.get_key(
+          self.vm, self.code, self.f_globals, annotations, callargs,
+          annotated_names)
+    else:
+      summary_key = None
+    if summary_key:
+      summary = self.vm.summary_cache.get(summary_key)
+      if summary is not None:
+        # Optimization: A previous pytype run analyzed this call, and the
+        # result depends only on the code and the arguments, so we don't even
+        # need a frame.
+        ret = self.vm.program.NewVariable(
+            summary_cache.to_values(self.vm, summary),
+            [var.bindings[0] for var in callargs.values()], node)
+        if self._store_call_records or self.vm.store_all_calls:
+          self._call_records.append((callargs, ret, node))
+        return node, ret
+      num_reported_errors = self.vm.errorlog.num_reported
     try:
       frame = self.vm.make_frame(
           node, self.code, self.f_globals, self.f_locals, callargs,
@@ -3398,6 +3502,10 @@ class InterpreterFunction(SignedFunction):
     mutations = self._mutations_generator(node_after_call, first_posarg, substs)
     node_after_call = abstract_utils.apply_mutations(node_after_call, mutations)
     self._call_cache[callkey] = ret, self.vm.remaining_depth()
+    if summary_key and self.vm.errorlog.num_reported == num_reported_errors:
+      summary = summary_cache.summarize(self.vm, ret.data)
+      if summary is not None:
+        self.vm.summary_cache.store(summary_key, summary)
     if self._store_call_records or self.vm.store_all_calls:
       self._call_records.append((callargs, ret, node_after_call))
     self.last_frame = frame
@@ -3832,6 +3940,7 @@ class Module(Instance):
       #  do "from foo import x".)
       if not value.module and not isinstance(value, Module):
         value.module = self.name
+        self.vm.matcher.forget_mro_matches()
     return var
 
   @property
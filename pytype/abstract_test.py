@@ -341,6 +341,26 @@ class FunctionTest(AbstractTestBase):
     self.assertIs(node, self._vm.root_cfg_node)
     self.assertFalse(ret.bindings)
 
+  def test_call_with_cached_signatures(self):
+    str_sig, = self._make_pytd_function(
+        (self._vm.lookup_builtin("__builtin__.str"),)).signatures
+    int_sig, = self._make_pytd_function(
+        (self._vm.lookup_builtin("__builtin__.int"),)).signatures
+    f = abstract.PyTDFunction("f", (str_sig, int_sig), pytd.METHOD, self._vm)
+    value = self._vm.convert.primitive_class_instances[int]
+    for _ in range(2):
+      self._call_pytd_function(
+          f, (value.to_variable(self._vm.root_cfg_node),))
+    self.assertEqual(f._signature_cache,  # pylint: disable=protected-access
+                     {((value,), ()): frozenset({str_sig})})
+
+  def test_call_with_uncached_signatures(self):
+    f = self._make_pytd_function(
+        (self._vm.lookup_builtin("__builtin__.list"),))
+    arg = self._vm.convert.build_list(self._vm.root_cfg_node, [])
+    self._call_pytd_function(f, (arg,))
+    self.assertFalse(f._signature_cache)  # pylint: disable=protected-access
+
   def test_signature_from_pytd(self):
     # def f(self: Any, *args: Any)
     self_param = pytd.Parameter("self", pytd.AnythingType(), False, False, None)
@@ -125,7 +125,8 @@ def get_views(variables, node):
   """Get all possible views of the given variables at a particular node.
 
   For performance reasons, this method uses node.CanHaveCombination for
-  filtering. For a more precise check, you can call
+  filtering, which deep_variable_product applies to each binding while it
+  expands the product. For a more precise check, you can call
   node.HasCombination(list(view.values())). Do so judiciously, as the latter
   method can be very slow.
 
@@ -150,27 +151,24 @@ def get_views(variables, node):
     A datatypes.AcessTrackingDict mapping variables to bindings.
   """
   try:
-    combinations = cfg_utils.deep_variable_product(variables)
+    combinations = cfg_utils.deep_variable_product(variables, node=node)
   except cfg_utils.TooComplexError:
     combinations = ((var.AddBinding(node.program.default_data, [], node)
                      for var in variables),)
-  seen = []  # the accessed subsets of previously seen views
+  # The accessed subsets of previously seen views.
+  seen = datatypes.SubsetIndex(sort_key=lambda var: var.id)
   for combination in combinations:
     view = {value.variable: value for value in combination}
-    if any(subset <= view.items() for subset in seen):
+    if seen.has_subset_of(view):
       # Optimization: This view can be skipped because it matches the accessed
       # subset of a previous one.
       log.info("Skipping view (already seen): %r", view)
       continue
-    combination = list(view.values())
-    if not node.CanHaveCombination(combination):
-      log.info("Skipping combination (unreachable): %r", combination)
-      continue
     view = datatypes.AccessTrackingDict(view)
     skip_future = yield view
     if skip_future:
       # Skip future views matching this accessed subset.
-      seen.append(view.accessed_subset.items())
+      seen.add(view.accessed_subset)
 
 
 def get_signatures(func):
@@ -0,0 +1,106 @@
+"""A content-addressed cache for the results of analyzing a single file.
+
+The cache key covers everything that can influence the result of analyzing a
+file: the source code, the pytype version, the options and the contents of the
+pyi files in the imports map. Because dependencies are keyed by content rather
+than by timestamp, regenerating a dependency whose pyi did not change does not
+invalidate the results of the modules that import it.
+"""
+
+import collections
+import hashlib
+import logging
+import os
+import tempfile
+
+from pytype import __version__
+from pytype import errors
+from pytype import file_utils
+from six.moves import cPickle
+
+
+log = logging.getLogger(__name__)
+
+
+# Args:
+#   errors: The errors found in the file, as a list of errors.Error.
+#   result: The generated pyi, or None if we only checked the file.
+CacheEntry = collections.namedtuple("CacheEntry", ["errors", "result"])
+
+
+def _hash_file(h, filename, open_function):
+  try:
+    with open_function(filename, "rb") as f:
+      h.update(hashlib.sha256(f.read()).digest())
+  except IOError:
+    h.update(b"<missing>")
+
+
+def get_key(options):
+  """Get the cache key for analyzing options.input.
+
+  Args:
+    options: config.Options object.
+
+  Returns:
+    The key as a hex string, or None if the result cannot be cached. We only
+    cache results for which all dependencies are listed in an imports map.
+  """
+  if options.imports_map is None or options.pickle_output:
+    return None
+  h = hashlib.sha256()
+  for s in (__version__.__version__, os.environ.get("TYPESHED_HOME", ""),
+            repr(options)):
+    h.update(s.encode("utf-8"))
+    h.update(b"\0")
+  _hash_file(h, options.input, options.open_function)
+  for short_path, path in sorted(options.imports_map.items()):
+    h.update(short_path.encode("utf-8"))
+    _hash_file(h, path, options.open_function)
+  return h.hexdigest()
+
+
+def _get_path(cache_dir, key):
+  return os.path.join(cache_dir, key[:2], key)
+
+
+def load(cache_dir, key):
+  """Load a cached result.
+
+  Args:
+    cache_dir: The cache directory.
+    key: The cache key, from get_key().
+
+  Returns:
+    A tuple of (errors.ErrorLog, pyi or None), or None on a cache miss.
+  """
+  try:
+    with open(_get_path(cache_dir, key), "rb") as f:
+      entry = cPickle.load(f)
+  except (IOError, EOFError, cPickle.UnpicklingError):
+    return None
+  log.info("Using cached result %s", key)
+  errorlog = errors.ErrorLog()
+  for error in entry.errors:
+    errorlog._add(error)  # pylint: disable=protected-access
+  return errorlog, entry.result
+
+
+def store(cache_dir, key, errorlog, result):
+  """Store a result in the cache.
+
+  Args:
+    cache_dir: The cache directory.
+    key: The cache key, from get_key().
+    errorlog: The errors.ErrorLog from analyzing the file.
+    result: The generated pyi, or None if we only checked the file.
+  """
+  path = _get_path(cache_dir, key)
+  file_utils.makedirs(os.path.dirname(path))
+  entry = CacheEntry(list(errorlog), result)
+  # Write to a temporary file first, so that concurrent pytype processes never
+  # see a partially written entry.
+  fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+  with os.fdopen(fd, "wb") as f:
+    cPickle.dump(entry, f, protocol=cPickle.HIGHEST_PROTOCOL)
+  os.replace(tmp, path)
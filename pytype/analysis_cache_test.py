@@ -0,0 +1,84 @@
+"""Tests for analysis_cache.py."""
+
+import os
+
+from pytype import analysis_cache
+from pytype import config
+from pytype import errors
+from pytype import file_utils
+
+import unittest
+
+
+class AnalysisCacheTest(unittest.TestCase):
+  """Tests for the analysis cache."""
+
+  def _make_options(self, d, **kwargs):
+    imports = d.create_file("foo.imports", "bar %s\n" % d["bar.pyi"])
+    return config.Options.create(
+        d["foo.py"], output=d["foo.pyi"], imports_map=imports,
+        cache_dir=d["cache"], **kwargs)
+
+  def _make_files(self, d):
+    d.create_file("foo.py", "import bar\n")
+    d.create_file("bar.pyi", "x: int\n")
+
+  def test_no_imports_map(self):
+    with file_utils.Tempdir() as d:
+      self._make_files(d)
+      options = config.Options.create(d["foo.py"], cache_dir=d["cache"])
+      self.assertIsNone(analysis_cache.get_key(options))
+
+  def test_key_is_deterministic(self):
+    with file_utils.Tempdir() as d:
+      self._make_files(d)
+      self.assertEqual(analysis_cache.get_key(self._make_options(d)),
+                       analysis_cache.get_key(self._make_options(d)))
+
+  def test_key_ignores_dependency_timestamp(self):
+    with file_utils.Tempdir() as d:
+      self._make_files(d)
+      key = analysis_cache.get_key(self._make_options(d))
+      os.utime(d["bar.pyi"], (0, 0))
+      self.assertEqual(key, analysis_cache.get_key(self._make_options(d)))
+
+  def test_key_depends_on_dependency_contents(self):
+    with file_utils.Tempdir() as d:
+      self._make_files(d)
+      key = analysis_cache.get_key(self._make_options(d))
+      d.create_file("bar.pyi", "x: str\n")
+      self.assertNotEqual(key, analysis_cache.get_key(self._make_options(d)))
+
+  def test_key_depends_on_source(self):
+    with file_utils.Tempdir() as d:
+      self._make_files(d)
+      key = analysis_cache.get_key(self._make_options(d))
+      d.create_file("foo.py", "import bar\nbar.x\n")
+      self.assertNotEqual(key, analysis_cache.get_key(self._make_options(d)))
+
+  def test_key_depends_on_options(self):
+    with file_utils.Tempdir() as d:
+      self._make_files(d)
+      key = analysis_cache.get_key(self._make_options(d))
+      self.assertNotEqual(key, analysis_cache.get_key(
+          self._make_options(d, protocols=True)))
+
+  def test_miss(self):
+    with file_utils.Tempdir() as d:
+      self.assertIsNone(analysis_cache.load(d.path, "0123"))
+
+  def test_store_and_load(self):
+    errorlog = errors.ErrorLog()
+    errorlog._add(errors.Error.for_test(  # pylint: disable=protected-access
+        errors.SEVERITY_ERROR, "oops", "name-error", filename="foo.py",
+        lineno=3))
+    with file_utils.Tempdir() as d:
+      analysis_cache.store(d.path, "0123", errorlog, "x: int\n")
+      loaded_errorlog, result = analysis_cache.load(d.path, "0123")
+    self.assertEqual(result, "x: int\n")
+    self.assertEqual(str(loaded_errorlog), str(errorlog))
+    self.assertTrue(loaded_errorlog.has_error())
+
+
+if __name__ == "__main__":
+  unittest.main()
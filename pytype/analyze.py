@@ -1,9 +1,12 @@
 """Code for checking and inferring types."""
 
 import collections
+import contextlib
 import logging
+import multiprocessing
 import re
 import subprocess
+import time
 
 from pytype import abstract
 from pytype import abstract_utils
@@ -16,12 +19,14 @@ from pytype import special_builtins
 from pytype import state as frame_state
 from pytype import vm
 from pytype.overlays import typing_overlay
+from pytype.pyc import pyc
 from pytype.pytd import escape
 from pytype.pytd import optimize
 from pytype.pytd import pytd
 from pytype.pytd import pytd_utils
 from pytype.pytd import visitors
 from pytype.pytd.parse import builtins
+from pytype.typegraph import cfg
 
 log = logging.getLogger(__name__)
 
@@ -36,6 +41,17 @@ CallRecord = collections.namedtuple(
                    "keyword_arguments", "return_value"])
 
 
+_typegraph_backend = metrics.MapCounter("typegraph_backend")
+_solver_queries = metrics.Counter("solver_queries")
+_solver_query_nodes_visited = metrics.Distribution(
+    "solver_query_nodes_visited")
+_solver_shortcircuited_queries = metrics.Counter(
+    "solver_shortcircuited_queries")
+_solver_cached_queries = metrics.Counter("solver_cached_queries")
+_solver_cache_hits = metrics.Counter("solver_cache_hits")
+_solver_cache_misses = metrics.Counter("solver_cache_misses")
+
+
 # How deep to follow call chains:
 INIT_MAXIMUM_DEPTH = 4  # during module loading
 MAXIMUM_DEPTH = 3  # during non-quick analysis
@@ -46,6 +62,66 @@ QUICK_INFER_MAXIMUM_DEPTH = 1  # during quick inference
 _INITIALIZING = object()
 
 
+class _AnalysisCosts:
+  """The cost of analyzing each top-level function and class.
+
+  Costs are inclusive: they cover everything that happens while a function or
+  class is analyzed, including the analysis of the functions it calls.
+  """
+
+  def __init__(self, vm, enabled):
+    self._vm = vm
+    self._enabled = enabled
+    # Map from name to [analyses, seconds, opcodes, CFG nodes, bindings].
+    self._costs = collections.defaultdict(lambda: [0, 0, 0, 0, 0])
+
+  def _counters(self):
+    program = self._vm.program
+    return (time.time(), self._vm.num_opcodes, program.next_node_id,
+            program.next_binding_id)
+
+  @contextlib.contextmanager
+  def measure(self, name, category):
+    """Attribute the cost of the "with" block to the given name.
+
+    The block is also recorded as a span in the trace, see metrics.TraceSpan.
+
+    Args:
+      name: The name of the function or class being analyzed.
+      category: The trace category, e.g. "analyze_function".
+
+    Yields:
+      Nothing.
+    """
+    with metrics.TraceSpan(name, category):
+      if not self._enabled:
+        yield
+        return
+      start = self._counters()
+      try:
+        yield
+      finally:
+        cost = self._costs[name]
+        cost[0] += 1
+        for i, (before, after) in enumerate(zip(start, self._counters())):
+          cost[i + 1] += after - before
+
+  def report(self):
+    """Returns the costs as a table, the most expensive first."""
+    lines = ["%-50s %6s %10s %10s %10s %10s" % (
+        "function or class", "count", "time(s)", "opcodes", "cfg nodes",
+        "bindings")]
+    for name, cost in sorted(self._costs.items(),
+                             key=lambda item: (-item[1][1], item[0])):
+      lines.append("%-50s %6d %10.3f %10d %10d %10d" % ((name,) + tuple(cost)))
+    return "\n".join(lines) + "\n"
+
+
+# The CallTracer and arguments of an ongoing parallel analysis. Worker processes
+# are forked, so they inherit this instead of having to unpickle it.
+_parallel_analysis = None
+
+
 class CallTracer(vm.VirtualMachine):
   """Virtual machine that records all function calls.
 
@@ -72,6 +148,8 @@ class CallTracer(vm.VirtualMachine):
     self._analyzed_classes = set()
     self._generated_classes = {}
     self.exitpoint = None
+    self.analysis_costs = _AnalysisCosts(
+        self, bool(self.options.profile_functions))
 
   def create_varargs(self, node):
     value = abstract.Instance(self.convert.tuple_type, self)
@@ -360,20 +438,21 @@ class CallTracer(vm.VirtualMachine):
 
   def analyze_class(self, node, val):
     self._analyzed_classes.add(val.data)
-    node, instance = self.init_class(node, val.data)
-    good_instances = [b for b in instance.bindings if val.data == b.data.cls]
-    if not good_instances:
-      # __new__ returned something that's not an instance of our class.
-      instance = val.data.instantiate(node)
-      node = self.call_init(node, instance)
-    elif len(good_instances) != len(instance.bindings):
-      # __new__ returned some extra possibilities we don't need.
-      instance = self.join_bindings(node, good_instances)
-    for name, methodvar in sorted(val.data.members.items()):
-      if name in self._CONSTRUCTORS:
-        continue  # We already called this method during initialization.
-      b = self.bind_method(node, name, methodvar, instance)
-      node = self.analyze_method_var(node, name, b, val)
+    with self.analysis_costs.measure(val.data.name, "analyze_class"):
+      node, instance = self.init_class(node, val.data)
+      good_instances = [b for b in instance.bindings if val.data == b.data.cls]
+      if not good_instances:
+        # __new__ returned something that's not an instance of our class.
+        instance = val.data.instantiate(node)
+        node = self.call_init(node, instance)
+      elif len(good_instances) != len(instance.bindings):
+        # __new__ returned some extra possibilities we don't need.
+        instance = self.join_bindings(node, good_instances)
+      for name, methodvar in sorted(val.data.members.items()):
+        if name in self._CONSTRUCTORS:
+          continue  # We already called this method during initialization.
+        b = self.bind_method(node, name, methodvar, instance)
+        node = self.analyze_method_var(node, name, b, val)
     return node
 
   def analyze_function(self, node0, val):
@@ -382,7 +461,8 @@ class CallTracer(vm.VirtualMachine):
       log.info("Analyze functions: Skipping class method %s", val.data.name)
     else:
       node1 = node0.ConnectNew(val.data.name)
-      node2 = self.maybe_analyze_method(node1, val)
+      with self.analysis_costs.measure(val.data.name, "analyze_function"):
+        node2 = self.maybe_analyze_method(node1, val)
       node2.ConnectTo(node0)
     return node0
 
@@ -397,40 +477,137 @@ class CallTracer(vm.VirtualMachine):
             data.get_first_opcode() not in self._analyzed_functions and
             not _SKIP_FUNCTION_RE.match(data.name))
 
-  def analyze_toplevel(self, node, defs):
+  def _toplevel_values(self, defs):
+    """Returns the classes and functions in defs, in analysis order."""
+    values = []
     for name, var in sorted(defs.items()):  # sort, for determinicity
       if not self._is_typing_member(name, var):
         for value in var.bindings:
           if isinstance(value.data, abstract.InterpreterClass):
-            new_node = self.analyze_class(node, value)
+            values.append(value)
           elif (isinstance(value.data, abstract.INTERPRETER_FUNCTION_TYPES) and
                 not value.data.is_overload):
-            new_node = self.analyze_function(node, value)
-          else:
-            continue
-          if new_node is not node:
-            new_node.ConnectTo(node)
-    # Now go through all functions and classes we haven't analyzed yet.
-    # These are typically hidden under a decorator.
+            values.append(value)
+    return values
+
+  def _analyze_toplevel_values(self, node, values):
+    for value in values:
+      if isinstance(value.data, abstract.InterpreterClass):
+        new_node = self.analyze_class(node, value)
+      else:
+        new_node = self.analyze_function(node, value)
+      if new_node is not node:
+        new_node.ConnectTo(node)
+
+  def _analyze_remaining(self, node, classes, functions):
+    """Analyze the given classes and functions that we haven't analyzed yet."""
     # Go through classes first so that the `is_attribute_of_class` will
     # be set for all functions in class.
-    for c in self._interpreter_classes:
+    for c in classes:
       for value in c.bindings:
         if (isinstance(value.data, abstract.InterpreterClass) and
             value.data not in self._analyzed_classes):
           node = self.analyze_class(node, value)
-    for f in self._interpreter_functions:
+    for f in functions:
       for value in f.bindings:
         if self._should_analyze_as_interpreter_function(value.data):
           node = self.analyze_function(node, value)
     return node
 
-  def analyze(self, node, defs, maximum_depth):
+  def _analyzed_values(self, num_classes, num_functions):
+    """Find the already analyzed classes and functions from run_program.
+
+    Args:
+      num_classes: The number of classes defined by run_program.
+      num_functions: The number of functions defined by run_program.
+
+    Returns:
+      A tuple of lists of (index, binding index) pairs into
+      self._interpreter_classes and self._interpreter_functions.
+    """
+    classes = [(i, j)
+               for i, c in enumerate(self._interpreter_classes[:num_classes])
+               for j, value in enumerate(c.bindings)
+               if value.data in self._analyzed_classes]
+    functions = [
+        (i, j)
+        for i, f in enumerate(self._interpreter_functions[:num_functions])
+        for j, value in enumerate(f.bindings)
+        if isinstance(value.data, abstract.InterpreterFunction) and
+        value.data.get_first_opcode() in self._analyzed_functions]
+    return classes, functions
+
+  def _analyze_toplevel_in_parallel(self, node, values, jobs):
+    """Distribute the analysis of the given values across worker processes.
+
+    Each share is analyzed by its own, freshly forked worker, which starts from
+    the state after run_program and analyzes every jobs-th value, as well as the
+    functions and classes that only come into existence while it does so. The
+    workers' errors are merged in a fixed order, so the result doesn't depend
+    on scheduling. It can differ from a sequential analysis, though: a worker
+    doesn't see the side effects, like module attributes set by a function, of
+    the values analyzed by the other workers.
+
+    Args:
+      node: The CFG node to analyze the values at.
+      values: The bindings of the classes and functions to analyze.
+      jobs: The number of worker processes.
+    """
+    global _parallel_analysis
+    _parallel_analysis = (self, node, values, jobs)
+    try:
+      # With maxtasksperchild=1 and chunksize=1, no worker analyzes a second
+      # share starting from the state that the first one left behind.
+      with multiprocessing.get_context("fork").Pool(
+          jobs, initializer=pyc.forget_compile_servers,
+          maxtasksperchild=1) as pool:
+        results = pool.map(_analyze_toplevel_share, range(jobs), chunksize=1)
+    finally:
+      _parallel_analysis = None
+    for errors, analyzed_classes, analyzed_functions in results:
+      self.errorlog.extend(errors)
+      # A worker may have added bindings that don't exist here, but the ones
+      # we have keep their indices.
+      for i, j in analyzed_classes:
+        bindings = self._interpreter_classes[i].bindings
+        if j < len(bindings):
+          self._analyzed_classes.add(bindings[j].data)
+      for i, j in analyzed_functions:
+        bindings = self._interpreter_functions[i].bindings
+        if j < len(bindings):
+          self._analyzed_functions.add(bindings[j].data.get_first_opcode())
+
+  def analyze_toplevel(self, node, defs, jobs=1):
+    """Analyze the classes and functions defined by the program.
+
+    Args:
+      node: The CFG node to analyze them at.
+      defs: The module-level definitions, a dict of names to variables.
+      jobs: The number of processes to distribute the analysis of the classes
+        and functions in defs across. Only errors are collected from them, so
+        this should only be used for checking.
+
+    Returns:
+      The CFG node at the end of the analysis.
+    """
+    values = self._toplevel_values(defs)
+    jobs = min(jobs, len(values))
+    if (jobs > 1 and "fork" in multiprocessing.get_all_start_methods() and
+        not multiprocessing.current_process().daemon):
+      self._analyze_toplevel_in_parallel(node, values, jobs)
+    else:
+      self._analyze_toplevel_values(node, values)
+    # Now go through all functions and classes we haven't analyzed yet.
+    # These are typically hidden under a decorator.
+    return self._analyze_remaining(
+        node, self._interpreter_classes, self._interpreter_functions)
+
+  def analyze(self, node, defs, maximum_depth, jobs=1):
     assert not self.frame
     self.maximum_depth = maximum_depth
     self._analyzing = True
     node = node.ConnectNew(name="Analyze")
-    return self.analyze_toplevel(node, defs)
+    return self.analyze_toplevel(node, defs, jobs)
 
   def trace_unknown(self, name, unknown_binding):
     self._unknowns[name] = unknown_binding
@@ -597,7 +774,7 @@ class CallTracer(vm.VirtualMachine):
     ty = ty.Visit(optimize.CombineReturnsAndExceptions())
     ty = ty.Visit(optimize.PullInMethodClasses())
     ty = ty.Visit(visitors.DefaceUnresolved(
-        [ty, self.loader.concat_all()], escape.UNKNOWN))
+        [ty, self.loader.lookup_all()], escape.UNKNOWN))
     return ty.Visit(visitors.AdjustTypeParameters())
 
   def _check_return(self, node, actual, formal):
@@ -622,16 +799,20 @@ def check_types(src, filename, errorlog, options, loader,
   """Verify the Python code."""
   tracer = CallTracer(errorlog=errorlog, options=options,
                       generate_unknowns=False, loader=loader, **kwargs)
-  loc, defs = tracer.run_program(src, filename, init_maximum_depth)
+  with metrics.TraceSpan(filename or "<string>", "run_program"):
+    loc, defs = tracer.run_program(src, filename, init_maximum_depth)
   snapshotter = metrics.get_metric("memory", metrics.Snapshot)
   snapshotter.take_snapshot("analyze:check_types:tracer")
   if deep:
     if maximum_depth is None:
       maximum_depth = (
           QUICK_CHECK_MAXIMUM_DEPTH if options.quick else MAXIMUM_DEPTH)
-    tracer.analyze(loc, defs, maximum_depth=maximum_depth)
+    tracer.analyze(loc, defs, maximum_depth=maximum_depth,
+                   jobs=options.analysis_jobs)
   snapshotter.take_snapshot("analyze:check_types:post")
+  _record_typegraph_metrics(options, tracer.program)
   _maybe_output_debug(options, tracer.program)
+  _maybe_output_analysis_costs(options, tracer)
 
 
 def infer_types(src, errorlog, options, loader,
@@ -667,7 +848,8 @@ def infer_types(src, errorlog, options, loader,
     tracer = CallTracer(errorlog=errorlog, options=options,
                         generate_unknowns=options.protocols,
                         store_all_calls=not deep, loader=loader, **kwargs)
-  loc, defs = tracer.run_program(src, filename, init_maximum_depth)
+  with metrics.TraceSpan(filename or "<string>", "run_program"):
+    loc, defs = tracer.run_program(src, filename, init_maximum_depth)
   log.info("===Done running definitions and module-level code===")
   snapshotter = metrics.get_metric("memory", metrics.Snapshot)
   snapshotter.take_snapshot("analyze:infer_types:tracer")
@@ -700,21 +882,76 @@ def infer_types(src, errorlog, options, loader,
     protocols_pytd = tracer.loader.import_name("protocols")
   else:
     protocols_pytd = None
-  builtins_pytd = tracer.loader.concat_all()
   # Insert type parameters, where appropriate
   ast = ast.Visit(visitors.CreateTypeParametersForSignatures())
   if options.protocols:
     log.info("=========== PyTD to solve =============\n%s",
              pytd_utils.Print(ast))
-    ast = convert_structural.convert_pytd(ast, builtins_pytd, protocols_pytd)
+    ast = convert_structural.convert_pytd(
+        ast, tracer.loader.concat_all(), protocols_pytd,
+        tracer.loader.lookup_all())
   elif not show_library_calls:
     log.info("Solving is turned off. Discarding call traces.")
     # Rename remaining "~unknown" to "?"
     ast = ast.Visit(visitors.RemoveUnknownClasses())
     # Remove "~list" etc.:
     ast = convert_structural.extract_local(ast)
+  _record_typegraph_metrics(options, tracer.program)
   _maybe_output_debug(options, tracer.program)
-  return ast, builtins_pytd
+  _maybe_output_analysis_costs(options, tracer)
+  # The caller optimizes ast against this, which visits all of it.
+  return ast, tracer.loader.concat_all()
+
+
+def _analyze_toplevel_share(job):
+  """Analyze one share of the values of an ongoing parallel analysis.
+
+  Args:
+    job: The index of the share.
+
+  Returns:
+    A tuple of the new errors, and the classes and functions from run_program
+    that this worker analyzed, as returned by CallTracer._analyzed_values.
+  """
+  tracer, node, values, jobs = _parallel_analysis
+  # pylint: disable=protected-access
+  num_errors = len(tracer.errorlog)
+  num_classes = len(tracer._interpreter_classes)
+  num_functions = len(tracer._interpreter_functions)
+  tracer._analyze_toplevel_values(node, values[job::jobs])
+  # Classes and functions that were defined while analyzing, e.g. nested
+  # functions, only exist in this worker.
+  tracer._analyze_remaining(node, tracer._interpreter_classes[num_classes:],
+                            tracer._interpreter_functions[num_functions:])
+  errors = tracer.errorlog[num_errors:]
+  return (errors,) + tracer._analyzed_values(num_classes, num_functions)
+
+
+def _record_typegraph_metrics(options, program):
+  """Add the typegraph backend and its solver metrics to the metrics report."""
+  if not options.metrics:
+    return
+  _typegraph_backend.inc(cfg.BACKEND)
+  if not hasattr(program, "calculate_metrics"):
+    # Only the C++ typegraph collects solver metrics.
+    return
+  for solver_metrics in program.calculate_metrics().solver_metrics:
+    _solver_cache_hits.inc(solver_metrics.cache_metrics.hits)
+    _solver_cache_misses.inc(solver_metrics.cache_metrics.misses)
+    for query in solver_metrics.query_metrics:
+      _solver_queries.inc()
+      _solver_query_nodes_visited.add(query.nodes_visited)
+      if query.shortcircuited:
+        _solver_shortcircuited_queries.inc()
+      if query.from_cache:
+        _solver_cached_queries.inc()
+
+
+def _maybe_output_analysis_costs(options, tracer):
+  """Maybe write the per-function report of analysis costs."""
+  if options.profile_functions:
+    with options.open_function(options.profile_functions, "w") as f:
+      f.write(tracer.analysis_costs.report())
 
 
 def _maybe_output_debug(options, program):
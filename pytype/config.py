@@ -181,6 +181,12 @@ def add_subtools(o):
       "--generate-builtins", action="store",
       dest="generate_builtins", default=None,
       help="Precompile builtins pyi and write to the given file.")
+  o.add_argument(
+      "--mmap-builtins", action="store_true",
+      dest="mmap_builtins", default=False,
+      help=("With --generate-builtins, write an uncompressed file that "
+            "--precompiled-builtins memory-maps, so that concurrent pytype "
+            "processes share it and only read the modules they use."))
   o.add_argument(
       "--parse-pyi", action="store_true",
       dest="parse_pyi", default=False,
@@ -208,6 +214,11 @@ def add_pickle_options(o):
       "--precompiled-builtins", action="store",
       dest="precompiled_builtins", default=None,
       help="Use the supplied file as precompiled builtins pyi.")
+  o.add_argument(
+      "--lazy-unpickling", action="store_true",
+      dest="lazy_unpickling", default=False,
+      help=("With --precompiled-builtins, unpickle the dependencies of a "
+            "module only when a reference into them is first used."))
 
 
 def add_infrastructure_options(o):
@@ -250,6 +261,14 @@ def add_infrastructure_options(o):
             "then pytype should be invoked with $OUTDIR in "
             "--pythonpath. This option is incompatible with "
             "--imports_info and --generate_builtins.") % os.pathsep)
+  o.add_argument(
+      "--cache-dir", type=str, action="store",
+      dest="cache_dir", default=None,
+      help=("Cache results in the given directory, keyed by the contents of "
+            "the input file and of the files in --imports_info. Results are "
+            "only cached when --imports_info is used. Bytecode compiled for a "
+            "different Python version and summaries of calls to simple "
+            "functions are cached here too."))
   o.add_argument(
       "--touch", type=str, action="store",
       dest="touch", default=None,
@@ -270,6 +289,17 @@ def add_infrastructure_options(o):
       "-Z", "--quick", action="store_true",
       dest="quick", default=None,
       help=("Only do an approximation."))
+  o.add_argument(
+      "--analysis-jobs", type=int, action="store",
+      dest="analysis_jobs", default=1,
+      help=("Number of processes to distribute the analysis of top-level "
+            "functions and classes across when checking. Helps with large "
+            "modules. A process doesn't see the side effects (e.g., module "
+            "attributes set by a function) of the definitions analyzed by the "
+            "other processes, so the errors can differ from a single-process "
+            "run. Only affects checking; inference always uses a single "
+            "process, so the per-module runs of pytype, which infer .pyi "
+            "files, don't benefit from this."))
 
 
 def add_debug_options(o):
@@ -312,6 +342,33 @@ def add_debug_options(o):
       "--profile", type=str, action="store",
       dest="profile", default=None,
       help="Profile pytype and output the stats to the specified file.")
+  o.add_argument(
+      "--trace", type=str, action="store",
+      dest="trace", default=None,
+      help=("Record a timeline of module loading, compilation, analysis and "
+            "output, and write it to the specified file in the Chrome trace "
+            "event format."))
+  o.add_argument(
+      "--sampling-profile", type=str, action="store",
+      dest="sampling_profile", default=None,
+      help=("Sample the stack at regular intervals of CPU time and write the "
+            "samples to the specified file in the collapsed stack format of "
+            "flamegraph tools. Much cheaper than --profile."))
+  o.add_argument(
+      "--sampling-interval", type=float, action="store",
+      dest="sampling_interval", default=None,
+      help="Interval between stack samples in seconds. Default: 0.005.")
+  o.add_argument(
+      "--profile-functions", type=str, action="store",
+      dest="profile_functions", default=None,
+      help=("Attribute the time, opcodes, CFG nodes and bindings spent on "
+            "analyzing each top-level function and class to it, and write a "
+            "report sorted by time to the specified file."))
+  o.add_argument(
+      "--profile-visitors", type=str, action="store",
+      dest="profile_visitors", default=None,
+      help=("Time the pytd visitors, count the nodes each of them walks and "
+            "output a report to the specified file."))
   o.add_argument(
       "-v", "--verbosity", type=int, action="store",
       dest="verbosity", default=1,
@@ -457,6 +514,18 @@ class Postprocessor:
       self.error("Need a filename.")
     self.output_options.generate_builtins = generate_builtins
 
+  @uses(["generate_builtins"])
+  def _store_mmap_builtins(self, mmap_builtins):
+    if mmap_builtins and not self.output_options.generate_builtins:
+      self.error("Can't use without --generate-builtins", "mmap-builtins")
+    self.output_options.mmap_builtins = mmap_builtins
+
+  @uses(["precompiled_builtins"])
+  def _store_lazy_unpickling(self, lazy_unpickling):
+    if lazy_unpickling and not self.output_options.precompiled_builtins:
+      self.error("Can't use without --precompiled-builtins", "lazy-unpickling")
+    self.output_options.lazy_unpickling = lazy_unpickling
+
   @uses(["precompiled_builtins"])
   def _store_typeshed(self, typeshed):
     if typeshed is not None:
@@ -570,6 +639,11 @@ class Postprocessor:
       analyze_annotated = self.output_options.check
     self.output_options.analyze_annotated = analyze_annotated
 
+  def _store_analysis_jobs(self, analysis_jobs):
+    if analysis_jobs < 1:
+      self.error("Must be at least 1", "analysis-jobs")
+    self.output_options.analysis_jobs = analysis_jobs
+
   def _parse_arguments(self, arguments):
     """Parse the input/output arguments."""
     if len(arguments) > 1:
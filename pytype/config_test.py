@@ -199,6 +199,20 @@ class PostprocessorTest(unittest.TestCase):
                          self.output_options).process()
     self.assertIs(self.output_options.typeshed, False)
 
+  def test_lazy_unpickling(self):
+    input_options = types.SimpleNamespace(
+        lazy_unpickling=True, precompiled_builtins="builtins")
+    config.Postprocessor({"lazy_unpickling", "precompiled_builtins"},
+                         input_options, self.output_options).process()
+    self.assertIs(self.output_options.lazy_unpickling, True)
+
+  def test_lazy_unpickling_without_precompiled_builtins(self):
+    input_options = types.SimpleNamespace(
+        lazy_unpickling=True, precompiled_builtins=None)
+    with self.assertRaises(config.PostprocessingError):
+      config.Postprocessor({"lazy_unpickling", "precompiled_builtins"},
+                           input_options, self.output_options).process()
+
   def test_enable_only(self):
     input_options = types.SimpleNamespace(
         disable=None,
@@ -3,6 +3,7 @@
 import itertools
 import logging
 
+from pytype import metrics
 from pytype.pytd import booleq
 from pytype.pytd import escape
 from pytype.pytd import optimize
@@ -208,8 +209,9 @@ def solve(ast, builtins_pytd, protocols_pytd):
   builtins_pytd = visitors.LookupClasses(builtins_pytd)
   protocols_pytd = visitors.LookupClasses(protocols_pytd)
   ast = visitors.LookupClasses(ast, builtins_pytd)
-  return TypeSolver(
-      ast, builtins_pytd, protocols_pytd).solve(), extract_local(ast)
+  with metrics.TraceSpan(ast.name, "solve"):
+    solution = TypeSolver(ast, builtins_pytd, protocols_pytd).solve()
+  return solution, extract_local(ast)
 
 
 def extract_local(ast):
@@ -274,12 +276,41 @@ def insert_solution(result, mapping, global_lookup):
   return result.Visit(visitors.ReplaceTypes(subst))
 
 
-def convert_pytd(ast, builtins_pytd, protocols_pytd):
-  """Convert pytd with unknowns (structural types) to one with nominal types."""
+class _SolutionLookup:
+  """Looks up names in the solved classes, then in the builtins."""
+
+  def __init__(self, result, builtins_lookup):
+    self._result = result
+    self._builtins_lookup = builtins_lookup
+
+  def Lookup(self, name):
+    try:
+      return self._result.Lookup(name)
+    except KeyError:
+      return self._builtins_lookup.Lookup(name)
+
+
+def convert_pytd(ast, builtins_pytd, protocols_pytd, builtins_lookup=None):
+  """Convert pytd with unknowns (structural types) to one with nominal types.
+
+  Args:
+    ast: A pytd.TypeDeclUnit, containing classes named ~unknownXX.
+    builtins_pytd: A pytd for builtins.
+    protocols_pytd: A pytd for protocols.
+    builtins_lookup: Optionally, an object with a Lookup method that finds the
+      same names as builtins_pytd, e.g. from load_pytd.Loader.lookup_all(). It
+      saves concatenating builtins_pytd with the solution.
+
+  Returns:
+    A pytd.TypeDeclUnit.
+  """
   builtins_pytd = builtins_pytd.Visit(visitors.ClassTypeToNamedType())
   mapping, result = solve(ast, builtins_pytd, protocols_pytd)
   log_info_mapping(mapping)
-  lookup = pytd_utils.Concat(builtins_pytd, result)
+  if builtins_lookup:
+    lookup = _SolutionLookup(result, builtins_lookup)
+  else:
+    lookup = pytd_utils.Concat(builtins_pytd, result)
   result = insert_solution(result, mapping, lookup)
   if log.isEnabledFor(logging.INFO):
     log.info("=========== solve result =============\n%s",
@@ -142,6 +142,65 @@ class AccessTrackingDict(dict):
     return super().__delitem__(k)
 
 
+class SubsetIndex:
+  """A collection of dicts that finds those contained in a given dict.
+
+  has_subset_of(d) tells whether any of the added dicts is a subset of d, i.e.,
+  all its items are also items of d. Rather than comparing d against every
+  added dict, we store the dicts in a trie whose edges are their items, in the
+  order given by sort_key, and only follow the edges that are items of d. Two
+  dicts share a path as long as they agree on the smallest keys. The items of
+  the stored dicts have to be hashable.
+  """
+
+  _END = object()  # Marks the end of a stored dict in the trie.
+
+  def __init__(self, sort_key=None):
+    """Initialize.
+
+    Args:
+      sort_key: Optionally, a function that returns a sort key for a dict key.
+        The keys of all stored dicts must be comparable via this function.
+    """
+    self._sort_key = sort_key
+    self._root = {}
+
+  def add(self, d):
+    """Add a dict (or any mapping) to the index."""
+    items = d.items()
+    if self._sort_key:
+      items = sorted(items, key=lambda item: self._sort_key(item[0]))
+    node = self._root
+    for item in items:
+      if self._END in node:
+        # A subset of d is already stored, so d itself will never be needed.
+        return
+      node = node.setdefault(item, {})
+    node.clear()  # The supersets of d that we stored are no longer needed.
+    node[self._END] = True
+
+  def has_subset_of(self, d):
+    """Whether any of the added dicts is a subset of d."""
+    items = d.items()
+    missing = self._END  # Not a value of any dict.
+    stack = [self._root]
+    while stack:
+      node = stack.pop()
+      if self._END in node:
+        return True
+      if len(node) > len(items):
+        # Probe the edges with the items of d.
+        for item in items:
+          child = node.get(item)
+          if child is not None:
+            stack.append(child)
+      else:
+        for (k, v), child in node.items():
+          if d.get(k, missing) == v:
+            stack.append(child)
+    return False
+
+
 class MonitorDict(dict):
   """A dictionary that monitors changes to its cfg.Variable values.
 
@@ -46,6 +46,48 @@ class AccessTrackingDictTest(unittest.TestCase):
     self.assertEqual(v, 3)
 
 
+class SubsetIndexTest(unittest.TestCase):
+  """Test SubsetIndex."""
+
+  def test_empty(self):
+    index = datatypes.SubsetIndex()
+    self.assertFalse(index.has_subset_of({}))
+    self.assertFalse(index.has_subset_of({"a": 1}))
+
+  def test_empty_subset(self):
+    index = datatypes.SubsetIndex()
+    index.add({})
+    self.assertTrue(index.has_subset_of({}))
+    self.assertTrue(index.has_subset_of({"a": 1}))
+
+  def test_subset(self):
+    index = datatypes.SubsetIndex(sort_key=lambda k: k)
+    index.add({"b": 2, "a": 1})
+    index.add({"c": 3})
+    self.assertTrue(index.has_subset_of({"a": 1, "b": 2}))
+    self.assertTrue(index.has_subset_of({"a": 1, "b": 2, "d": 4}))
+    self.assertTrue(index.has_subset_of({"c": 3, "d": 4}))
+    self.assertFalse(index.has_subset_of({"a": 1, "b": 3}))
+    self.assertFalse(index.has_subset_of({"a": 1, "c": 4}))
+
+  def test_add_subset_of_stored(self):
+    index = datatypes.SubsetIndex(sort_key=lambda k: k)
+    index.add({"a": 1, "b": 2})
+    index.add({"a": 1})
+    index.add({"a": 1, "c": 3})
+    self.assertTrue(index.has_subset_of({"a": 1}))
+    self.assertFalse(index.has_subset_of({"a": 2, "b": 2}))
+
+  def test_wide_node(self):
+    index = datatypes.SubsetIndex(sort_key=lambda k: k)
+    for i in range(10):
+      index.add({"a": i, "b": i})
+    self.assertTrue(index.has_subset_of({"a": 3, "b": 3}))
+    self.assertTrue(index.has_subset_of({"a": 3, "b": 3, "c": 0}))
+    self.assertFalse(index.has_subset_of({"a": 3, "b": 4}))
+    self.assertFalse(index.has_subset_of({"a": 10, "b": 10}))
+
+
 class DatatypesTest(unittest.TestCase):
   """Test datatypes."""
 
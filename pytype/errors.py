@@ -312,6 +312,13 @@ class Error:
       text += "\n" + self._traceback
     return text
 
+  def __getstate__(self):
+    # bad_call refers to abstract values, which cannot be pickled. It is only
+    # used while analyzing, not for printing the error.
+    state = self.__dict__.copy()
+    state["_bad_call"] = None
+    return state
+
   def drop_traceback(self):
     with _CURRENT_ERROR_NAME.bind(self._name):
       return self.__class__(
@@ -332,6 +339,8 @@ class ErrorLogBase:
     self._errors = []
     # An error filter (initially None)
     self._filter = None
+    # The number of errors reported so far, including filtered ones.
+    self.num_reported = 0
 
   def __len__(self):
     return len(self._errors)
@@ -348,6 +357,11 @@ class ErrorLogBase:
         self.error(stack, e.message, e.details, e.keyword, e.bad_call,
                    e.keyword_context)
 
+  def extend(self, errors):
+    """Add errors, e.g. ones collected by an errorlog in another process."""
+    for e in errors:
+      self._add(e)
+
   def is_valid_error_name(self, name):
     """Return True iff name was defined in an @error_name() decorator."""
     return name in _ERROR_NAMES
@@ -368,6 +382,7 @@ class ErrorLogBase:
     return any(e._severity == SEVERITY_ERROR for e in self._errors)
 
   def _add(self, error):
+    self.num_reported += 1
     if self._filter is None or self._filter(error):
       _log.info("Added error to log: %s\n%s", error.name, error)
       if _log.isEnabledFor(logging.DEBUG):
@@ -8,11 +8,13 @@ import tokenize
 import traceback
 
 from pytype import __version__
+from pytype import analysis_cache
 from pytype import analyze
 from pytype import config
 from pytype import directors
 from pytype import errors
 from pytype import load_pytd
+from pytype import metrics
 from pytype import utils
 from pytype.pyc import pyc
 from pytype.pyi import parser
@@ -108,16 +110,17 @@ def generate_pyi(src, options=None, loader=None):
   options = options or config.Options.create()
   with config.verbosity_from(options):
     errorlog, (mod, builtins) = _call(analyze.infer_types, src, options, loader)
-    mod.Visit(visitors.VerifyVisitor())
-    mod = optimize.Optimize(mod,
-                            builtins,
-                            # TODO(b/159038508): Add FLAGs for these
-                            lossy=False,
-                            use_abcs=False,
-                            max_union=7,
-                            remove_mutable=False)
-    mod = pytd_utils.CanonicalOrdering(mod, sort_signatures=True)
-    result = pytd_utils.Print(mod)
+    with metrics.TraceSpan(options.input or "<string>", "pyi_output"):
+      mod.Visit(visitors.VerifyVisitor())
+      mod = optimize.Optimize(mod,
+                              builtins,
+                              # TODO(b/159038508): Add FLAGs for these
+                              lossy=False,
+                              use_abcs=False,
+                              max_union=7,
+                              remove_mutable=False)
+      mod = pytd_utils.CanonicalOrdering(mod, sort_signatures=True)
+      result = pytd_utils.Print(mod)
     log.info("=========== pyi optimized =============")
     log.info("\n%s", result)
     log.info("========================================")
@@ -180,30 +183,50 @@ def _write_pyi_output(options, contents, filename):
   assert filename
   if filename == "-":
     sys.stdout.write(contents)
+  elif options.cache_dir and _has_contents(options, contents, filename):
+    # Leave the timestamp alone, so that build tools can tell that dependents
+    # of this file don't need to be rebuilt.
+    log.info("pyi %r => %r is unchanged", options.input, filename)
   else:
     log.info("write pyi %r => %r", options.input, filename)
     with options.open_function(filename, "w") as fi:
       fi.write(contents)
 
 
+def _has_contents(options, contents, filename):
+  try:
+    with options.open_function(filename, "r") as fi:
+      return fi.read() == contents
+  except IOError:
+    return False
+
+
 @_set_verbosity_from(posarg=0)
-def process_one_file(options):
+def process_one_file(options, loader=None):
   """Check a .py file or generate a .pyi for it, according to options.
 
   Args:
     options: config.Options object.
+    loader: load_pytd.Loader object.
 
   Returns:
     An error code (0 means no error).
   """
 
   log.info("Process %s => %s", options.input, options.output)
-  loader = load_pytd.create_loader(options)
-  try:
-    errorlog, result, ast = check_or_generate_pyi(options, loader)
-  except utils.UsageError as e:
-    logging.error("Usage error: %s\n", utils.message(e))
-    return 1
+  cache_key = options.cache_dir and analysis_cache.get_key(options)
+  cached = cache_key and analysis_cache.load(options.cache_dir, cache_key)
+  if cached:
+    errorlog, result = cached
+  else:
+    loader = loader or load_pytd.create_loader(options)
+    try:
+      errorlog, result, ast = check_or_generate_pyi(options, loader)
+    except utils.UsageError as e:
+      logging.error("Usage error: %s\n", utils.message(e))
+      return 1
+    if cache_key:
+      analysis_cache.store(options.cache_dir, cache_key, errorlog, result)
 
   if not options.check:
     if options.pickle_output:
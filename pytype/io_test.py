@@ -113,6 +113,18 @@ class IOTest(unittest.TestCase):
     _, pyi_string, _ = io.check_or_generate_pyi(options)
     self.assertEqual(pyi_string, "x: float\n")
 
+  def test_profile_functions(self):
+    src = "def f():\n  return 42\nclass Foo:\n  def g(self):\n    return f()\n"
+    with self._tmpfile(src) as f:
+      with self._tmpfile("") as report:
+        options = config.Options.create(
+            f.name, check=True, profile_functions=report.name)
+        io.check_or_generate_pyi(options)
+        with open(report.name) as fi:
+          lines = fi.read().splitlines()
+    self.assertIn("function or class", lines[0])
+    self.assertCountEqual(["f", "Foo"], [line.split()[0] for line in lines[1:]])
+
   def test_write_pickle(self):
     ast = pytd.TypeDeclUnit(None, (), (), (), (), ())
     options = config.Options.create(output="/dev/null")
@@ -5,6 +5,7 @@ import logging
 import os
 
 from pytype import file_utils
+from pytype import metrics
 from pytype import module_utils
 from pytype import utils
 from pytype.pyi import parser
@@ -44,17 +45,29 @@ def _is_default_pyi(path):
   return DEFAULT_PYI_PATH_SUFFIX and path.endswith(DEFAULT_PYI_PATH_SUFFIX)
 
 
-def create_loader(options):
-  """Create a pytd loader."""
+def create_loader(options, modules=None):
+  """Create a pytd loader.
+
+  Args:
+    options: config.Options object.
+    modules: Optionally, a name -> Module map of already resolved modules to
+      start the loader with. Must contain "__builtin__" and "typing". Not
+      supported with --precompiled-builtins, which supplies its own modules.
+
+  Returns:
+    A Loader.
+  """
   kwargs = {attr: getattr(options, opt)
             for attr, opt in LOADER_ATTR_TO_CONFIG_OPTION_MAP.items()}
   if options.precompiled_builtins:
+    assert modules is None
     return PickledPyiLoader.load_from_pickle(
-        options.precompiled_builtins, **kwargs)
+        options.precompiled_builtins,
+        lazy_unpickling=options.lazy_unpickling, **kwargs)
   elif options.use_pickled_files:
-    return PickledPyiLoader(**kwargs)
+    return PickledPyiLoader(modules=modules, **kwargs)
   else:
-    return Loader(**kwargs)
+    return Loader(modules=modules, **kwargs)
 
 
 def get_module_name(filename, pythonpath):
@@ -82,8 +95,9 @@ class Module:
       - "{filename}" for other pyi files.
     ast: The parsed PyTD. Internal references will be resolved, but
       NamedType nodes referencing other modules might still be unresolved.
-    pickle: The AST as a pickled string. As long as this field is not None, the
-      ast will be None.
+    pickle: The AST as a pickled string, or as a memoryview into a
+      memory-mapped store. As long as this field is not None, the ast will be
+      None.
     dirty: The initial value of the dirty attribute.
   """
 
@@ -99,6 +113,85 @@ class Module:
     return bool(self.pickle)
 
 
+class _DirectoryIndex:
+  """A lazily built index of the directories in the pythonpath.
+
+  Each directory is listed once, the first time we look for a file in it, so
+  that looking for a module in every directory of the pythonpath (or checking
+  every target of the imports_map) doesn't stat the file system for each
+  candidate path. Files that are added to a directory after it has been listed
+  are not seen until the index is refreshed.
+  """
+
+  def __init__(self):
+    # Maps directories to their modification time and a map of entry names to
+    # whether they are directories (True), regular files (False) or neither
+    # (None, e.g. /dev/null).
+    self._listings = {}
+
+  def _mtime(self, directory):
+    try:
+      return os.stat(directory or os.curdir).st_mtime_ns
+    except OSError:
+      return None
+
+  def _list(self, directory):
+    if directory not in self._listings:
+      # We get the modification time first, so that entries that are added while
+      # we list the directory make the listing outdated.
+      mtime = self._mtime(directory)
+      try:
+        with os.scandir(directory or os.curdir) as entries:
+          listing = {}
+          for e in entries:
+            if e.is_dir():
+              listing[e.name] = True
+            elif e.is_file():
+              listing[e.name] = False
+            elif _exists(e):
+              listing[e.name] = None
+      except OSError:
+        listing = {}
+      self._listings[directory] = (mtime, listing)
+    return self._listings[directory][1]
+
+  def _lookup(self, path):
+    directory, name = os.path.split(path)
+    return self._list(directory).get(name)
+
+  def exists(self, path):
+    directory, name = os.path.split(path)
+    return name in self._list(directory)
+
+  def isdir(self, path):
+    return self._lookup(path) is True
+
+  def isfile(self, path):
+    return self._lookup(path) is False
+
+  def refresh(self):
+    """Forgets the directories that were modified since they were listed.
+
+    Returns:
+      Whether any directory was forgotten.
+    """
+    modified = [directory for directory, (mtime, _) in self._listings.items()
+                if self._mtime(directory) != mtime]
+    for directory in modified:
+      del self._listings[directory]
+    return bool(modified)
+
+
+def _exists(entry):
+  """Whether a directory entry exists, following symlinks."""
+  try:
+    entry.stat()
+  except OSError:
+    # For example, a broken symlink.
+    return False
+  return True
+
+
 class BadDependencyError(Exception):
   """If we can't resolve a module referenced by the one we're trying to load."""
 
@@ -151,15 +244,27 @@ class Loader:
     self.use_typeshed = use_typeshed
     self.open_function = open_function
     self._concatenated = None
+    # The module ASTs that self._concatenated was built from, in order.
+    self._concatenated_asts = []
     self._import_name_cache = {}  # performance cache
+    self._directory_index = _DirectoryIndex()
+    # Types shared between modules, see visitors.InternTypes.
+    self._interned_types = {}
     self._aliases = {}
     self._prefixes = set()
     # Paranoid verification that pytype.main properly checked the flags:
     if imports_map is not None:
       assert pythonpath == [""], pythonpath
 
-  def save_to_pickle(self, filename):
-    """Save to a pickle. See PickledPyiLoader.load_from_pickle for reverse."""
+  def save_to_pickle(self, filename, mmap_store=False):
+    """Save to a pickle. See PickledPyiLoader.load_from_pickle for reverse.
+
+    Args:
+      filename: The file to write.
+      mmap_store: Whether to write an uncompressed store that
+        PickledPyiLoader.load_from_pickle memory-maps, rather than a compressed
+        pickle.
+    """
     # We assume that the Loader is in a consistent state here. In particular, we
     # assume that for every module in _modules, all the transitive dependencies
     # have been loaded.
@@ -170,6 +275,10 @@ class Loader:
     # Preparing an ast for pickling clears its class pointers, making it
     # unsuitable for reuse, so we have to discard the builtins cache.
     builtins.InvalidateCache(self.python_version)
+    if mmap_store:
+      pytd_utils.SavePickleStore(
+          items, filename, open_function=self.open_function)
+      return
     # Now pickle the pickles. We keep the "inner" modules as pickles as a
     # performance optimization - unpickling is slow.
     pytd_utils.SavePickle(
@@ -203,9 +312,11 @@ class Loader:
     builtins_lookup = visitors.LookupBuiltins(self.builtins, full_names=False)
     if ast:
       builtins_lookup.EnterTypeDeclUnit(ast)
-    pyval = pyval.Visit(builtins_lookup)
-    pyval = pyval.Visit(visitors.ExpandCompatibleBuiltins(self.builtins))
-    return pyval
+    # ExpandCompatibleBuiltins only rewrites bool, float, complex and bytes,
+    # which LookupBuiltins resolves to class types without children, so the two
+    # can share a traversal.
+    return pyval.Visit(visitors.FusedVisitor(
+        builtins_lookup, visitors.ExpandCompatibleBuiltins(self.builtins)))
 
   def _resolve_external_and_local_types(self, pyval, ast=None):
     dependencies = self._collect_ast_dependencies(pyval)
@@ -238,7 +349,6 @@ class Loader:
 
   def load_file(self, module_name, filename, ast=None):
     """Load (or retrieve from cache) a module and resolve its dependencies."""
-    self._concatenated = None  # invalidate
     # Check for an existing ast first
     existing = self._get_existing_ast(module_name)
     if existing:
@@ -272,6 +382,9 @@ class Loader:
       # Now that any imported TypeVar instances have been resolved, adjust type
       # parameters in classes and functions.
       module.ast = module.ast.Visit(visitors.AdjustTypeParameters())
+      # Share equal types with the other modules. This creates a new tree, so
+      # it has to happen before we fill in pointers into the module.
+      module.ast = module.ast.Visit(visitors.InternTypes(self._interned_types))
       # Now we can fill in internal cls pointers to ClassType nodes in the
       # module. This code executes when the module is first loaded, which
       # happens before any others use it to resolve dependencies, so there are
@@ -505,6 +618,11 @@ class Loader:
       return existing
 
     assert os.sep not in module_name, (os.sep, module_name)
+    with metrics.TraceSpan(module_name, "import"):
+      return self._find_and_load(module_name)
+
+  def _find_and_load(self, module_name):
+    """Find a module that isn't loaded yet, and load it."""
     log.debug("Trying to import %r", module_name)
     # Builtin modules (but not standard library modules!) take precedence
     # over modules in PYTHONPATH.
@@ -515,6 +633,10 @@ class Loader:
       return mod
 
     file_ast, path = self._import_file(module_name, module_name.split("."))
+    if not file_ast and self._directory_index.refresh():
+      # The module may have been added to the pythonpath after we indexed it.
+      # Look again before falling back to typeshed, which it would shadow.
+      file_ast, path = self._import_file(module_name, module_name.split("."))
     if file_ast:
       if _is_default_pyi(path):
         # Remove the default module from the cache; we will return it later if
@@ -572,7 +694,7 @@ class Loader:
       if init_ast is not None:
         log.debug("Found module %r with path %r", module_name, init_path)
         return init_ast, full_path
-      elif self.imports_map is None and os.path.isdir(path):
+      elif self.imports_map is None and self._directory_index.isdir(path):
         # We allow directories to not have an __init__ file.
         # The module's empty, but you can still load submodules.
         log.debug("Created empty module %r with path %r",
@@ -602,25 +724,57 @@ class Loader:
         full_path = self.imports_map[path]
       else:
         return None, None
+      # We have /dev/null entries in the import_map - os.path.isfile() returns
+      # False for those. However, we *do* want to load them. Hence exists /
+      # isdir.
+      exists = (self._directory_index.exists(full_path) and
+                not self._directory_index.isdir(full_path))
     else:
       full_path = path + ".pyi"
+      exists = self._directory_index.isfile(full_path)
 
-    # We have /dev/null entries in the import_map - os.path.isfile() returns
-    # False for those. However, we *do* want to load them. Hence exists / isdir.
-    if os.path.exists(full_path) and not os.path.isdir(full_path):
+    if exists:
       ast = self.load_file(filename=full_path, module_name=module_name)
       return ast, full_path
     else:
       return None, None
 
   def concat_all(self):
-    if not self._concatenated:
-      self._concatenated = pytd_utils.Concat(
-          *(module.ast for module in self._modules.values()
-            if module.ast),
-          name="<all>")
+    """Concatenates the ASTs of all loaded modules.
+
+    The result is updated incrementally: if modules have only been added since
+    the last call, their ASTs are appended to the previous result. Otherwise,
+    e.g. when a module has been unpickled or removed, it is rebuilt. Note that
+    appending still copies the members of the previous result into a new
+    TypeDeclUnit, so a call that adds modules is linear in the size of all
+    loaded ASTs. Calls that add nothing return the previous result as is.
+
+    Returns:
+      A pytd.TypeDeclUnit.
+    """
+    asts = [module.ast for module in self._modules.values() if module.ast]
+    num_concatenated = len(self._concatenated_asts)
+    if (self._concatenated and len(asts) >= num_concatenated and
+        all(old is new for old, new in zip(self._concatenated_asts, asts))):
+      if len(asts) > num_concatenated:
+        self._concatenated = pytd_utils.Concat(
+            self._concatenated, *asts[num_concatenated:], name="<all>")
+    else:
+      self._concatenated = pytd_utils.Concat(*asts, name="<all>")
+    self._concatenated_asts = asts
     return self._concatenated
 
+  def lookup_all(self):
+    """Returns a lookup into the ASTs of all loaded modules.
+
+    It finds the same names as concat_all(), without concatenating the ASTs.
+    Use concat_all() only where a real pytd.TypeDeclUnit is needed.
+
+    Returns:
+      An object with a Lookup(name) method.
+    """
+    return _ModuleLookup(self)
+
   def _get_module_map(self):
     return {name: module.ast for name, module in self._modules.items()
             if module.ast}
@@ -644,17 +798,78 @@ class Loader:
     return resolved_modules
 
 
+class _LazyModuleMap:
+  """A module map that unpickles modules as they are looked up."""
+
+  def __init__(self, loader):
+    self._loader = loader
+
+  def get(self, module_name):
+    return self._loader._get_existing_ast(module_name)  # pylint: disable=protected-access
+
+
+class _ModuleLookup:
+  """Looks up fully qualified names in the modules of a loader.
+
+  A name is looked up in the module named by its longest prefix, falling back to
+  shorter prefixes, so a lookup only ever touches the modules the name could
+  belong to.
+  """
+
+  def __init__(self, loader):
+    self._modules = loader._modules  # pylint: disable=protected-access
+
+  def Lookup(self, name):
+    prefix = name
+    while "." in prefix:
+      prefix, _ = prefix.rsplit(".", 1)
+      module = self._modules.get(prefix)
+      # Like concat_all(), skip modules that haven't been unpickled yet.
+      if module and module.ast:
+        try:
+          return module.ast.Lookup(name)
+        except KeyError:
+          pass
+    raise KeyError(name)
+
+
 class PickledPyiLoader(Loader):
-  """A Loader which always loads pickle instead of PYI, for speed."""
+  """A Loader which always loads pickle instead of PYI, for speed.
 
-  def __init__(self, *args, **kwargs):
+  Attributes:
+    lazy_unpickling: If true, unpickling a module does not unpickle its
+      dependencies. They are unpickled when a class pointer into them is first
+      used, or when they are imported.
+  """
+
+  def __init__(self, *args, lazy_unpickling=False, **kwargs):
+    # Set before calling the base constructor, which unpickles the builtins.
+    self.lazy_unpickling = lazy_unpickling
     super().__init__(*args, **kwargs)
 
   @classmethod
   def load_from_pickle(cls, filename, base_module, **kwargs):
-    items = pytd_utils.LoadPickle(
-        filename, compress=True,
-        open_function=kwargs.get("open_function", open))
+    """Create a loader from a file written by Loader.save_to_pickle.
+
+    Modules are only unpickled when they are first used. If the file is a
+    memory-mapped store, the pickles are not even read until then, and
+    concurrent processes share the pages of the file.
+
+    Args:
+      filename: The file to load.
+      base_module: The module the loader is based in.
+      **kwargs: Further arguments to the Loader constructor.
+
+    Returns:
+      A PickledPyiLoader.
+    """
+    open_function = kwargs.get("open_function", open)
+    if pytd_utils.IsPickleStore(filename, open_function=open_function):
+      items = pytd_utils.LoadPickleStore(
+          filename, open_function=open_function)
+    else:
+      items = pytd_utils.LoadPickle(
+          filename, compress=True, open_function=open_function)
     modules = {
         name: Module(name, filename=None, ast=None, pickle=pickle, dirty=False)
         for name, pickle in items
@@ -664,6 +879,13 @@ class PickledPyiLoader(Loader):
   def _unpickle_module(self, module):
     if not module.pickle:
       return
+    if self.lazy_unpickling:
+      loaded_ast = cPickle.loads(module.pickle)
+      loaded_ast = serialize_ast.EnsureAstName(loaded_ast, module.module_name)
+      module.ast = loaded_ast.ast
+      module.pickle = None
+      serialize_ast.FillLocalReferencesLazily(loaded_ast, _LazyModuleMap(self))
+      return
     todo = [module]
     seen = set()
     newly_loaded_asts = []
@@ -90,6 +90,78 @@ class ImportPathsTest(test_base.UnitTest):
           "base", self.python_version, pythonpath=[d.path])
       self.assertTrue(loader.import_name("baz"))
 
+  def test_file_added_after_indexing(self):
+    with file_utils.Tempdir() as d:
+      d.create_file("foo.pyi", "x = ... # type: int")
+      loader = load_pytd.Loader(
+          "base", self.python_version, pythonpath=[d.path])
+      self.assertTrue(loader.import_name("foo"))
+      d.create_file("bar.pyi", "y = ... # type: str")
+      self.assertTrue(loader.import_name("bar").Lookup("bar.y"))
+
+  def test_file_added_after_indexing_shadows_stdlib(self):
+    with file_utils.Tempdir() as d:
+      loader = load_pytd.Loader(
+          "base", self.python_version, pythonpath=[d.path])
+      self.assertIsNone(loader.import_name("foo"))
+      d.create_file("textwrap.pyi", "x = ... # type: int")
+      self.assertTrue(loader.import_name("textwrap").Lookup("textwrap.x"))
+
+  def test_imports_map_directory_target(self):
+    with file_utils.Tempdir() as d:
+      foo_path = d.create_file("foo.pyi", "x = ... # type: int")
+      bar_path = d.create_directory("bar")
+      loader = load_pytd.Loader(
+          "base", self.python_version,
+          imports_map={"foo": foo_path, "bar": bar_path}, pythonpath=[""])
+      self.assertTrue(loader.import_name("foo"))
+      self.assertIsNone(loader.import_name("bar"))
+
+  def test_refresh_modified_directories(self):
+    with file_utils.Tempdir() as d:
+      d.create_file("foo.pyi", "x = ... # type: int")
+      d.create_file("pkg/baz.pyi", "z = ... # type: int")
+      loader = load_pytd.Loader(
+          "base", self.python_version, pythonpath=[d.path])
+      self.assertTrue(loader.import_name("foo"))
+      self.assertTrue(loader.import_name("pkg.baz"))
+      listings = dict(loader._directory_index._listings)  # pylint: disable=protected-access
+      self.assertIsNone(loader.import_name("bar"))
+      # Nothing was modified, so the unresolved import didn't list anything
+      # again.
+      for directory, listing in listings.items():
+        self.assertIs(loader._directory_index._listings[directory], listing)  # pylint: disable=protected-access
+
+  def test_concat_all(self):
+    with file_utils.Tempdir() as d:
+      d.create_file("foo.pyi", "x = ... # type: int")
+      d.create_file("bar.pyi", "y = ... # type: str")
+      loader = load_pytd.Loader(
+          "base", self.python_version, pythonpath=[d.path])
+      loader.import_name("foo")
+      concatenated = loader.concat_all()
+      self.assertIs(concatenated, loader.concat_all())
+      self.assertTrue(concatenated.Lookup("foo.x"))
+      loader.import_name("bar")
+      concatenated = loader.concat_all()
+      self.assertTrue(concatenated.Lookup("foo.x"))
+      self.assertTrue(concatenated.Lookup("bar.y"))
+
+  def test_lookup_all(self):
+    with file_utils.Tempdir() as d:
+      d.create_file("foo.pyi", "x = ... # type: int")
+      d.create_file("pkg/bar.pyi", "class A: ...")
+      loader = load_pytd.Loader(
+          "base", self.python_version, pythonpath=[d.path])
+      lookup = loader.lookup_all()
+      loader.import_name("foo")
+      loader.import_name("pkg.bar")
+      concatenated = loader.concat_all()
+      for name in ("foo.x", "pkg.bar.A", "__builtin__.int"):
+        self.assertIs(lookup.Lookup(name), concatenated.Lookup(name))
+      for name in ("foo.y", "pkg.A", "baz.x", "int"):
+        self.assertRaises(KeyError, lookup.Lookup, name)
+
   def test_no_init_imports_map(self):
     with file_utils.Tempdir() as d:
       d.create_directory("baz")
@@ -588,6 +660,52 @@ class PickledPyiLoaderTest(test_base.UnitTest):
       self.assertTrue(loader.import_name("foo"))
       self.assertTrue(loader.import_name("ctypes"))
 
+  def test_mmapped_builtins(self):
+    with file_utils.Tempdir() as d:
+      filename = d.create_file("builtins.store")
+      saver = load_pytd.Loader("base", self.python_version)
+      saver.import_name("datetime")
+      saver.save_to_pickle(filename, mmap_store=True)
+      loader = load_pytd.PickledPyiLoader.load_from_pickle(
+          filename, "base", python_version=self.python_version)
+      self.assertTrue(loader._modules["datetime"].needs_unpickling())  # pylint: disable=protected-access
+      self.assertTrue(loader.import_name("datetime"))
+      self.assertFalse(loader._modules["datetime"].needs_unpickling())  # pylint: disable=protected-access
+      self.assertTrue(loader.import_name("sys"))
+
+  def test_lazy_unpickling(self):
+    with file_utils.Tempdir() as d:
+      filename = d.create_file("builtins.pickle")
+      saver = load_pytd.Loader("base", self.python_version)
+      saver.import_name("datetime")
+      saver.save_to_pickle(filename)
+      loader = load_pytd.PickledPyiLoader.load_from_pickle(
+          filename, "base", python_version=self.python_version,
+          lazy_unpickling=True)
+      ast = loader.import_name("datetime")
+      # datetime uses time.struct_time, which isn't needed until we look at it.
+      self.assertTrue(loader._modules["time"].needs_unpickling())  # pylint: disable=protected-access
+      timetuple = ast.Lookup("datetime.date").Lookup("timetuple")
+      self.assertEqual(timetuple.signatures[0].return_type.cls.name,
+                       "time.struct_time")
+      self.assertFalse(loader._modules["time"].needs_unpickling())  # pylint: disable=protected-access
+
+  def test_lazy_unpickling_missing_dependency(self):
+    with file_utils.Tempdir() as d:
+      filename = d.create_file("builtins.pickle")
+      saver = load_pytd.Loader("base", self.python_version)
+      saver.import_name("datetime")
+      saver.save_to_pickle(filename)
+      loader = load_pytd.PickledPyiLoader.load_from_pickle(
+          filename, "base", python_version=self.python_version,
+          lazy_unpickling=True)
+      ast = loader.import_name("datetime")
+      del loader._modules["time"]  # pylint: disable=protected-access
+      timetuple = ast.Lookup("datetime.date").Lookup("timetuple")
+      # Like eager unpickling, we fail rather than leave the pointer unfilled.
+      with self.assertRaises(AssertionError):
+        _ = timetuple.signatures[0].return_type.cls
+
 
 if __name__ == "__main__":
   unittest.main()
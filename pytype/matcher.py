@@ -25,6 +25,9 @@ _COMPATIBLE_BUILTINS = [
     for compatible_builtin, builtin in pep484.COMPAT_ITEMS
 ]
 
+# The classes whose matches match_from_mro caches.
+_MRO_CACHEABLE = (abstract.PyTDClass, abstract.InterpreterClass)
+
 
 def _is_callback_protocol(typ):
   return (isinstance(typ, mixin.Class) and typ.is_protocol and
@@ -37,6 +40,9 @@ class AbstractMatcher(utils.VirtualMachineWeakrefMixin):
   def __init__(self, vm):
     super().__init__(vm)
     self._protocol_cache = set()
+    # (left class, other class or its name and base class, allow compat)
+    # -> match.
+    self._mro_match_cache = {}
 
   def _set_error_subst(self, subst):
     """Set the substitution used by compute_subst in the event of an error."""
@@ -140,6 +146,39 @@ class AbstractMatcher(utils.VirtualMachineWeakrefMixin):
     Returns:
       The match, if any, None otherwise.
     """
+    # The MRO of a PyTDClass or an InterpreterClass doesn't change once it has
+    # been computed, so the match only depends on the identity of the classes
+    # and on their full names. (Whoever changes the module of a class calls
+    # forget_mro_matches.) Other classes, like ParameterizedClass and
+    # LateAnnotation, compare by value or can change their hash, so they are
+    # matched from scratch.
+    if type(left) not in _MRO_CACHEABLE or "mro" not in left.__dict__:
+      return self._match_from_mro(left, other_type, allow_compat_builtins)
+    if type(other_type) in _MRO_CACHEABLE:
+      # Cheaper than computing the full name.
+      key = (left, other_type, allow_compat_builtins)
+    elif isinstance(other_type, abstract.ParameterizedClass):
+      key = (left, other_type.full_name, other_type.base_cls,
+             allow_compat_builtins)
+    else:
+      key = (left, other_type.full_name, None, allow_compat_builtins)
+    try:
+      return self._mro_match_cache[key]
+    except KeyError:
+      match = self._mro_match_cache[key] = self._match_from_mro(
+          left, other_type, allow_compat_builtins)
+      return match
+
+  def forget_mro_matches(self):
+    """Forgets the cached results of match_from_mro.
+
+    Needs to be called when the module, and hence the full name, of a class
+    changes.
+    """
+    self._mro_match_cache.clear()
+
+  def _match_from_mro(self, left, other_type, allow_compat_builtins):
+    """Does the work of match_from_mro, without caching."""
     for base in left.mro:
       if isinstance(base, abstract.ParameterizedClass):
         base_cls = base.base_cls
@@ -0,0 +1,83 @@
+"""Benchmark the cache of AbstractMatcher.match_from_mro.
+
+Builds a chain of classes on top of object and matches its most derived class
+against classes at different depths of its MRO, against an unrelated class and
+against a compatible builtin (bool against float). Every lookup is timed both
+with the cache and with the uncached _match_from_mro, which walks the MRO.
+
+Usage:
+  python -m pytype.matcher_benchmark [--depth N] [--calls N]
+"""
+
+import argparse
+import sys
+import time
+
+from pytype import abstract
+from pytype import config
+from pytype import errors
+from pytype import load_pytd
+from pytype import utils
+from pytype import vm
+
+
+def make_vm():
+  python_version = utils.full_version_from_major(3)
+  options = config.Options.create(python_version=python_version)
+  return vm.VirtualMachine(
+      errors.ErrorLog(), options, load_pytd.Loader(None, python_version))
+
+
+def make_chain(machine, depth):
+  """Creates classes C0, ..., C<depth-1>, each a subclass of the previous one."""
+  chain = [machine.convert.object_type]
+  for i in range(depth):
+    base = chain[-1].to_variable(machine.root_cfg_node)
+    chain.append(
+        abstract.InterpreterClass("C%d" % i, [base], {}, None, machine))
+  return chain
+
+
+def parse_args(args):
+  parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+  parser.add_argument("--depth", type=int, default=12,
+                      help="How many classes to stack on top of object.")
+  parser.add_argument("--calls", type=int, default=100000,
+                      help="How often to match each pair.")
+  return parser.parse_args(args)
+
+
+def main(args=None):
+  opts = parse_args(args)
+  machine = make_vm()
+  chain = make_chain(machine, opts.depth)
+  left = chain[-1]
+  primitive_classes = machine.convert.primitive_classes
+  scenarios = [
+      ("itself", left, left),
+      ("direct base", left, chain[-2]),
+      ("middle of mro", left, chain[len(chain) // 2]),
+      ("object", left, chain[0]),
+      ("unrelated", left, abstract.InterpreterClass(
+          "Unrelated", [], {}, None, machine)),
+      ("bool vs float", primitive_classes[bool], primitive_classes[float]),
+  ]
+  matcher = machine.matcher
+  print("%-16s %14s %14s" % ("other type", "uncached(us)", "cached(us)"))
+  for name, left, other_type in scenarios:
+    times = []
+    results = []
+    for match in (matcher._match_from_mro, matcher.match_from_mro):  # pylint: disable=protected-access
+      start = time.time()
+      for _ in range(opts.calls):
+        result = match(left, other_type, True)
+      times.append((time.time() - start) / opts.calls * 1e6)
+      results.append(result)
+    # The cache must not change the result.
+    assert results[0] is results[1], (name, results)
+    print("%-16s %14.3f %14.3f" % ((name,) + tuple(times)))
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
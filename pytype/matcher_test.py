@@ -276,6 +276,28 @@ class MatcherTest(test_base.UnitTest):
     right = self.vm.convert.primitive_classes[float]
     self.assertMatch(left, right)
 
+  def test_match_from_mro_cache(self):
+    left = self.vm.convert.primitive_classes[bool]
+    right = self.vm.convert.primitive_classes[float]
+    for _ in range(2):
+      self.assertIs(self.vm.matcher.match_from_mro(left, right),
+                    self.vm.convert.primitive_classes[int])
+      self.assertIsNone(self.vm.matcher.match_from_mro(
+          left, right, allow_compat_builtins=False))
+    self.assertEqual(
+        len(self.vm.matcher._mro_match_cache), 2)  # pylint: disable=protected-access
+
+  def test_match_from_mro_cache_module(self):
+    left = self._make_class("X")
+    right = self._make_class("X")
+    right.module = "foo"
+    self.assertIsNone(self.vm.matcher.match_from_mro(left, right))
+    # The module of a class can be set after we've first matched it, by code
+    # that then has to make the matcher forget its matches.
+    left.module = "foo"
+    self.vm.matcher.forget_mro_matches()
+    self.assertIs(self.vm.matcher.match_from_mro(left, right), left)
+
   def test_pytd_function_against_callable(self):
     f = self._convert("def f(x: int) -> bool: ...", "f")
     plain_callable = self._convert_type("Callable")
@@ -20,8 +20,10 @@ def bar(n):
 
 import json
 import math
+import os
 import re
 import sys
+import threading
 import time
 
 import six
@@ -81,6 +83,8 @@ _METRIC_NAME_RE = re.compile(r"^[a-zA-Z_]\w+$")
 
 _registered_metrics = {}  # Map from metric name to Metric object.
 _enabled = False  # True iff metrics should be collected.
+_trace_events = None  # A list of trace events iff a trace is being recorded.
+_trace_start_time = 0  # The time at which the trace started.
 
 
 def _validate_metric_name(name):
@@ -95,6 +99,11 @@ def _prepare_for_test(enabled=True):
   _enabled = enabled
 
 
+def is_enabled():
+  """Whether metrics are collected; metrics that aren't ignore all updates."""
+  return _enabled
+
+
 def get_cpu_clock():
   """Returns CPU clock to keep compatibilty with various Python versions."""
   if sys.version_info >= (3, 3):
@@ -124,6 +133,21 @@ def get_metric(name, constructor, *args, **kwargs):
     return constructor(name, *args, **kwargs)
 
 
+def get_metrics(prefix, metric_type=None):
+  """Return the registered metrics whose names start with prefix.
+
+  Args:
+    prefix: The prefix of the metric names.
+    metric_type: If given, only return metrics of this class.
+
+  Returns:
+    A dict of metric names to metrics.
+  """
+  return {name: metric for name, metric in _registered_metrics.items()
+          if name.startswith(prefix) and
+          (metric_type is None or isinstance(metric, metric_type))}
+
+
 def get_report():
   """Return a string listing all metrics, one per line."""
   lines = [str(_registered_metrics[n]) + "\n"
@@ -131,6 +155,12 @@ def get_report():
   return "".join(lines)
 
 
+def reset_all():
+  """Discard the data of all registered metrics, e.g. between two analyses."""
+  for metric in _registered_metrics.values():
+    metric._reset()  # pylint: disable=protected-access
+
+
 def merge_from_file(metrics_file):
   """Merge metrics recorded in another file into the current metrics."""
   for metric in load_all(metrics_file):
@@ -173,6 +203,10 @@ class Metric:
     """Merge data from another metric of the same type."""
     raise NotImplementedError
 
+  def _reset(self):
+    """Discard the data collected so far."""
+    raise NotImplementedError
+
   def __str__(self):
     return "%s: %s" % (self._name, self._summary())
 
@@ -192,6 +226,10 @@ class Counter(Metric):
       return
     self._total += count
 
+  @property
+  def total(self):
+    return self._total
+
   def _summary(self):
     return str(self._total)
 
@@ -199,6 +237,9 @@ class Counter(Metric):
     # pylint: disable=protected-access
     self._total += other._total
 
+  def _reset(self):
+    self._total = 0
+
 
 class StopWatch(Metric):
   """A counter that measures the time spent in a "with" statement."""
@@ -210,6 +251,10 @@ class StopWatch(Metric):
     self._total = get_cpu_clock() - self._start_time
     del self._start_time
 
+  @property
+  def total(self):
+    return self._total
+
   def _summary(self):
     return "%f seconds" % self._total
 
@@ -217,6 +262,9 @@ class StopWatch(Metric):
     # pylint: disable=protected-access
     self._total += other._total
 
+  def _reset(self):
+    self._total = 0
+
 
 class ReentrantStopWatch(Metric):
   """A watch that supports being called multiple times and recursively."""
@@ -225,21 +273,29 @@ class ReentrantStopWatch(Metric):
     super().__init__(name)
     self._time = 0
     self._calls = 0
+    self._start_time = None
 
   def __enter__(self):
-    if not self._calls:
+    if not self._calls and _enabled:
       self._start_time = get_cpu_clock()
     self._calls += 1
 
   def __exit__(self, exc_type, exc_value, traceback):
     self._calls -= 1
-    if not self._calls:
+    if not self._calls and self._start_time is not None:
       self._time += get_cpu_clock() - self._start_time
-      del self._start_time
+      self._start_time = None
+
+  @property
+  def total(self):
+    return self._time
 
   def _merge(self, other):
     self._time += other._time  # pylint: disable=protected-access
 
+  def _reset(self):
+    self._time = 0
+
   def _summary(self):
     return "time spend below this StopWatch: %s" % self._time
 
@@ -269,6 +325,14 @@ class MapCounter(Metric):
     self._counts[key] = self._counts.get(key, 0) + count
     self._total += count
 
+  @property
+  def counts(self):
+    return self._counts
+
+  @property
+  def total(self):
+    return self._total
+
   def _summary(self):
     details = ", ".join(["%s=%d" % (k, self._counts[k])
                          for k in sorted(self._counts)])
@@ -280,6 +344,10 @@ class MapCounter(Metric):
       self._counts[key] = self._counts.get(key, 0) + count
       self._total += count
 
+  def _reset(self):
+    self._counts = {}
+    self._total = 0
+
 
 class Distribution(Metric):
   """A metric to track simple statistics from a distribution of values."""
@@ -306,6 +374,14 @@ class Distribution(Metric):
       self._min = min(self._min, value)
       self._max = max(self._max, value)
 
+  @property
+  def count(self):
+    return self._count
+
+  @property
+  def total(self):
+    return self._total
+
   def _mean(self):
     if self._count:
       return self._total / float(self._count)
@@ -340,6 +416,13 @@ class Distribution(Metric):
       self._min = min(self._min, other._min)
       self._max = max(self._max, other._max)
 
+  def _reset(self):
+    self._count = 0
+    self._total = 0.0
+    self._squared = 0.0
+    self._min = None
+    self._max = None
+
 
 class Snapshot(Metric):
   """A metric to track memory usage via tracemalloc snapshots."""
@@ -403,26 +486,79 @@ class Snapshot(Metric):
   def _summary(self):
     return "\n\n".join(self.snapshots)
 
+  def _reset(self):
+    self.snapshots = []
+
+
+class TraceSpan:
+  """A context manager that records a span of time in the trace.
+
+  Spans are only recorded inside a TraceContext, which writes them out in the
+  Chrome trace event format, for viewing in chrome://tracing or Perfetto.
+  Spans nest, so they should be closed in the reverse order in which they were
+  opened, as is natural for "with" statements.
+  """
+
+  def __init__(self, name, category, **args):
+    """Initialize.
+
+    Args:
+      name: The name of the span, e.g. the module or function being processed.
+      category: The kind of work the span covers, e.g. "import" or "compile".
+      **args: Details that are shown when the span is selected in the viewer.
+    """
+    self._name = name
+    self._category = category
+    self._args = args
+    self._events = None  # Set in __enter__ if we're tracing.
+
+  def _add_event(self, phase):
+    event = {
+        "name": self._name,
+        "cat": self._category,
+        "ph": phase,
+        "ts": (time.time() - _trace_start_time) * 1e6,
+        "pid": os.getpid(),
+        "tid": threading.get_ident(),
+    }
+    if phase == "B" and self._args:
+      event["args"] = self._args
+    self._events.append(event)
+
+  def __enter__(self):
+    if _trace_events is not None:
+      self._events = _trace_events
+      self._add_event("B")
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    if self._events is not None:
+      self._add_event("E")
+      self._events = None
+
 
 class MetricsContext:
   """A context manager that configures metrics and writes their output."""
 
-  def __init__(self, output_path, open_function=open):
+  def __init__(self, output_path, open_function=open, enabled=False):
     """Initialize.
 
     Args:
       output_path: The path for the metrics data.  If empty, no metrics are
-          collected.
+          collected unless enabled is set.
       open_function: A custom file opening function.
+      enabled: Whether to collect metrics even if there is no output path,
+          e.g. for a report that is written in some other way.
     """
     self._output_path = output_path
+    self._enabled = enabled or bool(output_path)
     self._open_function = open_function
     self._old_enabled = None  # Set in __enter__.
 
   def __enter__(self):
     global _enabled
     self._old_enabled = _enabled
-    _enabled = bool(self._output_path)
+    _enabled = self._enabled
 
   def __exit__(self, exc_type, exc_value, traceback):
     global _enabled
@@ -430,3 +566,34 @@ class MetricsContext:
     if self._output_path:
       with self._open_function(self._output_path, "w") as f:
         dump_all(_registered_metrics.values(), f)
+
+
+class TraceContext:
+  """A context manager that records TraceSpans and writes them to a file."""
+
+  def __init__(self, output_path, open_function=open):
+    """Initialize.
+
+    Args:
+      output_path: The path for the trace, a json file in the Chrome trace
+          event format.  If empty, no trace is recorded.
+      open_function: A custom file opening function.
+    """
+    self._output_path = output_path
+    self._open_function = open_function
+    self._old_state = None  # Set in __enter__.
+
+  def __enter__(self):
+    global _trace_events, _trace_start_time
+    self._old_state = (_trace_events, _trace_start_time)
+    if self._output_path:
+      _trace_events = []
+      _trace_start_time = time.time()
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    global _trace_events, _trace_start_time
+    events = _trace_events
+    _trace_events, _trace_start_time = self._old_state
+    if self._output_path:
+      with self._open_function(self._output_path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
@@ -1,10 +1,13 @@
 """Test errors.py."""
 
 import io
+import json
 import math
+import os
 import tempfile
 import time
 
+from pytype import file_utils
 from pytype import metrics
 
 import unittest
@@ -57,6 +60,10 @@ class MetricsTest(unittest.TestCase):
     c = metrics.Counter("foo")
     c.inc()
     self.assertEqual(0, c._total)
+    self.assertFalse(metrics.is_enabled())
+
+  def test_enabled(self):
+    self.assertTrue(metrics.is_enabled())
 
   def test_merge_from(self):
     # Create a counter, increment it, and dump it.
@@ -81,6 +88,18 @@ class MetricsTest(unittest.TestCase):
     dump.seek(0)
     self.assertRaises(TypeError, metrics.merge_from_file, dump)
 
+  def test_reset_all(self):
+    c = metrics.Counter("foo")
+    m = metrics.MapCounter("bar")
+    d = metrics.Distribution("baz")
+    c.inc(2)
+    m.inc("x")
+    d.add(3)
+    metrics.reset_all()
+    self.assertEqual("foo: 0", str(c))
+    self.assertEqual({}, m.counts)
+    self.assertEqual(0, d.count)
+
   def test_get_metric(self):
     c1 = metrics.get_metric("foo", metrics.Counter)
     self.assertIsInstance(c1, metrics.Counter)
@@ -89,6 +108,11 @@ class MetricsTest(unittest.TestCase):
 
 
 class ReentrantStopWatchTest(unittest.TestCase):
+  """Tests for ReentrantStopWatch."""
+
+  def setUp(self):
+    super().setUp()
+    metrics._prepare_for_test()
 
   def test_reentrant_stop_watch(self):
     c = metrics.ReentrantStopWatch("watch1")
@@ -113,6 +137,14 @@ class ReentrantStopWatchTest(unittest.TestCase):
     d._merge(c)
     self.assertLess(abs(t1+t2-d._time), 0.000001)
 
+  def test_disabled(self):
+    metrics._prepare_for_test(enabled=False)
+    c = metrics.ReentrantStopWatch("watch4")
+    with c:
+      with c:
+        time.sleep(0.01)
+    self.assertEqual(0, c._time)
+
 
 class StopWatchTest(unittest.TestCase):
   """Tests for StopWatch."""
@@ -313,5 +345,30 @@ class MetricsContextTest(unittest.TestCase):
     self.assertEqual(0, self._counter._total)
 
 
+class TraceContextTest(unittest.TestCase):
+  """Tests for TraceContext and TraceSpan."""
+
+  def test_enabled(self):
+    with file_utils.Tempdir() as d:
+      filename = os.path.join(d.path, "trace.json")
+      with metrics.TraceContext(filename):
+        with metrics.TraceSpan("foo", "import", path="foo.pyi"):
+          with metrics.TraceSpan("bar", "compile"):
+            pass
+      with open(filename) as f:
+        events = json.load(f)["traceEvents"]
+    self.assertEqual([(e["name"], e["cat"], e["ph"]) for e in events],
+                     [("foo", "import", "B"), ("bar", "compile", "B"),
+                      ("bar", "compile", "E"), ("foo", "import", "E")])
+    self.assertEqual(events[0]["args"], {"path": "foo.pyi"})
+    timestamps = [e["ts"] for e in events]
+    self.assertEqual(timestamps, sorted(timestamps))
+
+  def test_disabled(self):
+    with metrics.TraceContext(""):
+      with metrics.TraceSpan("foo", "import"):
+        self.assertIsNone(metrics._trace_events)
+
+
 if __name__ == "__main__":
   unittest.main()
@@ -35,7 +35,9 @@ class TypingExtensionsOverlay(overlay.Overlay):
       # Pretending that the backports are in typing is easier than remembering
       # to check for both typing.X and typing_extensions.X every time we match
       # on an abstract value.
-      val.module = "typing"
+      if val.module != "typing":
+        val.module = "typing"
+        self.vm.matcher.forget_mro_matches()
     return var
 
 
@@ -86,13 +86,70 @@ def compile_src_to_pyc(src, filename, output, mode):
     write_pyc(output, codeobject)
 
 
+class _Buffer(object):
+  """Collects the output of compile_src_to_pyc."""
+
+  def __init__(self):
+    self.chunks = []
+
+  def write(self, data):
+    self.chunks.append(bytes(data))
+
+  def getvalue(self):
+    return b"".join(self.chunks)
+
+
+def _read_field(fi):
+  line = fi.readline()
+  if not line:
+    return None
+  return fi.read(int(line))
+
+
+def _write_field(fo, data):
+  fo.write(("%d\n" % len(data)).encode("ascii"))
+  fo.write(data)
+
+
+def _to_str(data):
+  return data if sys.version_info[0] == 2 else data.decode("utf-8")
+
+
+def serve(fi, fo):
+  """Compile requests read from fi until EOF, and write the results to fo.
+
+  A request consists of a filename, a mode and the source code, and the
+  response is the output of compile_src_to_pyc. Every field is sent as its
+  length in bytes on a line of its own, followed by the utf-8 encoded data.
+
+  Args:
+    fi: A binary file to read requests from.
+    fo: A binary file to write responses to.
+  """
+  while True:
+    filename = _read_field(fi)
+    if filename is None:
+      return
+    mode = _read_field(fi)
+    src = _read_field(fi)
+    output = _Buffer()
+    compile_src_to_pyc(
+        src.decode("utf-8"), _to_str(filename), output, _to_str(mode))
+    _write_field(fo, output.getvalue())
+    fo.flush()
+
+
 def main():
-  if len(sys.argv) != 4:
-    sys.exit(1)
   # TODO(b/31819797): Remove the pytype disable and enable.
   # pytype: disable=attribute-error
+  stdin = sys.stdin.buffer if hasattr(sys.stdin, "buffer") else sys.stdin
   output = sys.stdout.buffer if hasattr(sys.stdout, "buffer") else sys.stdout
   # pytype: enable=attribute-error
+  if sys.argv[1:] == ["--server"]:
+    serve(stdin, output)
+    return
+  if len(sys.argv) != 4:
+    sys.exit(1)
   compile_to_pyc(data_file=sys.argv[1], filename=sys.argv[2],
                  output=output, mode=sys.argv[3])
 
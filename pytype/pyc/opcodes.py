@@ -22,6 +22,7 @@ NO_NEXT = 512  # doesn't execute the following opcode
 STORE_JUMP = 1024  # only stores a jump, doesn't actually execute it
 PUSHES_BLOCK = 2048  # starts a block (while, try, finally, with, etc.)
 POPS_BLOCK = 4096  # ends a block
+IS_IMPORT = 8192  # part of an import statement
 
 
 class Opcode:
@@ -127,6 +128,10 @@ class Opcode:
   def pops_block(cls):
     return bool(cls.FLAGS & POPS_BLOCK)
 
+  @classmethod
+  def is_import(cls):
+    return bool(cls.FLAGS & IS_IMPORT)
+
   @classmethod
   def has_arg(cls):
     return False
@@ -486,6 +491,7 @@ class RETURN_VALUE(Opcode):
 
 
 class IMPORT_STAR(Opcode):
+  FLAGS = IS_IMPORT
   __slots__ = ()
 
 
@@ -617,12 +623,12 @@ class COMPARE_OP(OpcodeWithArg):  # Arg: Comparison operator
 
 
 class IMPORT_NAME(OpcodeWithArg):  # Arg: Index in name list
-  FLAGS = HAS_NAME|HAS_ARGUMENT|HAS_JUNKNOWN
+  FLAGS = HAS_NAME|HAS_ARGUMENT|HAS_JUNKNOWN|IS_IMPORT
   __slots__ = ()
 
 
 class IMPORT_FROM(OpcodeWithArg):  # Arg: Index in name list
-  FLAGS = HAS_NAME|HAS_ARGUMENT
+  FLAGS = HAS_NAME|HAS_ARGUMENT|IS_IMPORT
   __slots__ = ()
 
 
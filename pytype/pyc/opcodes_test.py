@@ -95,6 +95,14 @@ class CommonTest(_TestBase):
     ]
     self.assertDisassembly(code, expected)
 
+  def test_is_import(self):
+    import_name, import_from, import_star, pop_top = self.dis(
+        [0x6c, 0, 0, 0x6d, 0, 0, 0x54, 0x01])
+    self.assertTrue(import_name.is_import())
+    self.assertTrue(import_from.is_import())
+    self.assertTrue(import_star.is_import())
+    self.assertFalse(pop_top.is_import())
+
 
 class CommonUnder3Test(CommonTest):
   """Test the common bytecodes using Python 3.5."""
@@ -1,6 +1,9 @@
 """Functions for generating, reading and parsing pyc."""
 
+import atexit
+import collections
 import copy
+import hashlib
 import os
 import re
 import subprocess
@@ -8,6 +11,7 @@ import tempfile
 from typing import List, Tuple
 
 from pytype import compat
+from pytype import file_utils
 from pytype import pytype_source_utils
 from pytype import utils
 from pytype.pyc import compile_bytecode
@@ -36,14 +40,148 @@ class CompileError(Exception):
       self.lineno = 1
 
 
+class _CompileServer:
+  """A long-lived process that compiles source code for a target version.
+
+  Starting an interpreter for every compilation is expensive, so we start one
+  per target interpreter and send it compile requests over a pipe. See
+  compile_bytecode.serve for the protocol.
+  """
+
+  def __init__(self, python_exe):
+    exe, flags = python_exe
+    compile_script_src = pytype_source_utils.load_pytype_file(COMPILE_SCRIPT)
+    # We pass -E to ignore the environment so that PYTHONPATH and
+    # sitecustomize on some people's systems don't mess with the interpreter.
+    cmd = exe + flags + [
+        "-E", "-c", compile_script_src.decode("utf-8"), "--server"]
+    self._process = subprocess.Popen(
+        cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+  def compile(self, src, filename, mode):
+    """Compile src. Returns the output of compile_bytecode.compile_src_to_pyc."""
+    for field in (filename, mode, src):
+      data = field.encode("utf-8")
+      self._process.stdin.write(b"%d\n" % len(data))
+      self._process.stdin.write(data)
+    self._process.stdin.flush()
+    line = self._process.stdout.readline()
+    if not line:
+      raise IOError("Compile server failed")
+    return self._process.stdout.read(int(line))
+
+  def close(self):
+    self._process.stdin.close()
+    self._process.wait()
+    self._process.stdout.close()
+
+
+# Compile servers, keyed by interpreter command line.
+_compile_servers = {}
+
+# Compiler output from this process, keyed by _get_cache_key. Only the most
+# recently used entries are kept, so that a long-running process doesn't hold on
+# to the bytecode of every source it has ever compiled.
+_bytecode_cache = collections.OrderedDict()
+_BYTECODE_CACHE_SIZE = 64
+
+
+def forget_compile_servers():
+  """Forget the compile servers, e.g. the ones inherited from a parent process.
+
+  A forked process shares the pipes of its parent's compile servers. It has to
+  start its own servers, since concurrent requests on the same pipe would
+  interleave.
+  """
+  _compile_servers.clear()
+
+
+def _get_compile_server(python_exe):
+  exe, flags = python_exe
+  key = (tuple(exe), tuple(flags))
+  if key not in _compile_servers:
+    server = _compile_servers[key] = _CompileServer(python_exe)
+    atexit.register(server.close)
+  return _compile_servers[key]
+
+
+def _compile_in_subprocess(src, filename, python_exe, mode):
+  """Compile src with a compile server for python_exe."""
+  server = _get_compile_server(python_exe)
+  try:
+    return server.compile(src, filename, mode)
+  except IOError:
+    # Start a new server next time.
+    exe, flags = python_exe
+    del _compile_servers[(tuple(exe), tuple(flags))]
+    raise
+
+
+def _get_cache_key(src, filename, python_version, python_exe, mode):
+  h = hashlib.sha256()
+  for s in (utils.format_version(python_version), repr(python_exe), mode,
+            filename or "", src):
+    h.update(s.encode("utf-8"))
+    h.update(b"\0")
+  return h.hexdigest()
+
+
+def _get_cache_path(cache_dir, key):
+  return os.path.join(cache_dir, "bytecode", key[:2], key)
+
+
+def _load_cached_bytecode(cache_dir, key):
+  try:
+    with open(_get_cache_path(cache_dir, key), "rb") as f:
+      return f.read()
+  except IOError:
+    return None
+
+
+def _store_cached_bytecode(cache_dir, key, bytecode):
+  path = _get_cache_path(cache_dir, key)
+  file_utils.makedirs(os.path.dirname(path))
+  # Write to a temporary file first, so that concurrent pytype processes never
+  # see a partially written entry.
+  fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+  with os.fdopen(fd, "wb") as f:
+    f.write(bytecode)
+  os.replace(tmp, path)
+
+
+def _compile(src, filename, python_version, python_exe, mode, cache_dir):
+  """Compile src, returning the output of compile_src_to_pyc."""
+  key = _get_cache_key(src, filename, python_version, python_exe, mode)
+  if key in _bytecode_cache:
+    _bytecode_cache.move_to_end(key)
+    return _bytecode_cache[key]
+  if utils.can_compile_bytecode_natively(python_version):
+    output = six.BytesIO()
+    compile_bytecode.compile_src_to_pyc(src, filename or "<>", output, mode)
+    bytecode = output.getvalue()
+  else:
+    # Compiling for a different Python version from the one we're running
+    # under needs an external process, which is slow enough that it is worth
+    # caching the result across runs.
+    bytecode = cache_dir and _load_cached_bytecode(cache_dir, key)
+    if not bytecode:
+      bytecode = _compile_in_subprocess(src, filename or "<>", python_exe, mode)
+      if cache_dir:
+        _store_cached_bytecode(cache_dir, key, bytecode)
+  _bytecode_cache[key] = bytecode
+  if len(_bytecode_cache) > _BYTECODE_CACHE_SIZE:
+    _bytecode_cache.popitem(last=False)
+  return bytecode
+
+
 def compile_src_string_to_pyc_string(
     src, filename, python_version, python_exe: Tuple[List[str], List[str]],
-    mode="exec"):
+    mode="exec", cache_dir=None):
   """Compile Python source code to pyc data.
 
   This may use py_compile if the src is for the same version as we're running,
-  or else it spawns an external process to produce a .pyc file. The generated
-  bytecode (.pyc file) is read and both it and any temporary files are deleted.
+  or else it sends the src to a long-lived external process to compile it.
+  Results are cached in memory, and also on disk if cache_dir is given.
 
   Args:
     src: Python sourcecode
@@ -53,6 +191,8 @@ def compile_src_string_to_pyc_string(
     mode: Same as __builtin__.compile: "exec" if source consists of a
       sequence of statements, "eval" if it consists of a single expression,
       or "single" if it consists of a single interactive statement.
+    cache_dir: Optionally, a directory in which to cache bytecode compiled by
+      an external process.
 
   Returns:
     The compiled pyc file as a binary string.
@@ -60,38 +200,8 @@ def compile_src_string_to_pyc_string(
     CompileError: If we find a syntax error in the file.
     IOError: If our compile script failed.
   """
-
-  if utils.can_compile_bytecode_natively(python_version):
-    output = six.BytesIO()
-    compile_bytecode.compile_src_to_pyc(src, filename or "<>", output, mode)
-    bytecode = output.getvalue()
-  else:
-    tempfile_options = {"mode": "w", "suffix": ".py", "delete": False}
-    if six.PY3:
-      tempfile_options.update({"encoding": "utf-8"})
-    else:
-      tempfile_options.update({"mode": "wb"})
-    fi = tempfile.NamedTemporaryFile(**tempfile_options)
-    try:
-      if six.PY3:
-        fi.write(src)
-      else:
-        fi.write(src.encode("utf-8"))
-      fi.close()
-      # In order to be able to compile pyc files for a different Python version
-      # from the one we're running under, we spawn an external process.
-      # We pass -E to ignore the environment so that PYTHONPATH and
-      # sitecustomize on some people's systems don't mess with the interpreter.
-      exe, flags = python_exe
-      cmd = exe + flags + ["-E", "-", fi.name, filename or fi.name, mode]
-
-      compile_script_src = pytype_source_utils.load_pytype_file(COMPILE_SCRIPT)
-
-      p = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
-      bytecode, _ = p.communicate(compile_script_src)
-      assert p.poll() == 0, "Child process failed"
-    finally:
-      os.unlink(fi.name)
+  bytecode = _compile(src, filename, python_version, python_exe, mode,
+                      cache_dir)
   first_byte = six.indexbytes(bytecode, 0)
   if first_byte == 0:  # compile OK
     return bytecode[1:]
@@ -149,7 +259,8 @@ class AdjustFilename:
     return code
 
 
-def compile_src(src, filename, python_version, python_exe, mode="exec"):
+def compile_src(src, filename, python_version, python_exe, mode="exec",
+                cache_dir=None):
   """Compile a string to pyc, and then load and parse the pyc.
 
   Args:
@@ -158,6 +269,7 @@ def compile_src(src, filename, python_version, python_exe, mode="exec"):
     python_version: Python version, (major, minor).
     python_exe: Tuple of the path to Python interpreter and command-line flags.
     mode: "exec", "eval" or "single".
+    cache_dir: Optionally, a directory in which to cache compiled bytecode.
 
   Returns:
     An instance of loadmarshal.CodeType.
@@ -166,7 +278,7 @@ def compile_src(src, filename, python_version, python_exe, mode="exec"):
     UsageError: If python_exe and python_version are mismatched.
   """
   pyc_data = compile_src_string_to_pyc_string(
-      src, filename, python_version, python_exe, mode)
+      src, filename, python_version, python_exe, mode, cache_dir)
   code = parse_pyc_string(pyc_data)
   if code.python_version != python_version:
     raise utils.UsageError(
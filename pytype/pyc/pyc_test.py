@@ -1,6 +1,9 @@
 # coding=utf8
 """Tests for pyc.py."""
 
+import sys
+
+from pytype import file_utils
 from pytype.pyc import opcodes
 from pytype.pyc import pyc
 from pytype.tests import test_base
@@ -23,6 +26,65 @@ class TestCompileError(unittest.TestCase):
     self.assertEqual("some error in foo.py at line 123", e.error)
 
 
+class TestCompileServer(unittest.TestCase):
+  """Tests for compiling in a subprocess."""
+
+  def setUp(self):
+    super().setUp()
+    self.server = pyc._CompileServer(([sys.executable], []))  # pylint: disable=protected-access
+
+  def tearDown(self):
+    super().tearDown()
+    self.server.close()
+
+  def test_compile(self):
+    for _ in range(2):
+      output = self.server.compile("x = 1\n", "foo.py", "exec")
+      self.assertEqual(six.indexbytes(output, 0), 0)
+
+  def test_error(self):
+    output = self.server.compile("x = \n", "foo.py", "exec")
+    self.assertEqual(six.indexbytes(output, 0), 1)
+    self.assertIn(b"foo.py", output)
+
+  def test_utf8(self):
+    output = self.server.compile(u"x = 'ö'\n", "foo.py", "exec")
+    self.assertEqual(six.indexbytes(output, 0), 0)
+
+
+class TestBytecodeCache(unittest.TestCase):
+  """Tests for caching compiled bytecode."""
+
+  def test_cache_dir(self):
+    # Pick a version that can't be compiled natively, with a python_exe that
+    # would fail if we tried to run it.
+    python_version = (3, 6) if sys.version_info[:2] == (3, 7) else (3, 7)
+    python_exe = (["false"], [])
+    key = pyc._get_cache_key(  # pylint: disable=protected-access
+        "x = 1", "foo.py", python_version, python_exe, "exec")
+    with file_utils.Tempdir() as d:
+      pyc._store_cached_bytecode(d.path, key, b"\0data")  # pylint: disable=protected-access
+      pyc_data = pyc.compile_src_string_to_pyc_string(
+          "x = 1", "foo.py", python_version, python_exe, cache_dir=d.path)
+    self.assertEqual(pyc_data, b"data")
+
+  def test_bounded(self):
+    python_version = (3, 6) if sys.version_info[:2] == (3, 7) else (3, 7)
+    python_exe = (["false"], [])
+    size = pyc._BYTECODE_CACHE_SIZE  # pylint: disable=protected-access
+    srcs = ["x = %d" % i for i in range(size + 1)]
+    keys = [pyc._get_cache_key(  # pylint: disable=protected-access
+        src, "foo.py", python_version, python_exe, "exec") for src in srcs]
+    with file_utils.Tempdir() as d:
+      for src, key in zip(srcs, keys):
+        pyc._store_cached_bytecode(d.path, key, b"\0data")  # pylint: disable=protected-access
+        pyc.compile_src_string_to_pyc_string(
+            src, "foo.py", python_version, python_exe, cache_dir=d.path)
+    self.assertLessEqual(len(pyc._bytecode_cache), size)  # pylint: disable=protected-access
+    self.assertNotIn(keys[0], pyc._bytecode_cache)  # pylint: disable=protected-access
+    self.assertIn(keys[-1], pyc._bytecode_cache)  # pylint: disable=protected-access
+
+
 class TestPyc(test_base.UnitTest):
   """Tests for pyc.py."""
 
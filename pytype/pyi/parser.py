@@ -455,7 +455,9 @@ class _Parser:
 
     # Typeshed files that explicitly import and refer to "builtins" need to have
     # that rewritten to __builtin__
-    return ast.Visit(visitors.RenameBuiltinsPrefix())
+    ast = ast.Visit(visitors.RenameBuiltinsPrefix())
+    # Names are final now, so we can share them with all other modules.
+    return ast.Visit(visitors.InternStrings())
 
   def _build_type_decl_unit(self, defs):
     """Return a pytd.TypeDeclUnit for the given defs (plus parser state)."""
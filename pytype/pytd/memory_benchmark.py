@@ -0,0 +1,132 @@
+"""Measure the memory used by pytd trees.
+
+Loads the builtins and every typeshed module into a load_pytd.Loader and
+reports the number of nodes, how many of the strings in them are distinct
+objects, and the memory allocated while loading, as measured by tracemalloc.
+It also reports how long it takes to rebuild every node of the loaded modules
+the way visitors build nodes, which is what most of the time spent on
+constructing nodes goes to.
+
+Usage:
+  python -m pytype.pytd.memory_benchmark [--python_version 3.7]
+"""
+
+import argparse
+import resource
+import sys
+import time
+import tracemalloc
+
+from pytype import load_pytd
+from pytype import utils
+from pytype.pytd import pytd
+from pytype.pytd import typeshed
+from pytype.pytd import visitors
+
+
+def load_all(python_version):
+  """Loads the builtins and all typeshed modules.
+
+  Args:
+    python_version: The Python version, as a tuple.
+
+  Returns:
+    The loader.
+  """
+  loader = load_pytd.Loader(None, python_version)
+  names = typeshed.Typeshed().get_all_module_names(python_version)
+  for name in sorted(names):
+    try:
+      loader.import_name(name)
+    except Exception as e:  # pylint: disable=broad-except
+      print("Skipping %s: %s" % (name, e), file=sys.stderr)
+  return loader
+
+
+def count(loader):
+  """Counts nodes and strings in the loaded modules.
+
+  Args:
+    loader: The loader.
+
+  Returns:
+    A tuple of the number of nodes, the number of string references, the number
+    of distinct string objects and the number of distinct string values.
+  """
+  seen = set()
+  num_nodes = 0
+  num_strings = 0
+  string_ids = set()
+  string_values = set()
+  stack = [m.ast for m in loader.get_resolved_modules().values()]
+  while stack:
+    value = stack.pop()
+    if isinstance(value, str):
+      num_strings += 1
+      string_ids.add(id(value))
+      string_values.add(value)
+    elif isinstance(value, tuple):
+      if id(value) in seen:
+        continue
+      seen.add(id(value))
+      if value.__class__ is not tuple:
+        num_nodes += 1
+      stack.extend(value)
+  return num_nodes, num_strings, len(string_ids), len(string_values)
+
+
+class _Rebuild(visitors.Visitor):
+  """Constructs a copy of every node, like a visitor that changes all nodes."""
+
+  visits_all_node_types = True
+
+  def Visit(self, node):
+    if isinstance(node, (pytd.ClassType, pytd.FunctionType)):
+      return node
+    return node.__class__(*node)
+
+
+def rebuild(loader):
+  """Rebuilds the loaded modules and returns how long that took."""
+  asts = [m.ast for m in loader.get_resolved_modules().values()]
+  start = time.time()
+  for ast in asts:
+    ast.Visit(_Rebuild())
+  return time.time() - start
+
+
+def parse_args(args):
+  parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+  parser.add_argument("--python_version", type=str, default="%d.%d" % (
+      sys.version_info[:2]), help="Python version of the stubs, e.g. 3.7.")
+  return parser.parse_args(args)
+
+
+def main(args=None):
+  opts = parse_args(args)
+  python_version = utils.version_from_string(opts.python_version)
+  tracemalloc.start()
+  start = time.time()
+  loader = load_all(python_version)
+  elapsed = time.time() - start
+  current, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  num_nodes, num_strings, num_string_objects, num_string_values = count(
+      loader)
+  rebuild_time = rebuild(loader)
+  print("modules:        %d" % len(loader.get_resolved_modules()))
+  print("load time:      %.2fs" % elapsed)
+  print("nodes:          %d" % num_nodes)
+  print("rebuild time:   %.2fs" % rebuild_time)
+  print("strings:        %d references, %d objects, %d values" % (
+      num_strings, num_string_objects, num_string_values))
+  print("allocated:      %.1f MiB (peak %.1f MiB)" % (
+      current / 2.0**20, peak / 2.0**20))
+  # ru_maxrss is in KiB on Linux.
+  print("max RSS:        %.1f MiB" % (
+      resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2.0**10))
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -35,6 +35,11 @@ The Node "class" differs from namedtuple in the following ways:
 2.) Visitor interface. See documentation of Visit() below.
 3.) Subclassed __str__ function that uses the current class name instead of
     the name of the tuple this class is based on.
+4.) String children are interned when a node is unpickled. The same names
+    (e.g. "__builtin__.int") appear in many nodes and in every module, so this
+    saves a lot of memory. (The parser interns them, too, see
+    visitors.InternStrings.) Nodes built in any other way, e.g. by visitors, are
+    created by the plain namedtuple constructor.
 
 If a subclass chooses to use a __dict__ the default equality will only apply
 to the class attributes defined as Node args. Therefore
@@ -45,6 +50,8 @@ functionalities to be made part of collections.namedtuple.
 """
 
 import collections
+import copyreg
+import sys
 
 from pytype import metrics
 from pytype.pytd.parse import preconditions
@@ -58,6 +65,18 @@ def SetCheckPreconditions(enabled):
   _CHECK_PRECONDITIONS = enabled
 
 
+def SetProfileVisitors(enabled):
+  """Record which nodes each visitor walks, see GetVisitorProfile()."""
+  global _visit_node
+  _visit_node = _ProfiledVisitNode if enabled else _VisitNode
+
+
+def _NewInterned(cls, *args):
+  """Unpickles a node, interning its string children."""
+  return cls.__new__(cls, *[sys.intern(arg) if arg.__class__ is str else arg
+                            for arg in args])
+
+
 def Node(*child_names):
   """Create a new Node class.
 
@@ -85,6 +104,15 @@ def Node(*child_names):
 
     _CHECKER = preconditions.CallChecker(precondition_pairs)
 
+    def __reduce_ex__(self, protocol):
+      reduced = super().__reduce_ex__(protocol)
+      # Unpickle through _NewInterned instead of calling cls.__new__ directly,
+      # if there is anything to intern.
+      if reduced[0] is copyreg.__newobj__ and any(
+          child.__class__ is str for child in self):
+        reduced = (_NewInterned,) + reduced[1:]
+      return reduced
+
     def __init__(self, *args, **kwargs):
       if _CHECK_PRECONDITIONS:
         self._CHECKER.check(*args, **kwargs)
@@ -222,7 +250,7 @@ def _Visit(node, visitor, *args, **kwargs):
 
   start = metrics.get_cpu_clock()
   try:
-    return _VisitNode(node, visitor, *args, **kwargs)
+    return _visit_node(node, visitor, *args, **kwargs)
   finally:
     if not recursive:
       _visiting.remove(name)
@@ -233,6 +261,30 @@ def _Visit(node, visitor, *args, **kwargs):
             "visit_nested_" + name, metrics.Distribution).add(elapsed)
 
 
+def _VisitChildren(node, visitor, *args, **kwargs):
+  """Visit the children of a node.
+
+  Args:
+    node: A Node or tuple.
+    visitor: The visitor to apply.
+    *args: Passed to visitor callbacks.
+    **kwargs: Passed to visitor callbacks.
+
+  Returns:
+    A list of the transformed children, or None if no child changed. The list is
+    only allocated once a child changes.
+  """
+  new_children = None
+  for i, child in enumerate(node):
+    new_child = _visit_node(child, visitor, *args, **kwargs)
+    if new_children is not None:
+      new_children.append(new_child)
+    elif new_child is not child:
+      new_children = list(node[:i])
+      new_children.append(new_child)
+  return new_children
+
+
 def _VisitNode(node, visitor, *args, **kwargs):
   """Transform a node and all its children using a visitor.
 
@@ -270,14 +322,8 @@ def _VisitNode(node, visitor, *args, **kwargs):
   if node_class is tuple:
     # Exact comparison for tuple, because classes deriving from tuple
     # (like namedtuple) have different constructor arguments.
-    changed = False
-    new_children = []
-    for child in node:
-      new_child = _VisitNode(child, visitor, *args, **kwargs)
-      if new_child is not child:
-        changed = True
-      new_children.append(new_child)
-    if changed:
+    new_children = _VisitChildren(node, visitor, *args, **kwargs)
+    if new_children is not None:
       # Since some of our children changed, instantiate a new node.
       return node_class(new_children)
     else:
@@ -303,14 +349,8 @@ def _VisitNode(node, visitor, *args, **kwargs):
     # Any other value returned from Enter is ignored, so check:
     assert status is None, repr((node_class_name, status))
 
-  changed = False
-  new_children = []
-  for child in node:
-    new_child = _VisitNode(child, visitor, *args, **kwargs)
-    if new_child is not child:
-      changed = True
-    new_children.append(new_child)
-  if changed:
+  new_children = _VisitChildren(node, visitor, *args, **kwargs)
+  if new_children is not None:
     # The constructor of namedtuple() differs from tuple(), so we have to
     # pass the current tuple using "*".
     if node_class_name in visitor.unchecked_node_names:
@@ -330,3 +370,94 @@ def _VisitNode(node, visitor, *args, **kwargs):
 
   del visitor.old_node
   return new_node
+
+
+def _ProfiledVisitNode(node, visitor, *args, **kwargs):
+  """Like _VisitNode, but counts the nodes that the visitor walks.
+
+  For every node the visitor descends into, we increment the visitor's
+  "visitor_nodes_<Visitor>" counter, and if it has no Enter, Visit or Leave
+  function for the node, its "visitor_idle_nodes_<Visitor>" counter. Both are
+  keyed by node class.
+
+  Args:
+    node: The node to transform.
+    visitor: The visitor to apply.
+    *args: Passed to visitor callbacks.
+    **kwargs: Passed to visitor callbacks.
+  Returns:
+    The transformed Node.
+  """
+  node_class = node.__class__
+  if node_class is not tuple and isinstance(node, tuple):
+    node_class_name = node_class.__name__
+    if node_class_name in visitor.visit_class_names:
+      name = type(visitor).__name__
+      metrics.get_metric("visitor_nodes_" + name, metrics.MapCounter).inc(
+          node_class_name)
+      if not (visitor.visits_all_node_types or
+              node_class_name in visitor.enter_functions or
+              node_class_name in visitor.visit_functions or
+              node_class_name in visitor.leave_functions):
+        metrics.get_metric(
+            "visitor_idle_nodes_" + name, metrics.MapCounter).inc(
+                node_class_name)
+  return _VisitNode(node, visitor, *args, **kwargs)
+
+
+# The function that visits a node and its children, see SetProfileVisitors().
+_visit_node = _VisitNode
+
+
+def GetVisitorProfile():
+  """Returns a report of the time spent in each visitor and the nodes it walked.
+
+  The times come from the "visit_<Visitor>" metrics that _Visit always records.
+  The node counts are only available if SetProfileVisitors() was enabled.
+  Visitors that have no callback for most of the nodes they walk are flagged,
+  since they might do better with an Enter function that prunes the tree.
+
+  Returns:
+    The report, as a string.
+  """
+  times = metrics.get_metrics("visit_", metrics.Distribution)
+  nodes = metrics.get_metrics("visitor_nodes_", metrics.MapCounter)
+  idle = metrics.get_metrics("visitor_idle_nodes_", metrics.MapCounter)
+  rows = []
+  for name, dist in times.items():
+    if name.startswith("visit_nested_"):
+      continue
+    visitor = name[len("visit_"):]
+    walked = nodes.get("visitor_nodes_" + visitor)
+    skipped = idle.get("visitor_idle_nodes_" + visitor)
+    rows.append((dist.total, visitor, dist.count,
+                 walked.total if walked else 0,
+                 skipped.total if skipped else 0))
+  rows.sort(reverse=True)
+  lines = ["%-40s %8s %10s %10s %10s %6s" % (
+      "visitor", "calls", "total(s)", "mean(ms)", "nodes", "idle")]
+  flagged = []
+  for total, visitor, count, walked, skipped in rows:
+    idle_share = float(skipped) / walked if walked else 0.0
+    if idle_share > 0.5:
+      flagged.append(visitor)
+    lines.append("%-40s %8d %10.3f %10.3f %10d %5.0f%%" % (
+        visitor, count, total, 1000.0 * total / count if count else 0.0,
+        walked, 100 * idle_share))
+  if flagged:
+    lines.append("")
+    lines.append("Visitors with no callback for most nodes they walk: " +
+                 ", ".join(flagged))
+  for _, visitor, _, walked, _ in rows:
+    if not walked:
+      continue
+    counts = nodes["visitor_nodes_" + visitor].counts
+    skipped = idle.get("visitor_idle_nodes_" + visitor)
+    skipped = skipped.counts if skipped else {}
+    lines.append("")
+    lines.append("%s: nodes walked (idle) by node type" % visitor)
+    for node_class_name, count in sorted(
+        counts.items(), key=lambda item: (-item[1], item[0])):
+      lines.append("  %-38s %8d (%d)" % (
+          node_class_name, count, skipped.get(node_class_name, 0)))
+  return "\n".join(lines) + "\n"
@@ -1,5 +1,7 @@
 import itertools
+import pickle
 
+from pytype import metrics
 from pytype.pytd import visitors
 from pytype.pytd.parse import node
 import unittest
@@ -205,6 +207,24 @@ class TestNode(unittest.TestCase):
     new_v_expected = "V((Data(1, 2, -1), Data(4, 5, -1)))"
     self.assertEqual(repr(new_v), new_v_expected)
 
+  def test_unchanged(self):
+    """Test that node.Node.Visit() keeps nodes whose children didn't change."""
+    xy = XY(X(1, (V(1), V(2))), Data(1, 2, 3))
+    new_xy = xy.Visit(DataVisitor())
+    self.assertIs(new_xy.x, xy.x)
+    self.assertIsNot(new_xy.y, xy.y)
+
+  def test_intern_on_unpickle(self):
+    a, b = "".join(["foo", "bar"]), "".join(["fo", "obar"])
+    self.assertIsNot(a, b)
+    x1 = X(a, 1)
+    x2 = X(b, 2)
+    # Constructing a node doesn't intern its children.
+    self.assertIs(x2.a, b)
+    self.assertIs(pickle.loads(pickle.dumps(x1)).a,
+                  pickle.loads(pickle.dumps(x2)).a)
+    self.assertEqual(pickle.loads(pickle.dumps(x2)), x2)
+
   def test_ordering(self):
     nodes = [Node1(1, 1), Node1(1, 2),
              Node2(1, 1), Node2(2, 1),
@@ -229,6 +249,24 @@ class TestNode(unittest.TestCase):
       # Restore preconditions (not part of the public API, but ensures the
       # test doesn't have a surprising side effect).
       node.SetCheckPreconditions(True)
+
+  def test_profile_visitors(self):
+    metrics._prepare_for_test()
+    v = V((Data(1, 2, 3), X(1, 2)))
+    try:
+      node.SetProfileVisitors(True)
+      v.Visit(DataVisitor())
+    finally:
+      node.SetProfileVisitors(False)
+    walked = metrics.get_metric("visitor_nodes_DataVisitor", metrics.MapCounter)
+    idle = metrics.get_metric(
+        "visitor_idle_nodes_DataVisitor", metrics.MapCounter)
+    self.assertEqual(walked.counts, {"V": 1, "Data": 1, "X": 1})
+    self.assertEqual(idle.counts, {"V": 1, "X": 1})
+    report = node.GetVisitorProfile()
+    self.assertIn("DataVisitor", report)
+    self.assertIn("Visitors with no callback for most nodes", report)
+    metrics._prepare_for_test(enabled=False)
 # pylint: enable=g-generic-assert
 
 
@@ -364,7 +364,9 @@ class ClassType(node.Node('name: str'), Type):
     return self.name, None
 
   def __getstate__(self):
-    return (self.cls,)
+    # Pickling doesn't force a deferred lookup; the node is unpickled without a
+    # cls pointer, like any other unresolved node.
+    return (None if self.IsLookupDeferred() else self.cls,)
 
   def __setstate__(self, state):
     self.cls = state[0]
@@ -375,20 +377,59 @@ class ClassType(node.Node('name: str'), Type):
     self.cls = cls
     return self
 
+  def DeferLookup(self, fill):
+    """Defers filling in the cls pointer until it is first accessed.
+
+    Args:
+      fill: A function that takes this node and fills in its cls attribute,
+        e.g. visitors.FillInLocalPointers.EnterClassType.
+    """
+    self.__dict__.pop("cls", None)
+    self._fill = fill
+
+  def IsLookupDeferred(self):
+    """Whether the cls pointer will be filled in when it is first accessed."""
+    return "_fill" in self.__dict__
+
+  def __getattr__(self, name):
+    # Only called for attributes that aren't set, so for cls this means that
+    # its lookup was deferred by DeferLookup.
+    if name != "cls" or "_fill" not in self.__dict__:
+      raise AttributeError(name)
+    fill = self.__dict__.pop("_fill")
+    self.cls = None
+    try:
+      fill(self)
+    except Exception:
+      # Defer the lookup again, so that the next access fails the same way
+      # rather than getting None.
+      self.DeferLookup(fill)
+      raise
+    return self.cls
+
   # __eq__ is inherited (using tuple equality + requiring the two classes
   #                      be the same)
 
+  # __str__ and __repr__ don't force a deferred lookup either, since printing
+  # (e.g. in log messages) shouldn't change what's loaded.
+
   def __str__(self):
+    if self.IsLookupDeferred():
+      return self.name
     return str(self.cls.name) if self.cls else self.name
 
   def __repr__(self):
+    if self.IsLookupDeferred():
+      cls = '<deferred>'
+    else:
+      cls = '<unresolved>' if self.cls is None else ''
     return '{type}{cls}({name})'.format(
-        type=type(self).__name__, name=self.name,
-        cls='<unresolved>' if self.cls is None else '')
+        type=type(self).__name__, name=self.name, cls=cls)
 
 
 class LateType(node.Node('name: str'), Type):
   """A type we have yet to resolve."""
+  __slots__ = ()
 
   def __str__(self):
     return self.name
@@ -28,6 +28,48 @@ class TestPytd(unittest.TestCase):
     self.assertEqual(f.name, unpickled_f.name)
     self.assertEqual(f.function, unpickled_f.function)
 
+  def test_deferred_class_type_lookup(self):
+    cls = pytd.Class("int", None, (), (), (), (), (), None, ())
+    filled = []
+    def fill(node):
+      filled.append(node.name)
+      node.cls = cls
+    t = pytd.ClassType("int")
+    t.DeferLookup(fill)
+    self.assertFalse(filled)
+    self.assertIs(t.cls, cls)
+    self.assertIs(t.cls, cls)
+    self.assertEqual(filled, ["int"])
+
+  def test_deferred_class_type_lookup_error(self):
+    def fill(node):
+      raise AssertionError("This should not happen: %s" % str(node))
+    t = pytd.ClassType("int")
+    t.DeferLookup(fill)
+    # Every access fails, rather than the later ones seeing an unfilled cls.
+    for _ in range(2):
+      with self.assertRaises(AssertionError):
+        _ = t.cls
+
+  def test_deferred_class_type_pickle(self):
+    filled = []
+    t = pytd.ClassType("int")
+    t.DeferLookup(filled.append)
+    unpickled_t = cPickle.loads(cPickle.dumps(t, pickle.HIGHEST_PROTOCOL))
+    self.assertEqual(unpickled_t.name, "int")
+    self.assertIsNone(unpickled_t.cls)
+    self.assertFalse(filled)
+    self.assertTrue(t.IsLookupDeferred())
+
+  def test_deferred_class_type_str(self):
+    filled = []
+    t = pytd.ClassType("int")
+    t.DeferLookup(filled.append)
+    self.assertEqual(str(t), "int")
+    self.assertEqual(repr(t), "ClassType<deferred>(int)")
+    self.assertFalse(filled)
+    self.assertTrue(t.IsLookupDeferred())
+
   def test_union_type_eq(self):
     u1 = pytd.UnionType((self.int, self.float))
     u2 = pytd.UnionType((self.float, self.int))
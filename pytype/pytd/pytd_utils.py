@@ -11,9 +11,11 @@ import collections
 import difflib
 import gzip
 import itertools
+import mmap
 import os
 import pickletools
 import re
+import struct
 import sys
 
 from pytype import pytype_source_utils
@@ -26,6 +28,8 @@ from six.moves import cPickle
 
 _PICKLE_PROTOCOL = cPickle.HIGHEST_PROTOCOL
 _PICKLE_RECURSION_LIMIT_AST = 40000
+_PICKLE_STORE_MAGIC = b"PYTYPE_PICKLE_STORE\n"
+_PICKLE_STORE_INDEX_SIZE = struct.Struct("<Q")
 
 
 ANON_PARAM = re.compile(r"_[0-9]+")
@@ -58,13 +62,16 @@ def Concat(*args, **kwargs):
   """Concatenate two or more pytd ASTs."""
   assert all(isinstance(arg, pytd.TypeDeclUnit) for arg in args)
   name = kwargs.get("name")
+  # Summing up the tuples would copy them once per argument.
+  chain = lambda field: tuple(itertools.chain.from_iterable(
+      getattr(arg, field) for arg in args))
   return pytd.TypeDeclUnit(
       name=name or " + ".join(arg.name for arg in args),
-      constants=sum((arg.constants for arg in args), ()),
-      type_params=sum((arg.type_params for arg in args), ()),
-      classes=sum((arg.classes for arg in args), ()),
-      functions=sum((arg.functions for arg in args), ()),
-      aliases=sum((arg.aliases for arg in args), ()))
+      constants=chain("constants"),
+      type_params=chain("type_params"),
+      classes=chain("classes"),
+      functions=chain("functions"),
+      aliases=chain("aliases"))
 
 
 def JoinTypes(types):
@@ -461,7 +468,66 @@ def SavePickle(data, filename=None, compress=False, open_function=open):
     sys.setrecursionlimit(recursion_limit)
 
 
+def SavePickleStore(items, filename, open_function=open):
+  """Save named pickles to an uncompressed, indexed file.
+
+  Unlike a compressed pickle, which every reader has to decompress in full, a
+  store is memory-mapped by LoadPickleStore. All processes reading the same
+  store share its pages, and only the entries that are used are read from disk.
+
+  Args:
+    items: A sequence of (name, pickled bytes) tuples.
+    filename: The file to write.
+    open_function: A custom file opening function.
+  """
+  index = []
+  offset = 0
+  for name, data in items:
+    index.append((name, offset, len(data)))
+    offset += len(data)
+  index = cPickle.dumps(tuple(index), _PICKLE_PROTOCOL)
+  with open_function(filename, "wb") as fi:
+    fi.write(_PICKLE_STORE_MAGIC)
+    fi.write(_PICKLE_STORE_INDEX_SIZE.pack(len(index)))
+    fi.write(index)
+    for _, data in items:
+      fi.write(data)
+
+
+def IsPickleStore(filename, open_function=open):
+  with open_function(filename, "rb") as fi:
+    return fi.read(len(_PICKLE_STORE_MAGIC)) == _PICKLE_STORE_MAGIC
+
+
+def LoadPickleStore(filename, open_function=open):
+  """Memory-map a file written by SavePickleStore.
+
+  Args:
+    filename: The file to read. open_function must return a real file for it,
+      since the file is memory-mapped.
+    open_function: A custom file opening function.
+
+  Returns:
+    A tuple of (name, pickle) tuples. Each pickle is a read-only memoryview
+    into the mapped file, which stays mapped for as long as any of them is
+    alive.
+  """
+  with open_function(filename, "rb") as fi:
+    buf = mmap.mmap(fi.fileno(), 0, access=mmap.ACCESS_READ)
+  view = memoryview(buf)
+  start = len(_PICKLE_STORE_MAGIC)
+  assert view[:start] == _PICKLE_STORE_MAGIC, filename
+  index_size, = _PICKLE_STORE_INDEX_SIZE.unpack_from(view, start)
+  start += _PICKLE_STORE_INDEX_SIZE.size
+  index = cPickle.loads(view[start:start + index_size])
+  start += index_size
+  return tuple((name, view[start + offset:start + offset + length])
+               for name, offset, length in index)
+
+
 def ASTeq(ast1, ast2):
+  if ast1 is ast2:
+    return True
   return (ast1.constants == ast2.constants and
           ast1.type_params == ast2.type_params and
           ast1.classes == ast2.classes and
@@ -358,6 +358,22 @@ class TestUtils(parser_test_base.ParserTest):
       d2 = pytd_utils.LoadPickle(filename, compress=True)
     self.assertEqual(d1, d2)
 
+  def test_load_pickle_store(self):
+    items = (("foo", b"abc"), ("bar", b""), ("baz", b"de"))
+    with file_utils.Tempdir() as d:
+      filename = d.create_file("foo.store")
+      pytd_utils.SavePickleStore(items, filename)
+      self.assertTrue(pytd_utils.IsPickleStore(filename))
+      loaded = pytd_utils.LoadPickleStore(filename)
+    self.assertEqual([(name, bytes(data)) for name, data in loaded],
+                     list(items))
+
+  def test_is_not_pickle_store(self):
+    with file_utils.Tempdir() as d:
+      filename = d.create_file("foo.pickle.gz")
+      pytd_utils.SavePickle({1}, filename, compress=True)
+      self.assertFalse(pytd_utils.IsPickleStore(filename))
+
   def test_diff_same_pickle(self):
     ast = pytd.TypeDeclUnit("foo", (), (), (), (), ())
     with file_utils.Tempdir() as d:
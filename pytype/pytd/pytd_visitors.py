@@ -171,6 +171,71 @@ class Visitor:
     self.leave_functions[node.__class__.__name__](self, node, *args, **kwargs)
 
 
+class FusedVisitor(Visitor):
+  """Runs a sequence of visitors in a single traversal.
+
+  Ordering contract: For each node, the Enter functions of the visitors are
+  called in order on the original node. After the children have been visited,
+  the Visit functions are called in order, each on the result of the previous
+  one, so a visitor dispatches on the class of the node as transformed by the
+  visitors before it. Finally, the Leave functions are called in reverse order.
+
+  Compared to running the visitors one after another, this means that:
+    * Enter and Leave functions see the node before any visitor transformed it.
+    * If a Visit function replaces a node with a new subtree, later visitors
+      only visit the root of that subtree, not its descendants.
+  Only visitors for which this makes no difference may be fused. Enter
+  functions may not prune the traversal by returning False.
+  """
+
+  def __init__(self, *visitors):
+    super().__init__()
+    self._visitors = visitors
+    self.visits_all_node_types = any(
+        v.visits_all_node_types for v in visitors)
+    self.unchecked_node_names = self._Union(
+        v.unchecked_node_names for v in visitors)
+    self.visit_class_names = self._Union(
+        v.visit_class_names for v in visitors)
+    # Only the keys are used, to decide whether to call our Enter, Visit and
+    # Leave functions.
+    self.enter_functions = self._Union(v.enter_functions for v in visitors)
+    self.visit_functions = self._Union(v.visit_functions for v in visitors)
+    self.leave_functions = self._Union(v.leave_functions for v in visitors)
+
+  def _Union(self, names):
+    union = set()
+    for n in names:
+      if n is ALL_NODE_NAMES:
+        return ALL_NODE_NAMES
+      union.update(n)
+    return union
+
+  def Enter(self, node, *args, **kwargs):
+    node_class_name = node.__class__.__name__
+    for v in self._visitors:
+      if node_class_name in v.enter_functions:
+        status = v.Enter(node, *args, **kwargs)
+        if status is False:  # pylint: disable=g-bool-id-comparison
+          raise AssertionError("%s can't be fused: Enter%s prunes the tree" % (
+              type(v).__name__, node_class_name))
+
+  def Visit(self, node, *args, **kwargs):
+    for v in self._visitors:
+      if (v.visits_all_node_types or
+          node.__class__.__name__ in v.visit_functions):
+        v.old_node = self.old_node
+        node = v.Visit(node, *args, **kwargs)
+        del v.old_node
+    return node
+
+  def Leave(self, node, *args, **kwargs):
+    node_class_name = node.__class__.__name__
+    for v in reversed(self._visitors):
+      if node_class_name in v.leave_functions:
+        v.Leave(node, *args, **kwargs)
+
+
 class CanonicalOrderingVisitor(Visitor):
   """Visitor for converting ASTs back to canonical (sorted) ordering."""
 
@@ -2,6 +2,7 @@
 
 import textwrap
 
+from pytype.pytd import pytd
 from pytype.pytd import pytd_visitors
 from pytype.pytd import visitors
 from pytype.pytd.parse import parser_test_base
@@ -133,6 +134,58 @@ class PytdVisitorsTest(parser_test_base.ParserTest):
     six.assertCountEqual(self, ["C", "D", "A"],
                          [t.name for t in data[ast.Lookup("E")]])
 
+  def test_fused_visitor(self):
+    events = []
+
+    class ToClassType(pytd_visitors.Visitor):
+
+      def EnterFunction(self, node):
+        events.append(("enter", "ToClassType", node.name))
+
+      def LeaveFunction(self, node):
+        events.append(("leave", "ToClassType", node.name))
+
+      def VisitNamedType(self, node):
+        return pytd.ClassType(node.name)
+
+    class RenameClassType(pytd_visitors.Visitor):
+
+      def EnterFunction(self, node):
+        events.append(("enter", "RenameClassType", node.name))
+
+      def LeaveFunction(self, node):
+        events.append(("leave", "RenameClassType", node.name))
+
+      def VisitClassType(self, node):
+        return pytd.ClassType(node.name + "_")
+
+    ast = self.Parse("""
+      def f(x: int) -> str: ...
+    """)
+    ast = ast.Visit(pytd_visitors.FusedVisitor(
+        ToClassType(), RenameClassType()))
+    sig, = ast.Lookup("f").signatures
+    self.assertEqual(sig.params[0].type, pytd.ClassType("int_"))
+    self.assertEqual(sig.return_type, pytd.ClassType("str_"))
+    self.assertEqual(events, [("enter", "ToClassType", "f"),
+                              ("enter", "RenameClassType", "f"),
+                              ("leave", "RenameClassType", "f"),
+                              ("leave", "ToClassType", "f")])
+
+  def test_fused_visitor_prune(self):
+
+    class Prune(pytd_visitors.Visitor):
+
+      def EnterFunction(self, _):
+        return False
+
+    ast = self.Parse("""
+      def f(x: int) -> str: ...
+    """)
+    with self.assertRaises(AssertionError):
+      ast.Visit(pytd_visitors.FusedVisitor(
+          pytd_visitors.ClassTypeToNamedType(), Prune()))
+
 
 class TestAncestorMap(unittest.TestCase):
 
@@ -227,6 +227,47 @@ def FillLocalReferences(serializable_ast, module_map):
     return serializable_ast
 
 
+def FillLocalReferencesLazily(serializable_ast, module_map):
+  """Like FillLocalReferences, but fills in ClassType pointers on first use.
+
+  Args:
+    serializable_ast: A SerializableAst instance.
+    module_map: A map from module names to asts. It is only queried, via get(),
+      when a pointer is filled in, so it may load modules on demand.
+
+  Returns:
+    The SerializableAst.
+  """
+  local_filler = visitors.FillInLocalPointers(module_map)
+  if (serializable_ast.class_type_nodes is None or
+      serializable_ast.function_type_nodes is None):
+    # Like FillLocalReferences, we don't insist on finding every pointer of an
+    # ast that didn't record its nodes.
+    indexer = FindClassAndFunctionTypesVisitor()
+    serializable_ast.ast.Visit(indexer)
+    serializable_ast = serializable_ast.Replace(
+        class_type_nodes=indexer.class_type_nodes,
+        function_type_nodes=indexer.function_type_nodes)
+    fill_class_type = local_filler.EnterClassType
+    fill_function_type = local_filler.EnterFunctionType
+  else:
+    def fill_class_type(node):
+      local_filler.EnterClassType(node)
+      if node.cls is None:
+        raise AssertionError("This should not happen: %s" % str(node))
+    def fill_function_type(node):
+      local_filler.EnterFunctionType(node)
+      if node.function is None:
+        raise AssertionError("This should not happen: %s" % str(node))
+  for node in serializable_ast.class_type_nodes:
+    if node.cls is None:
+      node.DeferLookup(fill_class_type)
+  # FunctionType nodes are rare, so we don't bother deferring them.
+  for node in serializable_ast.function_type_nodes:
+    fill_function_type(node)
+  return serializable_ast
+
+
 def PrepareForExport(module_name, ast, loader):
   """Prepare an ast as if it was parsed and loaded.
 
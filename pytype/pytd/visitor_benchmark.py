@@ -0,0 +1,109 @@
+"""Benchmark fused visitor pipelines on the typeshed stdlib.
+
+Parses every typeshed stdlib module, then resolves builtins in each of them the
+way load_pytd.Loader does, once by running LookupBuiltins and
+ExpandCompatibleBuiltins one after another and once by running them as a
+visitors.FusedVisitor. Reports the time spent in each pipeline and fails if the
+two produce different ASTs.
+
+Usage:
+  python -m pytype.pytd.visitor_benchmark [--python_version 3.7] [--repeat N]
+"""
+
+import argparse
+import sys
+import time
+
+from pytype import utils
+from pytype.pytd import pytd_utils
+from pytype.pytd import typeshed
+from pytype.pytd import visitors
+from pytype.pytd.parse import builtins
+
+
+def parse_stdlib(python_version):
+  """Parses the typeshed stdlib.
+
+  Args:
+    python_version: The Python version, as a tuple.
+
+  Returns:
+    A list of the parsed modules.
+  """
+  asts = []
+  names = typeshed.Typeshed().get_all_module_names(python_version)
+  for name in sorted(names):
+    try:
+      result = typeshed.parse_type_definition("stdlib", name, python_version)
+    except Exception as e:  # pylint: disable=broad-except
+      print("Skipping %s: %s" % (name, e), file=sys.stderr)
+      continue
+    if result:
+      asts.append(result[1])
+  return asts
+
+
+def _sequential(ast, bltins):
+  ast = ast.Visit(visitors.LookupBuiltins(bltins, full_names=False))
+  return ast.Visit(visitors.ExpandCompatibleBuiltins(bltins))
+
+
+def _fused(ast, bltins):
+  return ast.Visit(visitors.FusedVisitor(
+      visitors.LookupBuiltins(bltins, full_names=False),
+      visitors.ExpandCompatibleBuiltins(bltins)))
+
+
+def run(asts, bltins, pipeline, repeat):
+  """Runs a pipeline over all modules.
+
+  Args:
+    asts: The modules.
+    bltins: The builtins module.
+    pipeline: A function that takes a module and the builtins and returns the
+      processed module.
+    repeat: How often to run the pipeline.
+
+  Returns:
+    A tuple of the fastest time in seconds and the processed modules.
+  """
+  best = None
+  for _ in range(repeat):
+    start = time.time()
+    results = [pipeline(ast, bltins) for ast in asts]
+    elapsed = time.time() - start
+    best = elapsed if best is None else min(best, elapsed)
+  return best, results
+
+
+def parse_args(args):
+  parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+  parser.add_argument("--python_version", type=str, default="%d.%d" % (
+      sys.version_info[:2]), help="Python version of the stubs, e.g. 3.7.")
+  parser.add_argument("--repeat", type=int, default=3,
+                      help="Number of times each pipeline is run.")
+  return parser.parse_args(args)
+
+
+def main(args=None):
+  opts = parse_args(args)
+  python_version = utils.version_from_string(opts.python_version)
+  bltins, _ = builtins.GetBuiltinsAndTyping(python_version)
+  start = time.time()
+  asts = parse_stdlib(python_version)
+  print("Parsed %d modules in %.2fs" % (len(asts), time.time() - start))
+  sequential_time, expected = run(asts, bltins, _sequential, opts.repeat)
+  fused_time, actual = run(asts, bltins, _fused, opts.repeat)
+  print("sequential: %.3fs" % sequential_time)
+  print("fused:      %.3fs (%.2fx)" % (
+      fused_time, sequential_time / fused_time if fused_time else 0))
+  mismatches = [e.name for e, a in zip(expected, actual)
+                if not pytd_utils.ASTeq(e, a)]
+  if mismatches:
+    print("Pipelines disagree on: %s" % ", ".join(mismatches))
+    return 1
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -7,6 +7,7 @@ import collections
 import itertools
 import logging
 import re
+import sys
 
 from pytype import datatypes
 from pytype import module_utils
@@ -35,6 +36,7 @@ CanonicalOrderingVisitor = pytd_visitors.CanonicalOrderingVisitor
 ClassTypeToNamedType = pytd_visitors.ClassTypeToNamedType
 CollectTypeParameters = pytd_visitors.CollectTypeParameters
 ExtractSuperClasses = pytd_visitors.ExtractSuperClasses
+FusedVisitor = pytd_visitors.FusedVisitor
 PrintVisitor = pytd_visitors.PrintVisitor
 RenameModuleVisitor = pytd_visitors.RenameModuleVisitor
 
@@ -246,6 +248,24 @@ class RenameBuiltinsPrefix(Visitor):
     return self.VisitClassType(node)
 
 
+class InternStrings(Visitor):
+  """Interns the string children of all nodes.
+
+  Names like "__builtin__.int" appear in many nodes and in every module, so
+  sharing one copy of each saves a lot of memory. ClassType and FunctionType
+  nodes, which carry a pointer besides their name, are left alone.
+  """
+
+  visits_all_node_types = True
+
+  def Visit(self, node):
+    if isinstance(node, (pytd.ClassType, pytd.FunctionType)) or not any(
+        child.__class__ is str for child in node):
+      return node
+    return node.__class__(*[sys.intern(child) if child.__class__ is str
+                            else child for child in node])
+
+
 def LookupClasses(target, global_module=None, ignore_late_types=False):
   """Converts a PyTD object from one using NamedType to ClassType.
 
@@ -289,7 +309,9 @@ class VerifyLookup(Visitor):
     raise ValueError("Unreplaced NamedType: %r" % node.name)
 
   def EnterClassType(self, node):
-    if node.cls is None:
+    # Deferred lookups come from pickles, which were verified when they were
+    # saved, so we don't force them here.
+    if not node.IsLookupDeferred() and node.cls is None:
       raise ValueError("Unresolved class: %r" % node.name)
 
 
@@ -1671,6 +1693,68 @@ class ExpandCompatibleBuiltins(Visitor):
       return node
 
 
+class InternTypes(Visitor):
+  """Replace equal types with a single instance.
+
+  The instances are kept in a table that can be shared between trees, e.g. all
+  modules in a load_pytd.Loader. Since we intern bottom-up, the children of a
+  type have already been interned when we get to it, so two types are equal if
+  they have the same class and identical children.
+
+  ClassType nodes are the exception: their cls pointers are filled in place, by
+  name. We only share ones with a qualified name that point to the same class,
+  since those are always filled in with the same class. Other ClassType nodes,
+  and the types that contain them, are left as they are.
+  """
+
+  def __init__(self, table):
+    """Create this visitor.
+
+    Args:
+      table: A dictionary, which this visitor fills with the interned types.
+    """
+    super().__init__()
+    self._table = table
+
+  def _ChildKey(self, child):
+    if child.__class__ is tuple:
+      return tuple(self._ChildKey(c) for c in child)
+    elif isinstance(child, tuple):
+      # A node. Keys refer to children by id, but the interned type keeps its
+      # children alive, so the ids can't be reused.
+      return id(child)
+    else:
+      # Include the class, since e.g. True == 1.
+      return child.__class__, child
+
+  def _Intern(self, node):
+    key = (node.__class__,) + tuple(self._ChildKey(c) for c in node)
+    return self._table.setdefault(key, node)
+
+  def VisitClassType(self, node):
+    # Don't trigger deferred lookups.
+    cls = node.__dict__.get("cls")
+    if cls is None or "." not in node.name:
+      return node
+    key = (pytd.ClassType, node.name, id(cls))
+    interned = self._table.get(key)
+    if interned is None or interned.__dict__.get("cls") is not cls:
+      # The interned node's pointer may have been changed since.
+      self._table[key] = interned = node
+    return interned
+
+  VisitNamedType = _Intern
+  VisitLateType = _Intern
+  VisitAnythingType = _Intern
+  VisitNothingType = _Intern
+  VisitGenericType = _Intern
+  VisitTupleType = _Intern
+  VisitCallableType = _Intern
+  VisitUnionType = _Intern
+  VisitIntersectionType = _Intern
+  VisitLiteral = _Intern
+
+
 class ClearClassPointers(Visitor):
   """Set .cls pointers to 'None'."""
 
@@ -81,6 +81,45 @@ class TestVisitors(parser_test_base.ParserTest):
     ty.Visit(visitors.FillInLocalPointers({"": tree}))
     self.assertEqual(ty.function, tree.Lookup("f"))
 
+  def test_intern_types(self):
+    tree = self.Parse("""
+      class A: ...
+    """, name="foo")
+    cls = tree.Lookup("foo.A")
+    def make_type():
+      return pytd.UnionType((
+          pytd.GenericType(pytd.ClassType("foo.A", cls),
+                           (pytd.NamedType("x"), pytd.AnythingType())),
+          pytd.ClassType("A", cls)))
+    table = {}
+    t1 = make_type().Visit(visitors.InternTypes(table))
+    t2 = make_type().Visit(visitors.InternTypes(table))
+    self.assertEqual(t1, t2)
+    self.assertIs(t1.type_list[0], t2.type_list[0])
+    # Unqualified class types are filled in per module, so they aren't shared.
+    self.assertIsNot(t1.type_list[1], t2.type_list[1])
+    # Class types pointing to different classes aren't shared.
+    t3 = pytd.ClassType("foo.A", None).Visit(visitors.InternTypes(table))
+    self.assertIsNot(t3, t1.type_list[0].base_type)
+
+  def test_intern_strings(self):
+    name1, name2 = "".join(["foo.", "A"]), "".join(["foo", ".A"])
+    self.assertIsNot(name1, name2)
+    t = pytd.UnionType((pytd.NamedType(name1), pytd.NamedType(name2)))
+    t = t.Visit(visitors.InternStrings())
+    self.assertIs(t.type_list[0].name, t.type_list[1].name)
+    # Class types keep their pointer.
+    cls = self.Parse("class A: ...", name="foo").Lookup("foo.A")
+    class_type = pytd.ClassType(name1, cls)
+    self.assertIs(class_type.Visit(visitors.InternStrings()), class_type)
+
+  def test_parse_interns_strings(self):
+    tree = self.Parse("""
+      class A: ...
+      x = ...  # type: A
+    """, name="foo")
+    self.assertIs(tree.Lookup("foo.x").type.name, tree.Lookup("foo.A").name)
+
   def test_deface_unresolved(self):
     builtins = self.Parse(textwrap.dedent("""
       class int:
@@ -0,0 +1,117 @@
+"""A low-overhead sampling profiler.
+
+Unlike cProfile, which instruments every function call, the sampling profiler
+records the Python stack whenever the process has used up another interval of
+CPU time, using signal.setitimer(ITIMER_PROF). Its cost is proportional to the
+number of samples rather than to the number of calls, so it can stay enabled on
+ordinary runs.
+
+Each sample is attributed to the pytype subsystem it was taken in, based on the
+innermost frame that belongs to one (see _SUBSYSTEMS), and samples taken while
+the VM runs an instruction record the opcode. The output is in the collapsed
+stack format that flamegraph tools read: one line per distinct stack, with the
+frames separated by ";", outermost first, followed by the number of samples.
+The first frame of each stack is the subsystem, e.g.
+
+  matcher;single.py:main;...;matcher.py:match_var_against_type 12
+"""
+
+import collections
+import os
+import signal
+
+
+# The default sampling interval, in seconds of CPU time.
+DEFAULT_INTERVAL = 0.005
+
+# Path fragments of pytype source files, and the subsystem they belong to. The
+# innermost frame that matches one of these determines the subsystem.
+_SUBSYSTEMS = (
+    ("typegraph" + os.sep, "solver"),
+    ("convert_structural.py", "solver"),
+    ("matcher.py", "matcher"),
+    ("load_pytd.py", "loader"),
+    ("pyi" + os.sep, "loader"),
+    ("output.py", "output"),
+    ("pytd" + os.sep + "optimize.py", "output"),
+    ("vm.py", "vm"),
+)
+
+# The directory that contains the pytype package, for shortening file names.
+_PYTYPE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class SamplingProfiler:
+  """Samples the stack of the main thread at regular intervals of CPU time."""
+
+  def __init__(self, interval=DEFAULT_INTERVAL):
+    """Initialize.
+
+    Args:
+      interval: The sampling interval, in seconds of CPU time.
+    """
+    self._interval = interval
+    self._samples = collections.Counter()  # Collapsed stack -> count.
+    self._labels = {}  # Code object -> (frame label, subsystem or None).
+    self._old_handler = None  # Set in start().
+
+  @property
+  def num_samples(self):
+    return sum(self._samples.values())
+
+  def start(self):
+    self._old_handler = signal.signal(signal.SIGPROF, self._sample)
+    signal.setitimer(signal.ITIMER_PROF, self._interval, self._interval)
+
+  def stop(self):
+    signal.setitimer(signal.ITIMER_PROF, 0)
+    signal.signal(signal.SIGPROF, self._old_handler)
+
+  def _get_label(self, code):
+    """Returns the frame label and the subsystem of a code object."""
+    try:
+      return self._labels[code]
+    except KeyError:
+      pass
+    filename = os.path.abspath(code.co_filename)
+    for fragment, subsystem in _SUBSYSTEMS:
+      if fragment in filename:
+        break
+    else:
+      subsystem = None
+    if filename.startswith(_PYTYPE_ROOT):
+      filename = os.path.relpath(filename, _PYTYPE_ROOT)
+    else:
+      filename = os.path.basename(filename)
+    label = self._labels[code] = ("%s:%s" % (filename, code.co_name),
+                                  subsystem)
+    return label
+
+  def _sample(self, unused_signum, frame):
+    """Records the stack that the signal interrupted."""
+    stack = []
+    subsystem = None
+    while frame:
+      label, frame_subsystem = self._get_label(frame.f_code)
+      if frame_subsystem == "vm" and frame.f_code.co_name == "run_instruction":
+        op = frame.f_locals.get("op")
+        if op is not None:
+          label = "%s[%s]" % (label, op.__class__.__name__)
+      if subsystem is None:
+        subsystem = frame_subsystem
+      stack.append(label)
+      frame = frame.f_back
+    stack.append(subsystem or "other")
+    self._samples[";".join(reversed(stack))] += 1
+
+  def get_subsystem_counts(self):
+    """Returns a map from subsystem to the number of samples taken in it."""
+    counts = collections.Counter()
+    for stack, count in self._samples.items():
+      counts[stack.split(";", 1)[0]] += count
+    return counts
+
+  def write_collapsed_stacks(self, f):
+    """Writes the samples to f in the collapsed stack format."""
+    for stack, count in sorted(self._samples.items()):
+      f.write("%s %d\n" % (stack, count))
@@ -0,0 +1,49 @@
+"""Tests for sampling_profiler.py."""
+
+import io
+import time
+
+from pytype import sampling_profiler
+
+import unittest
+
+
+def _spin(seconds):
+  end = time.process_time() + seconds
+  while time.process_time() < end:
+    pass
+
+
+class SamplingProfilerTest(unittest.TestCase):
+  """Tests for SamplingProfiler."""
+
+  def test_samples(self):
+    profiler = sampling_profiler.SamplingProfiler(interval=0.001)
+    profiler.start()
+    try:
+      _spin(0.1)
+    finally:
+      profiler.stop()
+    self.assertGreater(profiler.num_samples, 0)
+    out = io.StringIO()
+    profiler.write_collapsed_stacks(out)
+    lines = out.getvalue().splitlines()
+    self.assertTrue(lines)
+    for line in lines:
+      stack, count = line.rsplit(" ", 1)
+      self.assertGreater(int(count), 0)
+      self.assertEqual(stack.split(";")[0], "other")
+    self.assertTrue(any("sampling_profiler_test.py:_spin" in line
+                        for line in lines))
+    self.assertEqual(dict(profiler.get_subsystem_counts()),
+                     {"other": profiler.num_samples})
+
+  def test_subsystem(self):
+    profiler = sampling_profiler.SamplingProfiler()
+    code = compile("pass", "/src/pytype/matcher.py", "exec")
+    self.assertEqual(profiler._get_label(code),
+                     ("matcher.py:<module>", "matcher"))
+
+
+if __name__ == "__main__":
+  unittest.main()
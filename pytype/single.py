@@ -15,6 +15,7 @@ from pytype import config
 from pytype import io
 from pytype import load_pytd
 from pytype import metrics
+from pytype import sampling_profiler
 from pytype import utils
 from pytype.pytd import typeshed
 from pytype.pytd.parse import node
@@ -46,6 +47,62 @@ class _ProfileContext:
       self._profile.dump_stats(self._output_path)
 
 
+class _SamplingProfileContext:
+  """A context manager for optionally sampling the stack."""
+
+  def __init__(self, output_path, interval=None, open_function=open):
+    """Initialize.
+
+    Args:
+      output_path: A pathname for the collapsed stacks.  An empty string
+          indicates that no profiling should be done.
+      interval: The sampling interval in seconds, or None for the default.
+      open_function: A custom file opening function.
+    """
+    self._output_path = output_path
+    self._open_function = open_function
+    self._profiler = sampling_profiler.SamplingProfiler(
+        interval or sampling_profiler.DEFAULT_INTERVAL
+    ) if self._output_path else None
+
+  def __enter__(self):
+    if self._profiler:
+      self._profiler.start()
+
+  def __exit__(self, exc_type, exc_value, traceback):  # pylint: disable=redefined-outer-name
+    if self._profiler:
+      self._profiler.stop()
+      log.info("Samples per subsystem: %r",
+               dict(self._profiler.get_subsystem_counts()))
+      with self._open_function(self._output_path, "w") as f:
+        self._profiler.write_collapsed_stacks(f)
+
+
+class _VisitorProfileContext:
+  """A context manager for optionally profiling pytd visitors."""
+
+  def __init__(self, output_path, open_function=open):
+    """Initialize.
+
+    Args:
+      output_path: A pathname for the visitor profile.  An empty string
+          indicates that no profiling should be done.
+      open_function: A custom file opening function.
+    """
+    self._output_path = output_path
+    self._open_function = open_function
+
+  def __enter__(self):
+    if self._output_path:
+      node.SetProfileVisitors(True)
+
+  def __exit__(self, exc_type, exc_value, traceback):  # pylint: disable=redefined-outer-name
+    if self._output_path:
+      node.SetProfileVisitors(False)
+      with self._open_function(self._output_path, "w") as f:
+        f.write(node.GetVisitorProfile())
+
+
 def _generate_builtins_pickle(options):
   """Create a pickled file with the standard library (typeshed + builtins)."""
   loader = load_pytd.create_loader(options)
@@ -55,7 +112,8 @@ def _generate_builtins_pickle(options):
   for m in sorted(module_names):
     if m not in blacklist:
       loader.import_name(m)
-  loader.save_to_pickle(options.generate_builtins)
+  loader.save_to_pickle(options.generate_builtins,
+                        mmap_store=options.mmap_builtins)
 
 
 def main():
@@ -79,10 +137,18 @@ def main():
     signal.alarm(options.timeout)
 
   with _ProfileContext(options.profile):
-    with metrics.MetricsContext(options.metrics, options.open_function):
-      with metrics.StopWatch("total_time"):
-        with metrics.Snapshot("memory", enabled=options.memory_snapshots):
-          return _run_pytype(options)
+    with _SamplingProfileContext(options.sampling_profile,
+                                 options.sampling_interval,
+                                 options.open_function):
+      with metrics.MetricsContext(options.metrics, options.open_function,
+                                  enabled=bool(options.profile_visitors)):
+        with _VisitorProfileContext(options.profile_visitors,
+                                    options.open_function):
+          with metrics.TraceContext(options.trace, options.open_function):
+            with metrics.StopWatch("total_time"):
+              with metrics.Snapshot("memory",
+                                    enabled=options.memory_snapshots):
+                return _run_pytype(options)
 
 
 def _run_pytype(options):
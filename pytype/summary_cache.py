@@ -0,0 +1,260 @@
+"""A persistent cache of summaries of InterpreterFunction calls.
+
+A summary records what a call returned, so that re-analyzing a file whose
+unchanged functions are called the same way as before does not have to run
+their bodies again. To be able to reproduce the exact result of a call from a
+summary, we only summarize calls that are fully determined by what we can put
+into the key:
+
+- The function is a leaf: it has no closure, defines no nested functions or
+  classes, imports nothing, doesn't write to globals, and only reads globals
+  that resolve to builtins.
+- All arguments, annotations and return values are canonical values that the
+  converter always maps to the same object, e.g. the instance of int, a
+  constant like 42 or Any.
+- The call reported no errors, including ones that were disabled.
+
+The key covers the function's bytecode and source lines, the arguments, the
+pytype version and the options that affect inference. It doesn't depend on
+where in the file the function is, so that adding or removing lines above a
+function keeps its summaries valid.
+
+Only the return value is recorded. Calls that would need mutations of their
+arguments to be replayed can't be summarized anyway, since canonical values
+aren't containers.
+"""
+
+import ast
+import hashlib
+import logging
+import os
+import tempfile
+import textwrap
+
+from pytype import __version__
+from pytype import file_utils
+from pytype import mixin
+from pytype.pyc import opcodes
+from six.moves import cPickle
+
+
+log = logging.getLogger(__name__)
+
+
+# Opcodes that make a function depend on more than its arguments and builtins.
+_NON_LEAF_OPCODES = (
+    opcodes.STORE_GLOBAL, opcodes.DELETE_GLOBAL, opcodes.LOAD_NAME,
+    opcodes.STORE_NAME, opcodes.DELETE_NAME, opcodes.IMPORT_NAME,
+    opcodes.IMPORT_FROM, opcodes.IMPORT_STAR)
+
+# Python types of the constants that we summarize.
+_CONSTANT_TYPES = (bool, int, float, complex, str, bytes)
+
+# The options that can change what a call returns or which errors it reports.
+# Options that differ between invocations, like the input and output files, the
+# module name or the imports map, are left out, since leaf functions don't
+# depend on them.
+_INFERENCE_OPTIONS = (
+    "python_version", "check", "protocols", "strict_import", "precise_return",
+    "check_attribute_types", "check_container_types", "check_parameter_types",
+    "check_variable_types", "analyze_annotated", "quick", "skip_repeat_calls",
+    "typeshed")
+
+
+def _value_to_token(vm, value):
+  """Convert a canonical abstract value to a picklable token."""
+  if value is vm.convert.unsolvable:
+    return ("Any", None)
+  for typ, instance in vm.convert.primitive_class_instances.items():
+    if value is instance:
+      return ("instance", typ.__name__)
+  for typ, cls in vm.convert.primitive_classes.items():
+    if value is cls:
+      return ("class", typ.__name__)
+  if (isinstance(value, mixin.PythonConstant) and
+      type(value.pyval) in _CONSTANT_TYPES):
+    return ("constant", repr(value.pyval))
+  return None
+
+
+def _token_to_value(vm, token):
+  kind, arg = token
+  if kind == "Any":
+    return vm.convert.unsolvable
+  elif kind == "instance":
+    return next(instance for typ, instance
+                in vm.convert.primitive_class_instances.items()
+                if typ.__name__ == arg)
+  elif kind == "class":
+    return next(cls for typ, cls in vm.convert.primitive_classes.items()
+                if typ.__name__ == arg)
+  else:
+    assert kind == "constant", kind
+    return vm.convert.constant_to_value(ast.literal_eval(arg))
+
+
+def summarize(vm, values):
+  """Summarize abstract values.
+
+  Args:
+    vm: The virtual machine.
+    values: A sequence of abstract values.
+
+  Returns:
+    A tuple of tokens that to_values() turns back into the very same values, or
+    None if not all of the values can be summarized.
+  """
+  tokens = []
+  for value in values:
+    token = _value_to_token(vm, value)
+    try:
+      if token is None or _token_to_value(vm, token) is not value:
+        return None
+    except (ValueError, SyntaxError):
+      # The repr of a constant like float("nan") can't be evaluated.
+      return None
+    tokens.append(token)
+  return tuple(tokens)
+
+
+def to_values(vm, tokens):
+  return [_token_to_value(vm, token) for token in tokens]
+
+
+class SummaryCache:
+  """Summaries of calls, stored in a cache directory.
+
+  Attributes:
+    hits: The number of summaries that were found.
+    stores: The number of summaries that were stored.
+  """
+
+  def __init__(self, cache_dir, options, src):
+    """Create a cache.
+
+    Args:
+      cache_dir: The cache directory.
+      options: config.Options object.
+      src: The source code of the file that we analyze.
+    """
+    self._dir = os.path.join(cache_dir, "summaries")
+    h = hashlib.sha256()
+    for s in (__version__.__version__, os.environ.get("TYPESHED_HOME", "")):
+      h.update(s.encode("utf-8"))
+      h.update(b"\0")
+    for name in _INFERENCE_OPTIONS:
+      h.update(repr((name, getattr(options, name, None))).encode("utf-8"))
+      h.update(b"\0")
+    self._salt = h.digest()
+    self._lines = src.splitlines()
+    # Maps code objects to a tuple of their key and the global names they load,
+    # or to None if the code isn't a leaf function.
+    self._code_keys = {}
+    self._summaries = {}
+    self.hits = 0
+    self.stores = 0
+
+  def _get_code_key(self, code):
+    if code in self._code_keys:
+      return self._code_keys[code]
+    if (code.co_freevars or code.co_cellvars or
+        code.has_generator() or code.has_async_generator() or
+        code.has_coroutine() or code.has_iterable_coroutine() or
+        any(hasattr(c, "co_code") for c in code.co_consts) or
+        any(isinstance(op, _NON_LEAF_OPCODES) for op in code.co_code)):
+      self._code_keys[code] = None
+      return None
+    h = hashlib.sha256(self._salt)
+    for s in (code.co_filename, code.co_name, code.co_argcount,
+              code.co_kwonlyargcount, code.co_flags, code.co_varnames,
+              code.co_names, code.co_consts):
+      h.update(repr(s).encode("utf-8"))
+      h.update(b"\0")
+    # Line numbers are relative to the start of the function, so that moving it
+    # around in the file doesn't change the key.
+    for op in code.co_code:
+      h.update(repr((op.__class__.__name__, getattr(op, "arg", None),
+                     op.line - code.co_firstlineno)).encode("utf-8"))
+    # Directives, type comments and variable annotations live in the source.
+    last_line = max([code.co_firstlineno] + [op.line for op in code.co_code])
+    body = "\n".join(self._lines[code.co_firstlineno - 1:last_line])
+    h.update(textwrap.dedent(body).encode("utf-8"))
+    global_names = frozenset(op.pretty_arg for op in code.co_code
+                             if isinstance(op, opcodes.LOAD_GLOBAL))
+    self._code_keys[code] = h.hexdigest(), global_names
+    return self._code_keys[code]
+
+  def get_key(self, vm, code, f_globals, annotations, callargs,
+              annotated_names):
+    """Get the key of a call.
+
+    Args:
+      vm: The virtual machine.
+      code: The code of the called function.
+      f_globals: The globals of the called function, an abstract.LazyConcreteDict.
+      annotations: The annotations of the signature, a dict of names to
+        abstract values.
+      callargs: The arguments, a dict of names to cfg.Variable.
+      annotated_names: The names of the arguments whose values were replaced by
+        instances of their annotations.
+
+    Returns:
+      The key as a hex string, or None if the call can't be summarized.
+    """
+    code_key = self._get_code_key(code)
+    if code_key is None:
+      return None
+    code_key, global_names = code_key
+    if any(name in f_globals.members for name in global_names):
+      return None
+    h = hashlib.sha256(code_key.encode("utf-8"))
+    for name, annot in sorted(annotations.items()):
+      tokens = summarize(vm, [annot])
+      if tokens is None:
+        return None
+      h.update(repr((name, tokens)).encode("utf-8"))
+    for name, var in sorted(callargs.items()):
+      if len(var.bindings) != 1:
+        # The return value of a call depends on the individual argument
+        # bindings, which a summary can't reproduce.
+        return None
+      elif name in annotated_names:
+        tokens = "annotated"
+      else:
+        tokens = summarize(vm, var.data)
+        if tokens is None:
+          return None
+      h.update(repr((name, tokens)).encode("utf-8"))
+    return h.hexdigest()
+
+  def _get_path(self, key):
+    return os.path.join(self._dir, key[:2], key)
+
+  def get(self, key):
+    """Get the summary of a call, as a tuple of tokens, or None."""
+    if key not in self._summaries:
+      try:
+        with open(self._get_path(key), "rb") as f:
+          self._summaries[key] = cPickle.load(f)
+      except (IOError, EOFError, cPickle.UnpicklingError):
+        self._summaries[key] = None
+    summary = self._summaries[key]
+    if summary is not None:
+      self.hits += 1
+    return summary
+
+  def store(self, key, summary):
+    """Store the summary of a call, as returned by summarize()."""
+    self._summaries[key] = summary
+    self.stores += 1
+    path = self._get_path(key)
+    try:
+      file_utils.makedirs(os.path.dirname(path))
+      # Write to a temporary file first, so that concurrent pytype processes
+      # never see a partially written entry.
+      fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+      with os.fdopen(fd, "wb") as f:
+        cPickle.dump(summary, f, protocol=cPickle.HIGHEST_PROTOCOL)
+      os.replace(tmp, path)
+    except (IOError, OSError) as e:
+      log.warning("Couldn't store summary %s: %s", key, e)
@@ -0,0 +1,112 @@
+"""Tests for summary_cache.py."""
+
+import os
+
+from pytype import file_utils
+from pytype.tests import test_base
+from six.moves import cPickle
+
+
+class SummaryCacheTest(test_base.BaseTest):
+  """Tests for the summary cache."""
+
+  def _summaries(self, d):
+    paths = []
+    for dirpath, _, filenames in os.walk(os.path.join(d.path, "summaries")):
+      paths.extend(os.path.join(dirpath, f) for f in filenames)
+    return paths
+
+  def test_reuse_summary(self):
+    src = """
+      def f(x):
+        return x + 1
+      y = f(1)
+    """
+    with file_utils.Tempdir() as d:
+      self.ConfigureOptions(cache_dir=d.path)
+      ty = self.Infer(src, deep=False)
+      self.assertTypesMatchPytd(ty, """
+        def f(x: int) -> int: ...
+        y: int
+      """)
+      paths = self._summaries(d)
+      self.assertEqual(len(paths), 1)
+      # Tamper with the summary to check that the next run uses it.
+      with open(paths[0], "wb") as f:
+        cPickle.dump((("instance", "str"),), f)
+      ty = self.Infer(src, deep=False)
+      self.assertTypesMatchPytd(ty, """
+        def f(x: int) -> str: ...
+        y: str
+      """)
+
+  def test_moved_function(self):
+    with file_utils.Tempdir() as d:
+      self.ConfigureOptions(cache_dir=d.path)
+      self.Infer("""
+        def f(x):
+          return x + 1
+        y = f(1)
+      """, deep=False)
+      self.Infer("""
+        import os
+
+        def f(x):
+          return x + 1
+        y = f(1)
+      """, deep=False)
+      # The function moved, but it's still the same code.
+      self.assertEqual(len(self._summaries(d)), 1)
+
+  def test_per_invocation_options(self):
+    src = """
+      def f(x):
+        return x + 1
+      y = f(1)
+    """
+    with file_utils.Tempdir() as d:
+      self.ConfigureOptions(cache_dir=d.path, output="a.pyi")
+      self.Infer(src, deep=False)
+      self.ConfigureOptions(output="b.pyi")
+      self.Infer(src, deep=False)
+      # The output file doesn't affect inference, so the summary is reused.
+      self.assertEqual(len(self._summaries(d)), 1)
+      self.ConfigureOptions(strict_import=True)
+      self.Infer(src, deep=False)
+      self.assertEqual(len(self._summaries(d)), 2)
+
+  def test_global(self):
+    with file_utils.Tempdir() as d:
+      self.ConfigureOptions(cache_dir=d.path)
+      self.Check("""
+        X = 1
+        def f():
+          return X
+        f()
+      """)
+      self.assertFalse(self._summaries(d))
+
+  def test_error(self):
+    src = """
+      def f(x):
+        return x + ""  # unsupported-operands
+      f(1)
+    """
+    with file_utils.Tempdir() as d:
+      self.ConfigureOptions(cache_dir=d.path)
+      self.CheckWithErrors(src, deep=False)
+      self.assertFalse(self._summaries(d))
+      self.CheckWithErrors(src, deep=False)
+
+  def test_disabled_error(self):
+    with file_utils.Tempdir() as d:
+      self.ConfigureOptions(cache_dir=d.path)
+      self.Check("""
+        def f(x):
+          return x + ""  # pytype: disable=unsupported-operands
+        f(1)
+      """, deep=False)
+      self.assertFalse(self._summaries(d))
+
+
+test_base.main(globals(), __name__ == "__main__")
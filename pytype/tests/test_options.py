@@ -119,5 +119,21 @@ class OptionsTest(test_base.TargetIndependentTest):
         foo.get_bar()
     """, deep=False, maximum_depth=3, init_maximum_depth=4)
 
+  def test_analysis_jobs(self):
+    self.ConfigureOptions(analysis_jobs=2)
+    self.CheckWithErrors("""
+      def f():
+        return "" + 1  # unsupported-operands
+      class Foo(object):
+        def g(self):
+          return x  # name-error
+      def h():
+        def nested():
+          return [].nope  # attribute-error
+        return 42
+      @__any_object__
+      def decorated():
+        return 1 + ""  # unsupported-operands
+    """)
 
 test_base.main(globals(), __name__ == "__main__")
@@ -44,6 +44,10 @@ ITEMS = {
     'keep_going': Item(
         False, 'False', None,
         'Keep going past errors to analyze as many files as possible.'),
+    'metrics': Item(
+        False, 'False', None,
+        'Collect pytype metrics for each file and write a report for the '
+        'whole project to metrics.txt in the output directory.'),
     'jobs': Item(
         1, '4', None,
         "Run N jobs in parallel. When 'auto' is used, this will be equivalent "
@@ -56,6 +60,10 @@ ITEMS = {
     'python_version': Item(
         '', '{}.{}'.format(*sys.version_info[:2]),
         None, 'Python version (major.minor) of the target code.'),
+    'worker_pool': Item(
+        False, 'False', None,
+        'Analyze files in long-lived worker processes that share loaded '
+        'builtins and typeshed stubs, instead of one process per file.'),
 }
 
 
@@ -106,10 +114,12 @@ def make_converters(cwd=None):
   return {
       'exclude': lambda v: file_utils.expand_source_files(v, cwd),
       'keep_going': string_to_bool,
+      'metrics': string_to_bool,
       'inputs': lambda v: file_utils.expand_source_files(v, cwd),
       'output': lambda v: file_utils.expand_path(v, cwd),
       'python_version': get_python_version,
       'pythonpath': lambda v: file_utils.expand_pythonpath(v, cwd),
+      'worker_pool': string_to_bool,
       'disable': concat_disabled_rules,
   }
 
@@ -116,7 +116,9 @@ def make_parser():
       (('-j', '--jobs'), {'action': 'store', 'type': parse_jobs,
                           'metavar': 'N'}),
       (('-P', '--pythonpath'),),
-      (('-V', '--python-version'),)
+      (('-V', '--python-version'),),
+      (('--worker-pool',), {'action': 'store_true', 'type': None}),
+      (('--metrics',), {'action': 'store_true', 'type': None}),
   ]:
     _add_file_argument(parser, types, *option)
   output = parser.add_mutually_exclusive_group()
@@ -1,13 +1,18 @@
 """Use pytype to analyze and infer types for an entire project."""
 
+import collections
 import logging
+import multiprocessing
 import os
+import queue
 import subprocess
 import sys
 
 from pytype import file_utils
+from pytype import metrics
 from pytype import module_utils
 from pytype.tools.analyze_project import config
+from pytype.tools.analyze_project import pytype_worker
 
 
 # Generate a default pyi for builtin and system dependencies.
@@ -32,6 +37,15 @@ class Stage:
 FIRST_PASS_SUFFIX = '-1'
 
 
+# The information in a build statement, for running it outside of ninja.
+BuildStep = collections.namedtuple(
+    'BuildStep', ['output', 'action', 'input', 'deps', 'imports', 'module'])
+
+
+# How many modules and opcodes to list in the metrics report.
+_METRICS_REPORT_LENGTH = 20
+
+
 def _get_executable(binary, module=None):
   """Get the path to the executable with the given name."""
   if binary == 'pytype-single':
@@ -119,6 +133,47 @@ def _module_to_output_path(mod):
     return mod.name[0] + mod.name[1:].replace('.', os.path.sep)
 
 
+def format_metrics_report(metrics_files):
+  """Merge the metrics of the analyzed modules into a project-level report.
+
+  Args:
+    metrics_files: A map from module names to the paths of the metrics files
+      that pytype-single wrote for them.
+
+  Returns:
+    The report, as a string.
+  """
+  module_times = []
+  for module_name, path in sorted(metrics_files.items()):
+    with open(path) as f:
+      for metric in metrics.load_all(f):
+        if metric.name == 'total_time':
+          module_times.append((metric.total, module_name))
+    with open(path) as f:
+      metrics.merge_from_file(f)
+  merged = metrics.get_metrics('')
+  lines = ['Analyzed %d modules in %.2f CPU seconds.' % (
+      len(metrics_files), sum(t for t, _ in module_times))]
+  solver_time = merged.get('cfg_solver_time')
+  solver_queries = merged.get('solver_queries')
+  lines.append('Typegraph solver: %.2f CPU seconds, %d queries.' % (
+      solver_time.total if solver_time else 0,
+      solver_queries.total if solver_queries else 0))
+  lines.append('')
+  lines.append('Slowest modules (CPU seconds):')
+  module_times.sort(key=lambda item: (-item[0], item[1]))
+  for seconds, module_name in module_times[:_METRICS_REPORT_LENGTH]:
+    lines.append('  %10.2f  %s' % (seconds, module_name))
+  lines.append('')
+  lines.append('Most frequent opcodes:')
+  opcodes = merged.get('vm_opcode')
+  counts = sorted(opcodes.counts.items() if opcodes else (),
+                  key=lambda item: (-item[1], item[0]))
+  for name, count in counts[:_METRICS_REPORT_LENGTH]:
+    lines.append('  %10d  %s' % (count, name))
+  return '\n'.join(lines) + '\n'
+
+
 def get_imports_map(deps, module_to_imports_map, module_to_output):
   """Get a short path -> full path map for the given deps."""
   imports_map = {}
@@ -139,11 +194,17 @@ class PytypeRunner:
     self.python_version = conf.python_version
     self.pyi_dir = os.path.join(conf.output, 'pyi')
     self.imports_dir = os.path.join(conf.output, 'imports')
+    self.cache_dir = os.path.join(conf.output, 'cache')
+    self.metrics_dir = (
+        os.path.join(conf.output, 'metrics') if conf.metrics else None)
+    self.metrics_report = os.path.join(conf.output, 'metrics.txt')
     self.ninja_file = os.path.join(conf.output, 'build.ninja')
     self.custom_options = [
         (k, getattr(conf, k)) for k in set(conf.__slots__) - set(config.ITEMS)]
     self.keep_going = conf.keep_going
     self.jobs = conf.jobs
+    self.worker_pool = conf.worker_pool
+    self.build_steps = []
 
   def set_custom_options(self, flags_with_values, binary_flags):
     """Merge self.custom_options into flags_with_values and binary_flags."""
@@ -161,13 +222,49 @@ class PytypeRunner:
 
   def get_pytype_command_for_ninja(self, report_errors):
     """Get the command line for running pytype."""
-    exe = PYTYPE_SINGLE
+    return (
+        PYTYPE_SINGLE +
+        self.get_pytype_flags(report_errors, '$imports', '$out', '$module',
+                              '$metrics' if self.metrics_dir else None) +
+        ['$in']
+    )
+
+  def get_pytype_args_for_worker(self, step):
+    """Get the pytype-single arguments for running a build step in a worker."""
+    return self.get_pytype_flags(
+        report_errors=step.action == Action.CHECK, imports=step.imports,
+        output=step.output, module_name=step.module,
+        metrics_file=self.get_metrics_file(step.module, step.output)
+    ) + [step.input]
+
+  def get_metrics_file(self, module_name, output):
+    """Get the metrics file for a build step, or None if we don't collect any.
+
+    Args:
+      module_name: The name of the module.
+      output: The output of the build step, which tells the passes over a
+        cycle of modules apart.
+
+    Returns:
+      A path or None.
+    """
+    if not self.metrics_dir:
+      return None
+    suffix = FIRST_PASS_SUFFIX if output.endswith(FIRST_PASS_SUFFIX) else ''
+    return os.path.join(self.metrics_dir, module_name + suffix + '.json')
+
+  def get_pytype_flags(self, report_errors, imports, output, module_name,
+                       metrics_file=None):
+    """Get the pytype-single flags, without the executable and input file."""
     flags_with_values = {
-        '--imports_info': '$imports',
+        '--imports_info': imports,
         '-V': self.python_version,
-        '-o': '$out',
-        '--module-name': '$module',
+        '-o': output,
+        '--module-name': module_name,
+        '--cache-dir': self.cache_dir,
     }
+    if metrics_file:
+      flags_with_values['--metrics'] = metrics_file
     binary_flags = {
         '--quick',
         '--analyze-annotated' if report_errors else '--no-report-errors',
@@ -177,10 +274,8 @@ class PytypeRunner:
       self.set_custom_options(flags_with_values, binary_flags)
     # Order the flags so that ninja recognizes commands across runs.
     return (
-        exe +
         list(sum(sorted(flags_with_values.items()), ())) +
-        sorted(binary_flags) +
-        ['$in']
+        sorted(binary_flags)
     )
 
   def make_imports_dir(self):
@@ -191,6 +286,28 @@ class PytypeRunner:
       return False
     return True
 
+  def make_metrics_dir(self):
+    """Create an empty directory for the metrics of this run."""
+    try:
+      file_utils.makedirs(self.metrics_dir)
+      for filename in os.listdir(self.metrics_dir):
+        os.remove(os.path.join(self.metrics_dir, filename))
+    except OSError:
+      logging.error('Could not create metrics directory: %s', self.metrics_dir)
+      return False
+    return True
+
+  def write_metrics_report(self):
+    """Merge the metrics of the modules we analyzed and write a report."""
+    metrics_files = {}
+    for filename in os.listdir(self.metrics_dir):
+      module_name, ext = os.path.splitext(filename)
+      if ext == '.json':
+        metrics_files[module_name] = os.path.join(self.metrics_dir, filename)
+    with open(self.metrics_report, 'w') as f:
+      f.write(format_metrics_report(metrics_files))
+    print('Wrote metrics report to %r' % self.metrics_report)
+
   def write_default_pyi(self):
     """Write a default pyi file."""
     output = os.path.join(self.imports_dir, 'default.pyi')
@@ -263,10 +380,13 @@ class PytypeRunner:
         command = ' '.join(
             self.get_pytype_command_for_ninja(report_errors=report_errors))
         logging.info('%s command: %s', action, command)
+        # pytype-single leaves the output untouched when it doesn't change, and
+        # restat tells ninja to then skip the commands that depend on it.
         f.write(
             'rule {action}\n'
             '  command = {command}\n'
-            '  description = {action} $module\n'.format(
+            '  description = {action} $module\n'
+            '  restat = 1\n'.format(
                 action=action, command=command)
         )
 
@@ -287,6 +407,7 @@ class PytypeRunner:
                           _module_to_output_path(module) + '.pyi' + suffix)
     logging.info('%s %s\n  imports: %s\n  deps: %s\n  output: %s',
                  action, module.name, imports, deps, output)
+    metrics_file = self.get_metrics_file(module.name, output)
     with open(self.ninja_file, 'a') as f:
       f.write('build {output}: {action} {input}{deps}\n'
               '  imports = {imports}\n'
@@ -297,6 +418,10 @@ class PytypeRunner:
                   deps=' | ' + ' '.join(deps) if deps else '',
                   imports=imports,
                   module=module.name))
+      if metrics_file:
+        f.write('  metrics = {metrics}\n'.format(metrics=metrics_file))
+    self.build_steps.append(BuildStep(
+        output, action, module.full_path, deps, imports, module.name))
     return output
 
   def setup_build(self):
@@ -307,6 +432,8 @@ class PytypeRunner:
     """
     if not self.make_imports_dir():
       return set()
+    if self.metrics_dir and not self.make_metrics_dir():
+      return set()
     default_output = self.write_default_pyi()
     self.write_ninja_preamble()
     files = set()
@@ -354,6 +481,74 @@ class PytypeRunner:
     print('Leaving directory %r' % c)
     return ret
 
+  def get_project_module_names(self):
+    """Get the names under which the project's modules can be imported."""
+    names = set()
+    for group, _ in self.sorted_sources:
+      for module in group:
+        if module.kind in ('Builtin', 'System'):
+          continue
+        name = module.name
+        if name.endswith('.__init__'):
+          name = name[:-len('.__init__')]
+        names.add(name)
+    return names
+
+  def build_with_worker_pool(self):
+    """Execute the build steps in a pool of long-lived pytype workers.
+
+    Steps are started as soon as the steps producing their dependencies have
+    finished. Like ninja, we do not run steps whose dependencies failed, and
+    unless keep_going is set, we start no new steps after the first failure.
+
+    Returns:
+      An exit code (0 means no error).
+    """
+    outputs = {step.output for step in self.build_steps}
+    pending = list(self.build_steps)
+    done = set()
+    failed = set()
+    running = 0
+    finished = 0
+    results = queue.Queue()
+    with multiprocessing.Pool(
+        self.jobs, initializer=pytype_worker.initialize,
+        initargs=(self.get_project_module_names(),)) as pool:
+      while True:
+        if not failed or self.keep_going:
+          still_pending = []
+          # The steps are in dependency order, so a failure propagates to all
+          # transitive dependents in a single pass.
+          for step in pending:
+            if any(d in failed for d in step.deps):
+              failed.add(step.output)
+            elif all(d in done or d not in outputs for d in step.deps):
+              # Like ninja, create the output directory for pytype-single.
+              file_utils.makedirs(os.path.dirname(step.output))
+              pool.apply_async(
+                  pytype_worker.run, (self.get_pytype_args_for_worker(step),),
+                  callback=lambda ret, step=step: results.put((step, ret)),
+                  error_callback=lambda e, step=step: results.put((step, e)))
+              running += 1
+            else:
+              still_pending.append(step)
+          pending = still_pending
+        if not running:
+          break
+        step, ret = results.get()
+        running -= 1
+        finished += 1
+        print('[%d/%d] %s %s' % (
+            finished, len(self.build_steps), step.action, step.module))
+        if isinstance(ret, Exception):
+          logging.error('%s %s failed: %s', step.action, step.module, ret)
+          ret = 1
+        if ret:
+          failed.add(step.output)
+        else:
+          done.add(step.output)
+    return 1 if failed else 0
+
   def run(self):
     """Run pytype over the project."""
     logging.info('------------- Starting pytype run. -------------')
@@ -361,7 +556,12 @@ class PytypeRunner:
     num_sources = len(self.filenames & files_to_analyze)
     print('Analyzing %d sources with %d local dependencies' %
           (num_sources, len(files_to_analyze) - num_sources))
-    ret = self.build()
+    if self.worker_pool:
+      ret = self.build_with_worker_pool()
+    else:
+      ret = self.build()
+    if self.metrics_dir:
+      self.write_metrics_report()
     if not ret:
       print('Success: no errors found')
     return ret
@@ -5,11 +5,14 @@ import os
 
 from pytype import config as pytype_config
 from pytype import file_utils
+from pytype import metrics
 from pytype import module_utils
 from pytype.tools.analyze_project import parse_args
 from pytype.tools.analyze_project import pytype_runner
+from pytype.tools.analyze_project import pytype_worker
 import six
 import unittest
+from unittest import mock
 
 
 # Convenience aliases.
@@ -30,7 +33,7 @@ ExpectedBuildStatement = collections.namedtuple(
 
 
 # number of lines in the build.ninja preamble
-_PREAMBLE_LENGTH = 6
+_PREAMBLE_LENGTH = 8
 
 
 class FakeImportGraph:
@@ -241,6 +244,9 @@ class TestGetRunCmd(TestBase):
   def test_module_name(self):
     self.assertEqual(self.get_basic_options().module_name, '$module')
 
+  def test_cache_dir(self):
+    self.assertEqual(self.get_basic_options().cache_dir, self.runner.cache_dir)
+
   def test_error_reporting(self):
     # Disable error reporting
     options = self.get_basic_options(report_errors=False)
@@ -369,20 +375,23 @@ class TestNinjaPreamble(TestBase):
       with open(runner.ninja_file, 'r') as f:
         preamble = f.read().splitlines()
     self.assertEqual(len(preamble), _PREAMBLE_LENGTH)
-    # The preamble consists of triples of lines of the format:
+    # The preamble consists of quadruples of lines of the format:
     # rule {name}
     #   command = pytype-single {args} $in
     #   description = {name} $module
+    #   restat = 1
     # Check that the lines cycle through these patterns.
     for i, line in enumerate(preamble):
-      if not i % 3:
+      if not i % 4:
         six.assertRegex(self, line, r'rule \w*')
-      elif i % 3 == 1:
+      elif i % 4 == 1:
         expected = r'  command = {} .* \$in'.format(
             ' '.join(pytype_runner.PYTYPE_SINGLE))
         six.assertRegex(self, line, expected)
-      else:
+      elif i % 4 == 2:
         six.assertRegex(self, line, r'  description = \w* \$module')
+      else:
+        self.assertEqual(line, '  restat = 1')
 
 
 class TestNinjaBuildStatement(TestBase):
@@ -596,6 +605,146 @@ class TestNinjaBody(TestBase):
         module='foo'))
 
 
+def _fake_worker_run(argv):
+  """Stands in for pytype_worker.run: fails for module 'bad', else succeeds."""
+  options = pytype_config.Options(argv, command_line=True)
+  if options.module_name == 'bad':
+    return 1
+  with open(options.output, 'w') as f:
+    f.write(options.module_name)
+  return 0
+
+
+class TestWorkerPool(TestBase):
+  """Test PytypeRunner.build_with_worker_pool."""
+
+  def setUp(self):
+    super().setUp()
+    self.conf = self.parser.config_from_defaults()
+
+  def test_args(self):
+    runner = make_runner([], [], self.conf)
+    step = pytype_runner.BuildStep(
+        output='foo.pyi', action=Action.CHECK, input='foo.py', deps=(),
+        imports='foo.imports', module='foo')
+    args = runner.get_pytype_args_for_worker(step)
+    start = args.index('--imports_info')
+    self.assertEqual(args[start:start+2], ['--imports_info', 'foo.imports'])
+    del args[start:start+2]
+    options = pytype_config.Options(args, command_line=True)
+    self.assertEqual(options.input, 'foo.py')
+    self.assertEqual(options.output, 'foo.pyi')
+    self.assertEqual(options.module_name, 'foo')
+    self.assertTrue(options.report_errors)
+
+  def test_build_steps(self):
+    src = Module('', 'foo.py', 'foo')
+    dep = Module('', 'bar.py', 'bar')
+    with file_utils.Tempdir() as d:
+      self.conf.output = d.path
+      runner = make_runner(
+          [src], [((dep,), ()), ((src,), (dep,))], self.conf)
+      runner.setup_build()
+    bar_output = os.path.join(runner.pyi_dir, 'bar.pyi')
+    self.assertEqual(runner.build_steps, [
+        pytype_runner.BuildStep(
+            bar_output, Action.INFER, 'bar.py', (),
+            os.path.join(runner.imports_dir, 'bar.imports'), 'bar'),
+        pytype_runner.BuildStep(
+            os.path.join(runner.pyi_dir, 'foo.pyi'), Action.CHECK, 'foo.py',
+            (bar_output,), os.path.join(runner.imports_dir, 'foo.imports'),
+            'foo'),
+    ])
+
+  def test_project_module_names(self):
+    init = Module('', 'foo/__init__.py', 'foo.__init__')
+    mod = Module('', 'foo/bar.py', 'foo.bar')
+    system = Module('', 'baz.py', 'baz', 'System')
+    runner = make_runner([], [((system,), ()), ((init, mod), (system,))],
+                         self.conf)
+    self.assertEqual(runner.get_project_module_names(), {'foo', 'foo.bar'})
+
+  def _build(self, sources, keep_going):
+    self.conf.keep_going = keep_going
+    self.conf.jobs = 2
+    with file_utils.Tempdir() as d:
+      self.conf.output = d.path
+      runner = make_runner(
+          [m for group, _ in sources for m in group], sources, self.conf)
+      runner.setup_build()
+      with mock.patch.object(pytype_worker, 'run', _fake_worker_run):
+        ret = runner.build_with_worker_pool()
+      built = {os.path.basename(step.output) for step in runner.build_steps
+               if os.path.exists(step.output)}
+    return ret, built
+
+  def test_success(self):
+    a = Module('', 'a.py', 'a')
+    b = Module('', 'b.py', 'b')
+    c = Module('', 'c.py', 'c')
+    ret, built = self._build([((a,), ()), ((b,), (a,)), ((c,), (a, b))],
+                             keep_going=False)
+    self.assertEqual(ret, 0)
+    self.assertEqual(built, {'a.pyi', 'b.pyi', 'c.pyi'})
+
+  def test_failed_dependency(self):
+    bad = Module('', 'bad.py', 'bad')
+    a = Module('', 'a.py', 'a')
+    b = Module('', 'b.py', 'b')
+    ret, built = self._build([((bad,), ()), ((a,), (bad,)), ((b,), ())],
+                             keep_going=True)
+    self.assertEqual(ret, 1)
+    self.assertEqual(built, {'b.pyi'})
+
+
+class TestMetrics(TestBase):
+  """Test the collection of metrics."""
+
+  def setUp(self):
+    super().setUp()
+    self.conf = self.parser.config_from_defaults()
+    self.conf.metrics = True
+
+  def test_args(self):
+    runner = make_runner([], [], self.conf)
+    step = pytype_runner.BuildStep(
+        output='foo.pyi-1', action=Action.INFER, input='foo.py', deps=(),
+        imports='foo.imports', module='foo')
+    args = runner.get_pytype_args_for_worker(step)
+    start = args.index('--metrics')
+    self.assertEqual(args[start + 1],
+                     os.path.join(runner.metrics_dir, 'foo-1.json'))
+
+  def test_no_metrics(self):
+    self.conf.metrics = False
+    runner = make_runner([], [], self.conf)
+    self.assertNotIn('--metrics',
+                     runner.get_pytype_command_for_ninja(report_errors=True))
+
+  def test_report(self):
+    metrics._prepare_for_test()
+    total_time = metrics.StopWatch('total_time')
+    opcodes = metrics.MapCounter('vm_opcode')
+    metrics_files = {}
+    with file_utils.Tempdir() as d:
+      for module_name, seconds, num_opcodes in (('a', 1.0, 3), ('b', 2.0, 5)):
+        total_time._total = seconds
+        opcodes._reset()
+        opcodes.inc('LOAD_NAME', num_opcodes)
+        opcodes.inc('RETURN_VALUE')
+        path = metrics_files[module_name] = d.create_file(module_name + '.json')
+        with open(path, 'w') as f:
+          metrics.dump_all([total_time, opcodes], f)
+      metrics._prepare_for_test()
+      report = pytype_runner.format_metrics_report(metrics_files)
+    metrics._prepare_for_test(enabled=False)
+    lines = report.splitlines()
+    self.assertEqual(lines[0], 'Analyzed 2 modules in 3.00 CPU seconds.')
+    self.assertLess(report.index(' b\n'), report.index(' a\n'))
+    self.assertIn('         8  LOAD_NAME', lines)
+    self.assertIn('         2  RETURN_VALUE', lines)
+
+
 class TestImports(TestBase):
   """Test imports-related functionality."""
 
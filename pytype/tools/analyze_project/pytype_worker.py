@@ -0,0 +1,102 @@
+"""Long-lived pytype-single workers for analyze_project.
+
+A worker analyzes one module at a time, exactly like a pytype-single process
+would, but keeps the resolved pyi files that ship with pytype and typeshed
+around between modules, so that builtins, typing and the standard library are
+parsed and resolved once per worker rather than once per module.
+"""
+
+from pytype import config
+from pytype import io
+from pytype import load_pytd
+from pytype import metrics
+from pytype.pytd import visitors
+from pytype.pytd.parse import node
+
+
+# The names of the modules in the project being analyzed. A project module can
+# shadow a typeshed module of the same name, so such modules are never shared.
+_project_modules = frozenset()
+
+# Resolved modules from earlier runs in this worker, as a name -> Module map.
+_shared_modules = {}
+
+
+def initialize(project_modules):
+  """Initializes a worker process.
+
+  Args:
+    project_modules: The names of the modules in the project.
+  """
+  global _project_modules
+  _project_modules = frozenset(project_modules)
+  _shared_modules.clear()
+
+
+def _is_shareable(module):
+  return (module.filename.startswith(load_pytd.Loader.PREFIX) and
+          module.module_name not in _project_modules)
+
+
+def _collect_shared_modules(loader):
+  """Remembers the loader's shareable modules for use by later runs.
+
+  A module is shareable if it ships with pytype or typeshed and everything it
+  references is shareable too, so that it does not depend on anything specific
+  to the module that was analyzed.
+
+  Args:
+    loader: The load_pytd.Loader used for the last run.
+  """
+  resolved = loader.get_resolved_modules()
+  candidates = {}
+  for name, module in resolved.items():
+    if name in _shared_modules or not _is_shareable(module):
+      continue
+    deps = visitors.CollectDependencies()
+    module.ast.Visit(deps)
+    candidates[name] = (module, set(deps.dependencies) - {name})
+  changed = True
+  while changed:
+    changed = False
+    for name, (_, deps) in list(candidates.items()):
+      if any(dep in resolved and dep not in candidates and
+             dep not in _shared_modules for dep in deps):
+        del candidates[name]
+        changed = True
+  for name, (module, _) in candidates.items():
+    _shared_modules[name] = load_pytd.Module(
+        name, module.filename, module.ast, dirty=False)
+
+
+def _create_loader(options):
+  # --strict-import relies on the loader recording every module it loads, and
+  # --precompiled-builtins already shares its modules through a pickle.
+  if (options.strict_import or options.precompiled_builtins or
+      not {'__builtin__', 'typing'} <= set(_shared_modules)):
+    return load_pytd.create_loader(options)
+  return load_pytd.create_loader(options, modules=dict(_shared_modules))
+
+
+def run(argv):
+  """Runs pytype-single in this worker.
+
+  Args:
+    argv: The pytype-single command line arguments.
+
+  Returns:
+    An exit code (0 means no error).
+  """
+  try:
+    options = config.Options(argv, command_line=True)
+  except SystemExit as e:
+    return e.code
+  node.SetCheckPreconditions(options.check_preconditions)
+  loader = _create_loader(options)
+  # Metrics are global, so discard the ones collected for the previous module.
+  metrics.reset_all()
+  with metrics.MetricsContext(options.metrics, options.open_function):
+    with metrics.get_metric('total_time', metrics.StopWatch):
+      ret = io.process_one_file(options, loader)
+  _collect_shared_modules(loader)
+  return ret
@@ -52,6 +52,8 @@ static PyObject* k_variables;
 static PyObject* k_program;
 static PyObject* k_id;
 static PyObject* k_next_variable_id;
+static PyObject* k_next_binding_id;
+static PyObject* k_next_node_id;
 static PyObject* k_condition;
 static PyObject* k_default_data;
 
@@ -291,6 +293,10 @@ static PyObject* ProgramGetAttro(PyObject* self, PyObject* attr) {
     }
   } else if (PyObject_RichCompareBool(attr, k_next_variable_id, Py_EQ) > 0) {
     return PyInt_FromSize_t(program->program->next_variable_id());
+  } else if (PyObject_RichCompareBool(attr, k_next_binding_id, Py_EQ) > 0) {
+    return PyInt_FromSize_t(program->program->next_binding_id());
+  } else if (PyObject_RichCompareBool(attr, k_next_node_id, Py_EQ) > 0) {
+    return PyInt_FromSize_t(program->program->CountCFGNodes());
   } else if (PyObject_RichCompareBool(attr, k_default_data, Py_EQ) > 0) {
     auto data = reinterpret_cast<PyObject*>(
         program->program->default_data().get());
@@ -1505,6 +1511,10 @@ static PyObject* InitModule(PyObject* module) {
   k_id = PyString_FromString("id");
   Py_XDECREF(k_next_variable_id);
   k_next_variable_id = PyString_FromString("next_variable_id");
+  Py_XDECREF(k_next_binding_id);
+  k_next_binding_id = PyString_FromString("next_binding_id");
+  Py_XDECREF(k_next_node_id);
+  k_next_node_id = PyString_FromString("next_node_id");
   Py_XDECREF(k_condition);
   k_condition = PyString_FromString("condition");
   Py_XDECREF(k_default_data);
@@ -1518,6 +1528,8 @@ PYBIND11_MODULE(cfg, m) {
   m.doc() = "Typegraph is a points-to / dataflow / cfg graph engine.\n"
     "It can be used to run reaching-definition queries on a nested CFG graph "
     "and to model path-specific visibility of nested data structures.";
+  // Lets callers tell this module apart from the pure-Python cfg.py.
+  m.attr("BACKEND") = "c++";
 
   pybind11::class_<typegraph::NodeMetrics>(m, "NodeMetrics")
       .def_property_readonly("incoming_edge_count",
@@ -1,5 +1,8 @@
 """Test for the cfg Python extension module."""
 
+import random
+import types
+
 from pytype.typegraph import cfg
 
 import six
@@ -10,6 +13,9 @@ import unittest
 class CFGTest(unittest.TestCase):
   """Test control flow graph creation."""
 
+  def test_backend(self):
+    self.assertIn(cfg.BACKEND, ("c++", "python"))
+
   def test_simple_graph(self):
     p = cfg.Program()
     n1 = p.NewCFGNode("foo")
@@ -527,6 +533,8 @@ class CFGTest(unittest.TestCase):
     six.assertCountEqual(self, [a11, a21], n1.bindings)
     six.assertCountEqual(self, [a12, a22], n2.bindings)
     self.assertEqual(p.next_variable_id, 2)
+    self.assertEqual(p.next_binding_id, 4)
+    self.assertEqual(p.next_node_id, 2)
 
   def test_entry_point(self):
     p = cfg.Program()
@@ -921,6 +929,89 @@ class CFGTest(unittest.TestCase):
     self.assertEqual(v.FilteredData(node, strict=False), [b.data])
     self.assertEqual(v.Bindings(node, strict=False), [b])
 
+  def test_solver_sees_new_edge(self):
+    p = cfg.Program()
+    n1 = p.NewCFGNode("n1")
+    n2 = p.NewCFGNode("n2")
+    x = p.NewVariable().AddBinding("x", [], n1)
+    self.assertFalse(n2.HasCombination([x]))
+    n1.ConnectTo(n2)
+    self.assertTrue(n2.HasCombination([x]))
+
+  def test_solver_sees_new_origin(self):
+    p = cfg.Program()
+    n1 = p.NewCFGNode("n1")
+    n2 = n1.ConnectNew("n2")
+    n3 = n2.ConnectNew("n3")
+    v = p.NewVariable()
+    x = v.AddBinding("x", [], n1)
+    self.assertTrue(n3.HasCombination([x]))
+    # Overwriting v at n2 hides x at n3.
+    v.AddBinding("y", [], n2)
+    self.assertFalse(n3.HasCombination([x]))
+    self.assertTrue(n1.HasCombination([x]))
+
+  def _apply(self, program, op):
+    """Applies a change from test_solver_matches_fresh_solver."""
+    kind, args = op[0], op[1:]
+    if kind == "node":
+      parent, = args
+      program.nodes.append(program.nodes[parent].ConnectNew())
+    elif kind == "edge":
+      src, dst = args
+      program.nodes[src].ConnectTo(program.nodes[dst])
+    else:
+      variable, data, sources, where = args
+      program.bindings.append(
+          program.variables[variable].AddBinding(
+              data, [program.bindings[i] for i in sources],
+              program.nodes[where]))
+
+  def _new_program(self, ops):
+    program = cfg.Program()
+    p = types.SimpleNamespace(
+        program=program,
+        nodes=[program.NewCFGNode("root")],
+        variables=[program.NewVariable() for _ in range(5)],
+        bindings=[])
+    for op in ops:
+      self._apply(p, op)
+    return p
+
+  def _has_combination(self, program, node, bindings):
+    return program.nodes[node].HasCombination(
+        [program.bindings[i] for i in bindings])
+
+  def test_solver_matches_fresh_solver(self):
+    # Interleave random changes with queries, and check that the incrementally
+    # invalidated solver agrees with one that starts from scratch.
+    rng = random.Random(0)
+    ops = []
+    p = self._new_program(ops)
+    for _ in range(200):
+      num_nodes, num_bindings = len(p.nodes), len(p.bindings)
+      action = rng.random()
+      if action < 0.25:
+        op = ("node", rng.randrange(num_nodes))
+      elif action < 0.35:
+        op = ("edge", rng.randrange(num_nodes), rng.randrange(num_nodes))
+      elif action < 0.6:
+        sources = rng.sample(range(num_bindings),
+                             min(num_bindings, rng.randint(0, 2)))
+        op = ("binding", rng.randrange(5), "d%d" % rng.randrange(4), sources,
+              rng.randrange(num_nodes))
+      else:
+        if num_bindings:
+          node = rng.randrange(num_nodes)
+          query = rng.sample(range(num_bindings),
+                             min(num_bindings, rng.randint(1, 2)))
+          self.assertEqual(
+              self._has_combination(p, node, query),
+              self._has_combination(self._new_program(ops), node, query))
+        continue
+      ops.append(op)
+      self._apply(p, op)
+
 
 if __name__ == "__main__":
   unittest.main()
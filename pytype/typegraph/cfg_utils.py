@@ -1,7 +1,11 @@
 """Utilities for working with the CFG."""
 
 import collections
+import functools
 import itertools
+import operator
+
+from pytype import metrics
 
 
 # Limit on how many argument combinations we allow before aborting.
@@ -15,6 +19,8 @@ import itertools
 # cuts off problematic files, with a comfortable margin.
 DEEP_VARIABLE_LIMIT = 1024
 
+_pruned_combinations = metrics.Counter("cfg_utils_pruned_combinations")
+
 
 def variable_product(variables):
   """Take the Cartesian product of a number of Variables.
@@ -71,7 +77,7 @@ class ComplexityLimit:
       raise TooComplexError()
 
 
-def deep_variable_product(variables, limit=DEEP_VARIABLE_LIMIT):
+def deep_variable_product(variables, limit=DEEP_VARIABLE_LIMIT, node=None):
   """Take the deep Cartesian product of a list of Variables.
 
   For example:
@@ -86,9 +92,15 @@ def deep_variable_product(variables, limit=DEEP_VARIABLE_LIMIT):
        [x1, x3, x5, x6],
        [x2, x6]]
   .
+  If a node is given, only combinations that pass node.CanHaveCombination are
+  returned. Since that check holds for a combination if and only if it holds
+  for each of its values, values that fail it are pruned while the product is
+  being expanded, and never count towards the limit.
+
   Args:
     variables: A sequence of Variables.
     limit: How many results we allow before aborting.
+    node: Optionally, the CFG node at which the combinations should be possible.
 
   Returns:
     A list of lists of Values, where each sublist has one Value from each
@@ -98,20 +110,27 @@ def deep_variable_product(variables, limit=DEEP_VARIABLE_LIMIT):
     TooComplexError: If we expanded too many values.
   """
   return _deep_values_list_product((v.bindings for v in variables), set(),
-                                   ComplexityLimit(limit))
+                                   ComplexityLimit(limit), node)
 
 
-def _deep_values_list_product(values_list, seen, complexity_limit):
+def _deep_values_list_product(values_list, seen, complexity_limit, node=None):
   """Take the deep Cartesian product of a list of list of Values."""
+  values_list = [values for values in values_list if values]
+  if node is not None:
+    possible_values_list = _possible_values_list(values_list, node)
+    if possible_values_list is not values_list:
+      _pruned_combinations.inc(_product_size(values_list) -
+                               _product_size(possible_values_list))
+      values_list = possible_values_list
   result = []
-  for row in itertools.product(*(values for values in values_list if values)):
+  for row in itertools.product(*values_list):
     extra_params = [value for entry in row if entry not in seen  # pylint: disable=g-complex-comprehension
                     for value in entry.data.unique_parameter_values()]
-    extra_values = (extra_params and
-                    _deep_values_list_product(extra_params, seen.union(row),
-                                              complexity_limit))
-    if extra_values:
-      for new_row in extra_values:
+    if extra_params:
+      # If all the values of one of the extra params were pruned, there are no
+      # possible combinations with this row.
+      for new_row in _deep_values_list_product(
+          extra_params, seen.union(row), complexity_limit, node):
         result.append(row + new_row)
     else:
       complexity_limit.inc()
@@ -119,6 +138,30 @@ def _deep_values_list_product(values_list, seen, complexity_limit):
   return result
 
 
+def _possible_values_list(values_list, node):
+  """Drops the values that fail node.CanHaveCombination.
+
+  Args:
+    values_list: A list of lists of Values.
+    node: The CFG node.
+
+  Returns:
+    A list of lists of the possible Values, or values_list itself if all of
+    them are possible.
+  """
+  # Typically, all values are possible, which a single query can tell us.
+  if node.CanHaveCombination(
+      [value for values in values_list for value in values]):
+    return values_list
+  return [[value for value in values if node.CanHaveCombination([value])]
+          for values in values_list]
+
+
+def _product_size(values_list):
+  return functools.reduce(operator.mul, (len(values) for values in values_list),
+                          1)
+
+
 def variable_product_dict(variabledict, limit=DEEP_VARIABLE_LIMIT):
   """Take the Cartesian product of variables in the values of a dict.
 
@@ -187,6 +187,44 @@ class VariableProductTest(unittest.TestCase):
         {x2, x6},
     ])
 
+  def test_deep_variable_product_with_node(self):
+    x1, x2, x3, x4, x5 = [DummyValue(i + 1) for i in range(5)]
+    node = self.current_location.ConnectNew()
+    other_node = self.prog.NewCFGNode()
+    v1 = self.prog.NewVariable([x1], [], self.current_location)
+    v1.AddBinding(x2, [], other_node)
+    v2 = self.prog.NewVariable([x3], [], node)
+    v2.AddBinding(x4, [], other_node)
+    v3 = self.prog.NewVariable([x5], [], other_node)
+    x1.set_parameters([v2])
+    x2.set_parameters([v3])
+    product = cfg_utils.deep_variable_product([v1], node=node)
+    rows = [{a.data for a in row}
+            for row in product]
+    six.assertCountEqual(self, rows, [{x1, x3}])
+
+  def test_deep_variable_product_with_impossible_parameter(self):
+    x1, x2 = [DummyValue(i + 1) for i in range(2)]
+    node = self.current_location.ConnectNew()
+    v1 = self.prog.NewVariable([x1], [], node)
+    v2 = self.prog.NewVariable([x2], [], self.prog.NewCFGNode())
+    x1.set_parameters([v2])
+    self.assertFalse(cfg_utils.deep_variable_product([v1], node=node))
+
+  def test_deep_variable_product_pruned_values_are_not_counted(self):
+    values = [DummyValue(i + 1) for i in range(4)]
+    node = self.current_location.ConnectNew()
+    other_node = self.prog.NewCFGNode()
+    variables = []
+    for _ in range(4):
+      v = self.prog.NewVariable(values[:1], [], node)
+      v.AddBinding(values[1], [], other_node)
+      variables.append(v)
+    self.assertRaises(cfg_utils.TooComplexError,
+                      cfg_utils.deep_variable_product, variables, 4)
+    product = cfg_utils.deep_variable_product(variables, 4, node)
+    self.assertEqual(1, len(product))
+
   def test_variable_product_dict(self):
     u1 = self.prog.NewVariable([1, 2], [], self.current_location)
     u2 = self.prog.NewVariable([3, 4], [], self.current_location)
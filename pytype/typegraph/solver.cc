@@ -117,7 +117,7 @@ size_t State::Hash() const {
 
 PathFinder::PathFinder()
     : solved_find_queries_(
-          new QueryMap){}
+          new QueryMapByStart){}
 
 PathFinder::~PathFinder() {}
 
@@ -211,7 +211,8 @@ QueryResult PathFinder::FindNodeBackwards(
     const CFGNode* finish,
     const CFGNodeSet& blocked) {
   QueryKey query(start, finish, blocked);
-  const auto* res = map_util::FindOrNull(*solved_find_queries_, query);
+  QueryMap& solved_find_queries = (*solved_find_queries_)[start];
+  const auto* res = map_util::FindOrNull(solved_find_queries, query);
   if (res)
     return *res;
   // Declaring result here and filling it in later lets us use RVO.
@@ -220,7 +221,7 @@ QueryResult PathFinder::FindNodeBackwards(
   if (shortest_path.empty()) {
     result.path_exists = false;
     result.path = shortest_path;
-    (*solved_find_queries_)[query] = result;
+    solved_find_queries[query] = result;
     return result;
   }
   // We now have the shortest path to finish. All articulation points are
@@ -247,21 +248,48 @@ QueryResult PathFinder::FindNodeBackwards(
   }
   result.path_exists = true;
   result.path = path;
-  (*solved_find_queries_)[query] = result;
+  solved_find_queries[query] = result;
   return result;
 }
 
+void PathFinder::Invalidate(const CFGNodeSet& nodes) {
+  for (const CFGNode* node : nodes)
+    solved_find_queries_->erase(node);
+}
+
 }  // namespace internal
 
 Solver::Solver(const Program* program)
-    : solved_states_(new internal::StateMap),
+    : solved_states_(new internal::StateMapByPos),
       state_cache_hits_(0),
       state_cache_misses_(0),
       program_(program) {}
 
+void Solver::Invalidate(const CFGNode* where) {
+  // PathFinder queries start at the positions of solved states, so if there
+  // are no solved states, there is nothing to discard.
+  if (solved_states_->empty())
+    return;
+  CFGNodeSet affected;
+  std::vector<const CFGNode*> stack;
+  stack.push_back(where);
+  while (!stack.empty()) {
+    const CFGNode* node = stack.back();
+    stack.pop_back();
+    if (!affected.insert(node).second)
+      continue;
+    stack.insert(stack.end(), node->outgoing().begin(), node->outgoing().end());
+  }
+  for (const CFGNode* node : affected)
+    solved_states_->erase(node);
+  path_finder_.Invalidate(affected);
+}
+
 SolverMetrics Solver::CalculateMetrics() const {
-  auto cm = CacheMetrics(solved_states_->size(), state_cache_hits_,
-                         state_cache_misses_);
+  size_t cache_size = 0;
+  for (const auto& it : *solved_states_)
+    cache_size += it.second.size();
+  auto cm = CacheMetrics(cache_size, state_cache_hits_, state_cache_misses_);
   return SolverMetrics(std::vector<QueryMetrics>(query_metrics_), cm);
 }
 
@@ -382,7 +410,8 @@ bool Solver::CanHaveSolution(
 // Like FindSolution, but memoizes states we already solved.
 bool Solver::RecallOrFindSolution(const internal::State& state,
                                   int current_depth) {
-  const bool* status = map_util::FindOrNull(*solved_states_, state);
+  internal::StateMap& solved_states = (*solved_states_)[state.pos()];
+  const bool* status = map_util::FindOrNull(solved_states, state);
   if (status) {
     state_cache_hits_ += 1;
     query_metrics_.back().set_from_cache(true);
@@ -401,10 +430,10 @@ bool Solver::RecallOrFindSolution(const internal::State& state,
   // solvable state, even though we have not solved it yet. The reasoning is
   // that if it's possible to solve this state at this level of the tree, it can
   // also be solved in any of the children.
-  (*solved_states_)[state] = true;
+  solved_states[state] = true;
 
   bool result = FindSolution(state, current_depth);
-  (*solved_states_)[state] = result;
+  solved_states[state] = result;
   return result;
 }
 
@@ -92,6 +92,11 @@ class State {
 
 typedef std::unordered_map<const State, bool, map_util::hash<State>> StateMap;
 
+// Solved states, indexed by their position, so that we can discard the states
+// at the positions that a change to the program could affect.
+typedef std::unordered_map<const CFGNode*, StateMap, CFGNodePtrHash>
+    StateMapByPos;
+
 // The PathFinder uses QueryKeys to cache queries. Each query is characterized
 // by the start and end nodes and the set of blocked nodes.
 // This class implements functions necessary for use in a hash map, namely Hash,
@@ -146,6 +151,10 @@ struct QueryResult {
 typedef std::unordered_map<QueryKey, QueryResult, map_util::hash<QueryKey>>
     QueryMap;
 
+// Queries, indexed by their start node.
+typedef std::unordered_map<const CFGNode*, QueryMap, CFGNodePtrHash>
+    QueryMapByStart;
+
 // PathFinder is a helper class for finding paths within a CFG. It memoizes
 // queries to improve performance.
 class PathFinder {
@@ -177,15 +186,21 @@ class PathFinder {
   QueryResult FindNodeBackwards(const CFGNode* start, const CFGNode* finish,
                                 const CFGNodeSet& blocked);
 
+  // Discard the memoized queries that start at any of the given nodes.
+  void Invalidate(const CFGNodeSet& nodes);
+
  private:
-  const std::unique_ptr<QueryMap> solved_find_queries_;
+  const std::unique_ptr<QueryMapByStart> solved_find_queries_;
 };
 
 }  // namespace internal
 
 // The solver class is instantiated for a given "problem" instance. It maintains
 // a cache of solutions for subproblems to be able to recall them if they
-// reoccur in the solving process.
+// reoccur in the solving process. The solver only ever searches backwards
+// through the CFG, so a solution is only affected by changes at nodes from which
+// its position can be reached, and the cache is indexed by position so that we
+// can discard exactly those solutions when the program changes.
 // This class is thread compatible.
 class Solver {
  public:
@@ -205,6 +220,9 @@ class Solver {
   bool Solve(const std::vector<const Binding*>& start_attrs,
              const CFGNode* start_node);
 
+  // Discard the solutions that a change at the given node could affect.
+  void Invalidate(const CFGNode* where);
+
   SolverMetrics CalculateMetrics () const;
 
  private:
@@ -224,7 +242,7 @@ class Solver {
   bool Solve_(const std::vector<const Binding*>& start_attrs,
              const CFGNode* start_node);
 
-  const std::unique_ptr<internal::StateMap> solved_states_;
+  const std::unique_ptr<internal::StateMapByPos> solved_states_;
   size_t state_cache_hits_;
   size_t state_cache_misses_;
 
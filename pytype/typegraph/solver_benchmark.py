@@ -0,0 +1,198 @@
+"""Benchmark the typegraph solver implementations against each other.
+
+Builds synthetic CFGs with many nodes, bindings and origins, and measures
+HasCombination and Filter throughput as well as peak memory for both the C++
+extension module and the pure-Python cfg.py. Since both are importable as
+pytype.typegraph.cfg, they are loaded from their files directly, and each
+backend is run in a fresh process so that memory numbers are not mixed up.
+
+The benchmark also checks that both backends agree on every query.
+
+Usage:
+  python -m pytype.typegraph.solver_benchmark [--nodes N] [--variables N] ...
+"""
+
+import argparse
+import concurrent.futures
+import glob
+import importlib.machinery
+import importlib.util
+import os
+import random
+import resource
+import sys
+import time
+
+
+_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _find_backends():
+  """Returns a name -> (loader class, path) map of the available backends."""
+  backends = {}
+  for suffix in importlib.machinery.EXTENSION_SUFFIXES:
+    for path in glob.glob(os.path.join(_DIR, "cfg" + suffix)):
+      backends["c++"] = (importlib.machinery.ExtensionFileLoader, path)
+  path = os.path.join(_DIR, "cfg.py")
+  if os.path.exists(path):
+    backends["python"] = (importlib.machinery.SourceFileLoader, path)
+  return backends
+
+
+def load_backend(name):
+  """Loads a typegraph implementation without registering it in sys.modules.
+
+  Args:
+    name: "c++" or "python".
+
+  Returns:
+    The cfg module.
+  """
+  loader_class, path = _find_backends()[name]
+  # The extension module's init function is derived from the last part of the
+  # module name, so it has to be called cfg.
+  loader = loader_class("pytype.typegraph.cfg", path)
+  spec = importlib.util.spec_from_file_location(
+      "pytype.typegraph.cfg", path, loader=loader)
+  module = importlib.util.module_from_spec(spec)
+  loader.exec_module(module)
+  return module
+
+
+def build_program(cfg, num_nodes, num_variables, num_bindings, seed):
+  """Builds a synthetic program.
+
+  The CFG is a chain of diamonds, i.e. each step branches into two nodes that
+  join again. Bindings are placed at random nodes, and each gets an origin
+  whose source set contains up to two bindings from earlier nodes.
+
+  Args:
+    cfg: The typegraph module.
+    num_nodes: The approximate number of CFG nodes.
+    num_variables: The number of variables.
+    num_bindings: The number of bindings per variable.
+    seed: The random seed.
+
+  Returns:
+    A tuple of the program, the final CFG node, the list of variables and the
+    list of bindings.
+  """
+  rng = random.Random(seed)
+  program = cfg.Program()
+  node = program.NewCFGNode("root")
+  program.entrypoint = node
+  nodes = [node]
+  for i in range(max(num_nodes // 3, 1)):
+    left = node.ConnectNew("left%d" % i)
+    right = node.ConnectNew("right%d" % i)
+    node = left.ConnectNew("join%d" % i)
+    right.ConnectTo(node)
+    nodes.extend((left, right, node))
+  variables = []
+  # Bindings as (index of the node they're defined at, binding) tuples.
+  placed = []
+  for i in range(num_variables):
+    variable = program.NewVariable()
+    for j in range(num_bindings):
+      pos = rng.randrange(len(nodes))
+      earlier = [b for p, b in placed if p <= pos]
+      sources = rng.sample(earlier, min(len(earlier), rng.randint(0, 2)))
+      binding = variable.AddBinding(
+          "v%d_%d" % (i, j), source_set=sources, where=nodes[pos])
+      placed.append((pos, binding))
+    variables.append(variable)
+  return program, node, variables, [b for _, b in placed]
+
+
+def run_benchmark(backend, num_nodes, num_variables, num_bindings,
+                  num_queries, seed):
+  """Runs the benchmark for one backend.
+
+  Args:
+    backend: "c++" or "python".
+    num_nodes: The approximate number of CFG nodes.
+    num_variables: The number of variables.
+    num_bindings: The number of bindings per variable.
+    num_queries: The number of HasCombination queries.
+    seed: The random seed.
+
+  Returns:
+    A dict of measurements, including the query results.
+  """
+  cfg = load_backend(backend)
+  rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  start = time.perf_counter()
+  program, end, variables, bindings = build_program(
+      cfg, num_nodes, num_variables, num_bindings, seed)
+  build_time = time.perf_counter() - start
+  rng = random.Random(seed)
+  queries = [rng.sample(range(len(bindings)), rng.randint(1, 3))
+             for _ in range(num_queries)]
+  start = time.perf_counter()
+  results = [end.HasCombination([bindings[i] for i in query])
+             for query in queries]
+  query_time = time.perf_counter() - start
+  start = time.perf_counter()
+  visible = [len(v.Filter(end)) for v in variables]
+  filter_time = time.perf_counter() - start
+  rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  del program
+  return {
+      "backend": backend,
+      "build_time": build_time,
+      "queries_per_second": num_queries / query_time,
+      "filters_per_second": len(variables) / filter_time,
+      # ru_maxrss is in kilobytes on Linux.
+      "peak_rss_mb": (rss_after - rss_before) / 1024.0,
+      "results": results + visible,
+  }
+
+
+def parse_args(argv):
+  parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+  parser.add_argument("--nodes", type=int, default=3000,
+                      help="Approximate number of CFG nodes.")
+  parser.add_argument("--variables", type=int, default=300,
+                      help="Number of variables.")
+  parser.add_argument("--bindings", type=int, default=10,
+                      help="Number of bindings per variable.")
+  parser.add_argument("--queries", type=int, default=2000,
+                      help="Number of HasCombination queries.")
+  parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+  parser.add_argument("--backends", default=None,
+                      help="Comma-separated backends to run (default: all).")
+  return parser.parse_args(argv)
+
+
+def main(argv=None):
+  args = parse_args(sys.argv[1:] if argv is None else argv)
+  available = sorted(_find_backends())
+  backends = args.backends.split(",") if args.backends else available
+  for backend in backends:
+    if backend not in available:
+      print("Backend %s is not available (found: %s)" % (
+          backend, ", ".join(available) or "none"), file=sys.stderr)
+      return 1
+  reports = []
+  for backend in backends:
+    # A fresh process per backend, so that peak memory is measured separately.
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+      reports.append(executor.submit(
+          run_benchmark, backend, args.nodes, args.variables, args.bindings,
+          args.queries, args.seed).result())
+  print("%-8s %10s %14s %14s %12s" % (
+      "backend", "build (s)", "queries/s", "filters/s", "peak RSS (MB)"))
+  for r in reports:
+    print("%-8s %10.3f %14.1f %14.1f %12.1f" % (
+        r["backend"], r["build_time"], r["queries_per_second"],
+        r["filters_per_second"], r["peak_rss_mb"]))
+  mismatches = sum(a != b for a, b in zip(
+      *(r["results"] for r in reports))) if len(reports) > 1 else 0
+  if mismatches:
+    print("Backends disagree on %d queries" % mismatches, file=sys.stderr)
+    return 1
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
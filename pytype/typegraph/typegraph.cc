@@ -19,8 +19,9 @@ CFGNode* Program::NewCFGNode(const std::string& name) {
 }
 
 CFGNode* Program::NewCFGNode(const std::string& name, Binding* condition) {
+  // The new node isn't connected to anything yet, so it can't affect the
+  // solver.
   // Count the number of nodes so far and use that as ID
-  InvalidateSolver();
   size_t node_nr = CountCFGNodes();
   int n = backward_reachability_->add_node();
   CHECK(n == node_nr) <<
@@ -63,6 +64,12 @@ void Program::InvalidateSolver() {
   solver_.reset();
 }
 
+void Program::InvalidateSolver(const CFGNode* where) {
+  if (solver_) {
+    solver_->Invalidate(where);
+  }
+}
+
 bool Program::is_reachable(const CFGNode* src, const CFGNode* dst) {
   return backward_reachability_->is_reachable(dst->id(), src->id());
 }
@@ -132,7 +139,7 @@ void CFGNode::ConnectTo(CFGNode* node) {
       return;  // already connected
     }
   }
-  program_->InvalidateSolver();
+  program_->InvalidateSolver(node);
   node->incoming_.push_back(this);
   this->outgoing_.push_back(node);
   this->backward_reachability_->add_connection(node->id(), this->id());
@@ -198,19 +205,20 @@ Origin* Binding::FindOrAddOrigin(CFGNode* node) {
 }
 
 Origin* Binding::AddOrigin(CFGNode* node) {
-  program_->InvalidateSolver();
+  program_->InvalidateSolver(node);
   return FindOrAddOrigin(node);
 }
 
 Origin* Binding::AddOrigin(CFGNode* node,
                            const std::vector<Binding*>& source_set) {
-  program_->InvalidateSolver();
+  program_->InvalidateSolver(node);
   Origin* origin = FindOrAddOrigin(node);
   origin->AddSourceSet(source_set);
   return origin;
 }
 
 Origin* Binding::AddOrigin(CFGNode* node, const SourceSet& source_set) {
+  program_->InvalidateSolver(node);
   Origin* origin = FindOrAddOrigin(node);
   origin->AddSourceSet(source_set);
   return origin;
@@ -258,7 +266,8 @@ Binding* Variable::FindOrAddBindingHelper(const BindingData& data) {
   auto it = data_to_binding_.find(data.get());
   if (it == data_to_binding_.end()) {
     LOG(DEBUG) << "Adding choice to Variable " << id_;
-    program_->InvalidateSolver();
+    // A binding without origins can't affect the solver, so there's no need to
+    // invalidate it until we call AddOrigin.
     auto binding =
         std::unique_ptr<Binding>(new Binding(program_, this, data,
                                              program_->MakeBindingId()));
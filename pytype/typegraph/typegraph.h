@@ -105,7 +105,10 @@ class Program {
   Solver* solver() { return this->solver_.get(); }
 
   Solver* GetSolver();
+  // Discard the solver, e.g. after changing the condition of a node.
   void InvalidateSolver();
+  // Discard the solver results that a change at the given node could affect.
+  void InvalidateSolver(const CFGNode* where);
 
   bool is_reachable(const CFGNode* src, const CFGNode* dst);
 
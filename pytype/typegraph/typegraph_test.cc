@@ -192,21 +192,41 @@ TEST_F(TypeGraphTest, testInvalidateSolver) {
   EXPECT_EQ(p.solver(), nullptr);
   n1->HasCombination({});
   EXPECT_NE(p.solver(), nullptr);
-  // Adding a new CFGNode invalidates the current solver.
-  CFGNode* n2 = p.NewCFGNode("n2");
-  EXPECT_EQ(p.solver(), nullptr);
-  n2->HasCombination({});
+  // A new CFGNode isn't connected to anything, so the solver is still valid.
+  p.NewCFGNode("n2");
   EXPECT_NE(p.solver(), nullptr);
-  // a new Variable by itself doesn't change the CFG, so the solver is valid.
+  // Neither is a new Variable or a Binding without origins.
   Variable* x = p.NewVariable();
-  EXPECT_NE(p.solver(), nullptr);
-  // Adding a binding invalidates the solver.
   std::string a("a");
-  Binding* ax = AddBinding(x, &a);
-  ax->AddOrigin(n1);
-  EXPECT_EQ(p.solver(), nullptr);
-  n2->HasCombination({ax});
+  AddBinding(x, &a);
   EXPECT_NE(p.solver(), nullptr);
+  // Discarding the whole solver still works.
+  p.InvalidateSolver();
+  EXPECT_EQ(p.solver(), nullptr);
+}
+
+TEST_F(TypeGraphTest, testInvalidateSolverAtNode) {
+  // Test that changes to the program discard the solutions they affect.
+  Program p;
+  CFGNode* n1 = p.NewCFGNode("n1");
+  CFGNode* n2 = n1->ConnectNew("n2");
+  CFGNode* n3 = p.NewCFGNode("n3");
+  Variable* x = p.NewVariable();
+  std::string a("a");
+  Binding* ax = AddBinding(x, &a, n1, {});
+  EXPECT_TRUE(n2->HasCombination({ax}));
+  EXPECT_FALSE(n3->HasCombination({ax}));
+  // A new edge makes the binding visible at n3.
+  n2->ConnectTo(n3);
+  EXPECT_TRUE(n3->HasCombination({ax}));
+  // A new origin makes a new binding visible at n2 and n3.
+  std::string b("b");
+  Binding* bx = AddBinding(x, &b);
+  EXPECT_FALSE(n3->HasCombination({bx}));
+  bx->AddOrigin(n2, std::vector<Binding*>());
+  EXPECT_TRUE(n2->HasCombination({bx}));
+  EXPECT_TRUE(n3->HasCombination({bx}));
+  EXPECT_FALSE(n3->HasCombination({ax}));
 }
 
 TEST_F(TypeGraphTest, testMaxVarSize) {
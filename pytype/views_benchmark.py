@@ -0,0 +1,144 @@
+"""Benchmark abstract_utils.get_views on the argument shapes of overloaded calls.
+
+Calling an overloaded pytd function matches every view of its arguments, i.e.
+every combination of their bindings, against the signatures. When a match
+fails, the caller asks get_views to skip all later views that agree with the
+failed one on the bindings that the matcher looked at. This benchmark replays
+that protocol for argument shapes taken from the overloaded-call tests, such as
+dict.get and str.format called with unions, and compares get_views against the
+previous implementation, which compared each view with every skipped subset.
+
+Usage:
+  python -m pytype.views_benchmark [--repeat N] [--seed N]
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from pytype import abstract_utils
+from pytype import datatypes
+from pytype.typegraph import cfg
+from pytype.typegraph import cfg_utils
+
+
+# Scenario name -> number of bindings of each argument. The products stay below
+# cfg_utils.DEEP_VARIABLE_LIMIT, since get_views gives up on larger ones.
+SCENARIOS = {
+    "dict.get(union, union)": (12, 12),
+    "str.format(*unions)": (4, 4, 4, 4, 3),
+    "getattr(any, any, union)": (2, 2, 24),
+    "overloaded_binop(union, union)": (30, 30),
+}
+
+
+class _Data:
+  """Stands in for an abstract value without type parameters."""
+
+  def __init__(self, name):
+    self.name = name
+
+  def unique_parameter_values(self):
+    return []
+
+  def __repr__(self):
+    return self.name
+
+
+def _linear_get_views(variables, node):
+  """get_views as it was before the accessed subsets were indexed."""
+  combinations = cfg_utils.deep_variable_product(variables)
+  seen = []
+  for combination in combinations:
+    view = {value.variable: value for value in combination}
+    if any(subset <= view.items() for subset in seen):
+      continue
+    combination = list(view.values())
+    if not node.CanHaveCombination(combination):
+      continue
+    view = datatypes.AccessTrackingDict(view)
+    skip_future = yield view
+    if skip_future:
+      seen.append(view.accessed_subset.items())
+
+
+def make_arguments(shape):
+  """Creates a program and argument variables with the given numbers of data."""
+  program = cfg.Program()
+  node = program.NewCFGNode("root")
+  program.entrypoint = node
+  variables = []
+  for i, size in enumerate(shape):
+    var = program.NewVariable()
+    for j in range(size):
+      var.AddBinding(_Data("a%d_%d" % (i, j)), [], node)
+    variables.append(var)
+  return node, variables
+
+
+def run(get_views, node, variables, seed):
+  """Runs the matching protocol and returns the views that were not skipped.
+
+  Like PyTDFunction.call, we look at the arguments one by one and stop at the
+  first one that doesn't match, in which case the later views that agree on
+  the arguments we looked at can be skipped.
+
+  Args:
+    get_views: The get_views implementation.
+    node: The CFG node.
+    variables: The argument variables.
+    seed: A seed for deciding which bindings match.
+
+  Returns:
+    The number of views.
+  """
+  rng = random.Random(seed)
+  failing = {b for v in variables for b in v.bindings if rng.random() < 0.5}
+  views = get_views(variables, node)
+  num_views = 0
+  skip_future = None
+  while True:
+    try:
+      view = views.send(skip_future)
+    except StopIteration:
+      break
+    num_views += 1
+    skip_future = False
+    for var in variables:
+      if view[var] in failing:
+        skip_future = True
+        break
+  return num_views
+
+
+def parse_args(args):
+  parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+  parser.add_argument("--repeat", type=int, default=5,
+                      help="How often to run each scenario.")
+  parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+  return parser.parse_args(args)
+
+
+def main(args=None):
+  opts = parse_args(args)
+  print("%-32s %8s %12s %12s" % ("scenario", "views", "linear(s)",
+                                 "indexed(s)"))
+  for name, shape in SCENARIOS.items():
+    node, variables = make_arguments(shape)
+    times = []
+    num_views = None
+    for get_views in (_linear_get_views, abstract_utils.get_views):
+      start = time.time()
+      for i in range(opts.repeat):
+        n = run(get_views, node, variables, opts.seed + i)
+      times.append(time.time() - start)
+      # Both implementations have to skip exactly the same views.
+      assert num_views is None or n == num_views, (name, n, num_views)
+      num_views = n
+    print("%-32s %8d %12.3f %12.3f" % ((name, num_views) + tuple(times)))
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
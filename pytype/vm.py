@@ -35,6 +35,7 @@ from pytype import metrics
 from pytype import mixin
 from pytype import special_builtins
 from pytype import state as frame_state
+from pytype import summary_cache
 from pytype import utils
 from pytype.pyc import loadmarshal
 from pytype.pyc import opcodes
@@ -156,7 +157,15 @@ class VirtualMachine:
     self.director = None
     self._analyzing = False  # Are we in self.analyze()?
     self.opcode_traces = []
+    self.num_opcodes = 0  # The number of opcodes run so far.
+    # Set by run_program() if there is a cache directory.
+    self.summary_cache = None
     self._importing = False  # Are we importing another file?
+    # Opcode class -> (name, byte_* method, is import), filled in as we go.
+    self._opcode_dispatch = {}
+    # Checked once, so that run_instruction doesn't call into metrics at all
+    # when they are disabled.
+    self._count_opcodes = metrics.is_enabled()
     self._trace_opcodes = True  # whether to trace opcodes
     # If set, we will generate LateAnnotations with this stack rather than
     # logging name errors.
@@ -260,6 +269,25 @@ class VirtualMachine:
   def is_at_maximum_depth(self):
     return len(self.frames) > self.maximum_depth
 
+  def _add_opcode_dispatch(self, op_cls):
+    """Add an opcode class to the dispatch table.
+
+    Args:
+      op_cls: A subclass of pyc.opcodes.Opcode.
+    Returns:
+      A tuple (name, bytecode_fn, importing) of the opcode name, the byte_*
+      method implementing the opcode and whether the opcode is an import.
+    Raises:
+      VirtualMachineError: if we don't know the opcode.
+    """
+    name = op_cls.__name__
+    bytecode_fn = getattr(self, "byte_%s" % name, None)
+    if bytecode_fn is None:
+      raise VirtualMachineError("Unknown opcode: %s" % name)
+    entry = self._opcode_dispatch[op_cls] = (
+        name, bytecode_fn, op_cls.is_import())
+    return entry
+
   def run_instruction(self, op, state):
     """Run a single bytecode instruction.
 
@@ -275,15 +303,17 @@ class VirtualMachine:
     Raises:
       VirtualMachineError: if a fatal error occurs.
     """
-    _opcode_counter.inc(op.name)
+    try:
+      name, bytecode_fn, importing = self._opcode_dispatch[op.__class__]
+    except KeyError:
+      name, bytecode_fn, importing = self._add_opcode_dispatch(op.__class__)
+    if self._count_opcodes:
+      _opcode_counter.inc(name)
+    self.num_opcodes += 1
     self.frame.current_opcode = op
-    self._importing = "IMPORT" in op.__class__.__name__
+    self._importing = importing
     if log.isEnabledFor(logging.INFO):
       self.log_opcode(op, state)
-    # dispatch
-    bytecode_fn = getattr(self, "byte_%s" % op.name, None)
-    if bytecode_fn is None:
-      raise VirtualMachineError("Unknown opcode: %s" % op.name)
     state = bytecode_fn(state, op)
     if state.why in ("reraise", "NoReturn"):
       state = state.set_why("exception")
@@ -763,11 +793,12 @@ class VirtualMachine:
     return node, val
 
   def compile_src(self, src, filename=None, mode="exec"):
-    code = pyc.compile_src(
-        src, python_version=self.python_version,
-        python_exe=self.options.python_exe,
-        filename=filename, mode=mode)
-    code = blocks.process_code(code, self.python_version)
+    with metrics.TraceSpan(filename or "<string>", "compile", mode=mode):
+      code = pyc.compile_src(
+          src, python_version=self.python_version,
+          python_exe=self.options.python_exe,
+          filename=filename, mode=mode, cache_dir=self.options.cache_dir)
+      code = blocks.process_code(code, self.python_version)
     if mode == "exec":
       self.director.adjust_line_numbers(code)
     return blocks.merge_annotations(
@@ -816,6 +847,9 @@ class VirtualMachine:
     self.filename = filename
 
     self.maximum_depth = maximum_depth
+    if self.options.cache_dir:
+      self.summary_cache = summary_cache.SummaryCache(
+          self.options.cache_dir, self.options, src)
 
     code = self.compile_src(src, filename=filename)
     visitor = _FindIgnoredTypeComments(self.director.type_comments)